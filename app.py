@@ -1,86 +1,83 @@
+import os
 import streamlit as st
 import folium
 from streamlit_folium import st_folium
 import pandas as pd
 
 # --- IMPORTACIONES ---
+from src.almacen_clima import AlmacenClima
 from src.api_client import AgroClimaClient
 from src.agro_logic import AgroAnalisis
+from src.cache import CacheRespuestas
+from src.map_utils import MallaAptitud, capa_folium
+from src.diagnostico import generar_consejos_experto
+from src.indicadores import UMBRAL_ITH, resumen_sitio, ranking_siembra, SeriesDiarias
+from src.metricas import Metricas
+from src.nomenclator import Nomenclator
+from src.reglas import obtener_registro
+from src.topografia import ModeloElevacion
+
+# Caché persistente de respuestas Open-Meteo (compartida entre reruns)
+RUTA_CACHE = ".cache/open_meteo.sqlite"
+# Almacén climático local opcional (consultas sin conexión, ver src/almacen_clima.py)
+RUTA_ALMACEN = "data/clima_local"
+# Modelo digital de elevación opcional para la pendiente real (ver src/topografia.py)
+RUTA_DEM = "data/dem"
+# Nomenclátor local opcional para buscar lugares sin red (ver src/nomenclator.py)
+RUTA_NOMENCLATOR = "data/nomenclator/lugares.csv"
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(page_title="AgroDecision Pro", page_icon="🌱", layout="wide")
 
-# --- 1. FUNCIÓN DE CONSEJOS (CORREGIDA PARA pH MANUAL) ---
-def generar_consejos_experto(datos, categoria, ph_manual):
-    """
-    SISTEMA EXPERTO DE DIAGNÓSTICO:
-    Analiza las variables extraídas y genera alertas agronómicas.
-    Recibe el ph_manual directamente del input del usuario para asegurar reactividad.
-    """
-    consejos = []
-    
-    # Extraer variables del clima (usamos .get para evitar errores)
-    temp = datos['clima'].get('temp_actual', 20)
-    humedad = datos['clima'].get('humedad', 60)
-    altitud = datos['topografia'].get('altitud', 500)
-    lluvia = datos['clima'].get('precipitacion_anual_estimada', 0)
-    
-    # Usamos EXPLICITAMENTE el ph_manual modificado por el usuario
-    ph_suelo = float(ph_manual) 
-    
-    # =======================================================
-    # 🚨 ANÁLISIS DE CULTIVOS
-    # =======================================================
-    if categoria == "cultivos":
-        
-        # --- LÓGICA DE pH (Reacciona al cambio del usuario) ---
-        if ph_suelo < 5.5:
-            msg = (
-                f"☠️ **ACIDEZ DETECTADA (pH {ph_suelo})**\n\n"
-                "**Diagnóstico:** El suelo es demasiado ácido. Hay toxicidad por Aluminio y bloqueo de Fósforo.\n"
-                "**🛡️ Solución:** Aplicar **Cal Dolomita** inmediatamente (aprox 2 ton/ha)."
-            )
-            consejos.append((msg, "error"))
-            
-        elif ph_suelo > 7.8:
-            msg = (
-                f"⚠️ **ALCALINIDAD ALTA (pH {ph_suelo})**\n\n"
-                "**Diagnóstico:** Bloqueo de micronutrientes (Hierro, Zinc).\n"
-                "**🛡️ Solución:** Aplicar materia orgánica acidificante o Azufre elemental."
-            )
-            consejos.append((msg, "warning"))
+# --- RECURSOS COMPARTIDOS (se crean una vez por proceso, no en cada rerun) ---
+@st.cache_resource
+def obtener_metricas():
+    return Metricas()
 
-        # --- LÓGICA CLIMÁTICA ---
-        if altitud > 3500 and temp < 10:
-            consejos.append(("❄️ **RIESGO DE HELADAS**\n\n**Diagnóstico:** Radiación nocturna extrema.\n**🛡️ Plan:** Riego al atardecer y Potasio foliar.", "error"))
-        
-        if temp > 22 and humedad > 80:
-            consejos.append(("🍄 **ALERTA HONGOS**\n\n**Diagnóstico:** Alta humedad + calor.\n**🛡️ Plan:** Poda de ventilación y Trichoderma.", "error"))
-        
-        if temp > 28 and humedad < 40:
-            consejos.append(("🍂 **ESTRÉS HÍDRICO (Aire Seco)**\n\n**Diagnóstico:** Cierre de estomas.\n**🛡️ Plan:** Riegos cortos frecuentes y cobertura (Mulch).", "warning"))
-        
-        if lluvia < 500:
-            consejos.append((f"💧 **DÉFICIT LLUVIA ({int(lluvia)} mm)**\n\n**Diagnóstico:** Requiere riego.\n**🛡️ Plan:** Instalar sistema por goteo.", "warning"))
-
-    # =======================================================
-    # 🚨 ANÁLISIS DE ANIMALES
-    # =======================================================
-    elif categoria in ["bovinos", "porcinos", "aves"]:
-        if categoria == "bovinos" and altitud > 2800:
-            consejos.append(("⛰️ **RIESGO: MAL DE ALTURA**\n\n**Diagnóstico:** Hipoxia.\n**🛡️ Plan:** Evitar Holstein puro.", "error"))
-        if categoria == "porcinos" and temp > 27:
-            consejos.append(("🐷 **ESTRÉS TÉRMICO**\n\n**Diagnóstico:** Riesgo de infarto.\n**🛡️ Plan:** Nebulizadores y ventilación.", "error"))
-        if humedad > 85:
-            consejos.append(("🦠 **BACTERIOSIS**\n\n**Diagnóstico:** Camas húmedas.\n**🛡️ Plan:** Cal viva y reducir densidad.", "warning"))
-
-    # =======================================================
-    # ✅ SI TODO ESTÁ BIEN
-    # =======================================================
-    if not consejos:
-        consejos.append(("✨ **CONDICIONES IDEALES**\n\nEl ambiente es favorable.\n**🚀 Plan:** Enfocarse en nutrición para alto rendimiento.", "success"))
-
-    return consejos
+@st.cache_resource
+def obtener_cliente():
+    almacen = AlmacenClima(RUTA_ALMACEN) if os.path.exists(os.path.join(RUTA_ALMACEN, "meta.json")) else None
+    dem = ModeloElevacion(RUTA_DEM) if os.path.exists(os.path.join(RUTA_DEM, "meta.json")) else None
+    nomenclator = Nomenclator.desde_archivo(RUTA_NOMENCLATOR) if os.path.exists(RUTA_NOMENCLATOR) else None
+    return AgroClimaClient(cache=CacheRespuestas(ruta_sqlite=RUTA_CACHE), metricas=obtener_metricas(),
+                           almacen=almacen, dem=dem, nomenclator=nomenclator)
+
+@st.cache_resource
+def obtener_analista():
+    return AgroAnalisis(registro=obtener_registro(), metricas=obtener_metricas())
+
+# --- DATOS DE LA API (cacheados por coordenadas / texto de búsqueda) ---
+# Los fallos se lanzan dentro de la función cacheada (st.cache_data no guarda
+# excepciones) y se resuelven fuera: una caída de la red no fija datos de
+# respaldo durante todo el TTL.
+class _DatosRespaldo(Exception):
+    def __init__(self, datos):
+        super().__init__("Datos de respaldo")
+        self.datos = datos
+
+@st.cache_data(ttl=15 * 60, show_spinner=False)
+def _consultar_datos(lat, lon):
+    datos = obtener_cliente().obtener_todo(lat, lon)
+    if datos["respaldo"] or datos["respaldo_archivo"]: raise _DatosRespaldo(datos)
+    return datos
+
+def consultar_datos(lat, lon):
+    try:
+        return _consultar_datos(lat, lon)
+    except _DatosRespaldo as e:
+        return e.datos
+
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def _buscar_lugares(texto):
+    return obtener_cliente().buscar_opciones_ciudades(texto, estricto=True)
+
+def buscar_lugares(texto):
+    try:
+        return _buscar_lugares(texto)
+    except Exception:
+        # Sin red: solo las coincidencias del nomenclátor local, si lo hay
+        nomenclator = obtener_cliente().nomenclator
+        return nomenclator.buscar(texto) if nomenclator is not None else []
 
 # --- ESTADO DE SESIÓN ---
 if 'lat' not in st.session_state: st.session_state['lat'] = -12.0464
@@ -88,6 +85,10 @@ if 'lon' not in st.session_state: st.session_state['lon'] = -77.0428
 if 'analisis_listo' not in st.session_state: st.session_state['analisis_listo'] = False
 if 'datos_api' not in st.session_state: st.session_state['datos_api'] = None
 if 'lista_opciones' not in st.session_state: st.session_state['lista_opciones'] = []
+if 'capa_aptitud' not in st.session_state: st.session_state['capa_aptitud'] = None
+if 'evaluacion' not in st.session_state: st.session_state['evaluacion'] = None
+if 'historial' not in st.session_state: st.session_state['historial'] = None
+metricas = obtener_metricas()
 
 # --- INTERFAZ PRINCIPAL ---
 st.title("🌱 AgroDecision: Sistema de Zonificación")
@@ -95,7 +96,9 @@ st.title("🌱 AgroDecision: Sistema de Zonificación")
 col_mapa, col_config = st.columns([2, 1])
 
 # --- COLUMNA 1: MAPA Y BUSCADOR ---
-with col_mapa:
+# Fragmento: buscar o cambiar el estilo solo vuelve a dibujar esta columna
+@st.fragment
+def panel_mapa():
     st.subheader("📍 Ubicación")
     
     tab_buscar, tab_coords = st.tabs(["🔍 Buscador", "🌐 GPS Manual"])
@@ -103,9 +106,14 @@ with col_mapa:
     with tab_buscar:
         c1, c2 = st.columns([3, 1])
         texto = c1.text_input("Lugar:", label_visibility="collapsed", placeholder="Ej: Cajamarca, Peru")
+        nomenclator = obtener_cliente().nomenclator
         if c2.button("Buscar"):
-            cli = AgroClimaClient()
-            st.session_state['lista_opciones'] = cli.buscar_opciones_ciudades(texto)
+            st.session_state['lista_opciones'] = buscar_lugares(texto)
+        elif nomenclator is not None and texto != st.session_state.get('texto_buscado'):
+            # Sugerencias del nomenclátor local (sin red) al confirmar el texto con Enter o al salir
+            # del campo: st.text_input no vuelve a ejecutar el script con cada tecla
+            st.session_state['lista_opciones'] = nomenclator.buscar(texto)
+        st.session_state['texto_buscado'] = texto
         
         if st.session_state['lista_opciones']:
             opciones = {op['label']: op for op in st.session_state['lista_opciones']}
@@ -115,6 +123,7 @@ with col_mapa:
                 st.session_state['lat'] = lugar['lat']
                 st.session_state['lon'] = lugar['lon']
                 st.session_state['analisis_listo'] = False
+                st.session_state['capa_aptitud'] = None
                 st.rerun()
 
     with tab_coords:
@@ -125,6 +134,7 @@ with col_mapa:
             st.session_state['lat'] = n_lat
             st.session_state['lon'] = n_lon
             st.session_state['analisis_listo'] = False
+            st.session_state['capa_aptitud'] = None
             st.rerun()
 
     st.write("🎨 **Estilo de Mapa:**")
@@ -140,6 +150,11 @@ with col_mapa:
     # Renderizar mapa y CAPTURAR eventos de clic
     m = folium.Map(location=[st.session_state['lat'], st.session_state['lon']], zoom_start=14, tiles=tiles, attr=attr)
     folium.Marker([st.session_state['lat'], st.session_state['lon']], icon=folium.Icon(color="red", icon="leaf")).add_to(m)
+
+    # Capa del Mapa Inteligente (ráster de aptitud de la zona), si fue generada
+    if st.session_state['capa_aptitud']:
+        raster, bbox, nombre_capa = st.session_state['capa_aptitud']
+        capa_folium(raster, bbox, nombre_capa).add_to(m)
     
     # El objeto 'output' guarda la información de interacción con el mapa
     output = st_folium(m, height=350, width="100%", key="mapa_interactivo")
@@ -153,14 +168,18 @@ with col_mapa:
             st.session_state['lat'] = click_lat
             st.session_state['lon'] = click_lon
             st.session_state['analisis_listo'] = False
+            st.session_state['capa_aptitud'] = None
             st.rerun()
 
+with col_mapa:
+    panel_mapa()
+
 # --- COLUMNA 2: CONFIGURACIÓN DE CULTIVO/ANIMAL ---
 with col_config:
     st.subheader("⚙️ Configuración")
     categoria = st.selectbox("Categoría", ["cultivos", "bovinos", "porcinos", "aves"])
     
-    analista = AgroAnalisis()
+    analista = obtener_analista()
     df_reglas = analista.cargar_reglas(categoria)
     
     variedad = None
@@ -171,16 +190,38 @@ with col_config:
         
         if st.button("📊 ANALIZAR VIABILIDAD", type="primary"):
             with st.spinner("Consultando satélites y clima histórico..."):
-                cli = AgroClimaClient()
-                st.session_state['datos_api'] = cli.obtener_todo(st.session_state['lat'], st.session_state['lon'])
+                datos = consultar_datos(st.session_state['lat'], st.session_state['lon'])
+                st.session_state['datos_api'] = datos
+                # Serie diaria del último año (misma descarga que la lluvia anual), una vez por
+                # análisis y no en cada rerun del panel; si el archivo ya falló no se reintenta,
+                # y si respondió el almacén local no se sale a la red (modo sin conexión)
+                sin_archivo = datos['respaldo_archivo'] or datos.get('origen') == 'almacen'
+                st.session_state['historial'] = None if sin_archivo else obtener_cliente().obtener_historial(
+                    st.session_state['lat'], st.session_state['lon'])
+                st.session_state['evaluacion'] = None
                 st.session_state['analisis_listo'] = True
+
+        # MAPA INTELIGENTE: ráster de aptitud alrededor del punto seleccionado
+        if st.button("🗺️ Mapa de aptitud de la zona"):
+            lat0, lon0 = st.session_state['lat'], st.session_state['lon']
+            bbox = (lat0 - 0.05, lon0 - 0.05, lat0 + 0.05, lon0 + 0.05)
+            malla = MallaAptitud(obtener_cliente(), analista)
+            barra = st.progress(0.0, text="Calculando aptitud por celdas...")
+            raster = malla.calcular(
+                bbox, 0.01, categoria, variedad,
+                progreso=lambda hechas, total, cps: barra.progress(hechas / total, text=f"{cps:.0f} celdas/s")
+            )
+            st.session_state['capa_aptitud'] = (raster, bbox, f"Aptitud: {variedad}")
+            st.rerun()
     else:
         st.error("Error cargando base de conocimientos (agro_logic.py).")
 
 st.divider()
 
 # --- SECCIÓN DE RESULTADOS ---
-if st.session_state['analisis_listo'] and st.session_state['datos_api']:
+# Fragmento: cambiar el pH solo vuelve a puntuar esta sección (el mapa no se redibuja)
+@st.fragment
+def panel_resultados(analista, categoria, variedad):
     datos = st.session_state['datos_api']
     
     st.subheader("🧪 Análisis de Suelo")
@@ -208,17 +249,27 @@ if st.session_state['analisis_listo'] and st.session_state['datos_api']:
     m3.metric("⛰️ Altitud", f"{datos['topografia']['altitud']:.0f} m")
     m4.metric("☀️ Luz", f"{datos['solar']['horas_luz']} h")
     m5.metric("🌧️ Lluvia", f"{int(datos['clima']['precipitacion_anual_estimada'])} mm")
+    if datos.get("respaldo"):
+        st.warning("⚠️ Sin respuesta del pronóstico: se muestran valores por defecto, no datos reales.")
+    elif datos.get("respaldo_archivo"):
+        st.warning("⚠️ Sin respuesta del archivo histórico: la lluvia anual (0 mm) no es un dato real.")
 
     try:
-        score, razones, riesgo = analista.analizar(datos, categoria, variedad)
+        # Evaluación incremental: si solo cambió el pH, se recalcula solo esa validación
+        evaluacion = st.session_state['evaluacion']
+        if evaluacion is None or evaluacion.regla is not analista.registro.regla(categoria, variedad):
+            evaluacion = analista.evaluacion(datos, categoria, variedad)
+            st.session_state['evaluacion'] = evaluacion
+        evaluacion.actualizar(ph=ph_user)
+        score, razones, riesgo = evaluacion.resultado()
         consejos_expertos = generar_consejos_experto(datos, categoria, ph_user)
-        regla_actual = df_reglas[df_reglas['variedad'] == variedad].iloc[0]
+        regla_actual = analista.registro.regla(categoria, variedad)
 
     except Exception as e:
         st.error(f"Error en cálculos internos: {e}")
-        st.stop()
+        return
 
-    t1, t2, t3 = st.tabs(["📊 INFORME", "🧬 FISIOLOGÍA", "📝 PLAN DE MANEJO"])
+    t1, t2, t3, t4 = st.tabs(["📊 INFORME", "🧬 FISIOLOGÍA", "📝 PLAN DE MANEJO", "🏆 QUÉ PRODUCIR AQUÍ"])
 
     with t1:
         if score >= 80: st.success(f"### ✅ APTO ({score}/100) - {variedad}")
@@ -233,6 +284,8 @@ if st.session_state['analisis_listo'] and st.session_state['datos_api']:
     with t2:
         try:
             st.subheader(f"Fisiología: {variedad}")
+            historial = st.session_state['historial']
+            indicadores = resumen_sitio(historial, regla_actual) if historial is not None else None
             
             if categoria in ["bovinos", "porcinos", "aves"]:
                 temp_a = datos['clima']['temp_actual']
@@ -248,7 +301,20 @@ if st.session_state['analisis_listo'] and st.session_state['datos_api']:
                 elif ith < 78: c1.warning("Alerta Leve")
                 else: c1.error("Estrés Severo")
                 c2.metric("Consumo Agua Estimado", f"{agua:.1f} Lt/día")
+                if indicadores and indicadores['horas_ith_dia'] is not None:
+                    st.caption(f"Último año: {indicadores['horas_ith_dia']} h/día en promedio con ITH ≥ {UMBRAL_ITH}.")
             
+            elif indicadores is not None:
+                c1, c2, c3 = st.columns(3)
+                c1.metric(f"GDD último año (base {indicadores['temp_base']:.0f} °C)", f"{indicadores['gdd_anual']:.0f}")
+                c2.metric("Balance Hídrico anual (lluvia - ET0)", f"{int(indicadores['balance_anual_mm'])} mm")
+                c3.metric("Balance último mes", f"{int(indicadores['balance_ultimo_mes_mm'])} mm")
+
+                st.write("**📅 Mejores ventanas de siembra (ciclo de 120 días):**")
+                ventanas = ranking_siembra(SeriesDiarias.desde_historiales([historial]), analista.registro,
+                                           variedades=[variedad], top=3)
+                st.dataframe(ventanas[["puesto", "fecha_siembra", "gdd", "balance_mm", "dias_helada"]],
+                             hide_index=True, use_container_width=True)
             else:
                 temp_c = datos['clima']['temp_actual']
                 lluvia_c = datos['clima']['precipitacion_anual_estimada']
@@ -257,6 +323,7 @@ if st.session_state['analisis_listo'] and st.session_state['datos_api']:
                 c1, c2 = st.columns(2)
                 c1.metric("Crecimiento (GDD)", f"{gdd:.1f}")
                 c2.metric("Balance Hídrico", f"{int(balance)} mm")
+                st.caption("Sin historial diario disponible: estimación con la lectura actual.")
                 
         except Exception as e:
             st.error(f"Error mostrando fisiología: {e}")
@@ -290,4 +357,39 @@ if st.session_state['analisis_listo'] and st.session_state['datos_api']:
                 else: st.info(texto)
                 
         except Exception as e:
-            st.error(f"Error en el plan de manejo: {e}")
\ No newline at end of file
+            st.error(f"Error en el plan de manejo: {e}")
+
+    with t4:
+        try:
+            st.subheader("Mejores opciones para este sitio")
+            umbral = st.slider("Puntaje mínimo", 0, 100, 50, step=5, key="umbral_recomendacion")
+            # Todas las variedades de todas las categorías con los mismos datos (y el pH ingresado)
+            recomendadas = analista.recomendar(datos, top=5, umbral=umbral)
+            if not recomendadas:
+                st.info(f"Ninguna variedad alcanza {umbral}/100 en este sitio.")
+            for rec in recomendadas:
+                titulo = f"{rec['puesto']}. {rec['variedad']} ({rec['categoria']}) - {rec['score']}/100"
+                with st.expander(titulo, expanded=rec['puesto'] == 1):
+                    for r in rec['razones']: st.write(r)
+                    st.caption(f"Riesgo adicional: {rec['riesgo_extra']}")
+        except Exception as e:
+            st.error(f"Error en la recomendación: {e}")
+
+if st.session_state['analisis_listo'] and st.session_state['datos_api']:
+    panel_resultados(analista, categoria, variedad)
+
+# --- PANEL DE DEPURACIÓN (métricas del proceso) ---
+with st.sidebar.expander("🛠️ Depuración: rendimiento"):
+    resumen = metricas.resumen()
+    if resumen["latencias"]:
+        st.write("**Latencias**")
+        st.dataframe(pd.DataFrame(resumen["latencias"]), hide_index=True)
+    if resumen["contadores"]:
+        st.write("**Contadores**")
+        st.dataframe(pd.DataFrame(resumen["contadores"]), hide_index=True)
+    for servicio, cache in resumen["cache"].items():
+        st.metric(f"Caché {servicio}", f"{cache['ratio_aciertos']:.0%}", f"{cache['aciertos']} aciertos")
+    if not (resumen["latencias"] or resumen["contadores"]):
+        st.caption("Sin consultas registradas todavía.")
+    if st.button("Reiniciar métricas"):
+        metricas.limpiar()
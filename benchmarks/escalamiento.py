@@ -0,0 +1,85 @@
+"""
+ESCALAMIENTO POR NÚCLEOS (benchmarks/escalamiento.py)
+Mide EjecutorRegional.procesar_region (puntaje + consejos de todas las
+categorías + ranking de ventanas de siembra) con 1, 2, 4 ... N procesos sobre
+los mismos sitios sintéticos y reporta la aceleración y eficiencia respecto de 1.
+Uso:
+    python -m benchmarks.escalamiento --sitios 50000 --max-workers 8 --salida escala.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+from benchmarks.run import _metadatos, medir
+from benchmarks.sitios import generar_series, generar_sitios
+from src.agro_logic import AgroAnalisis
+from src.paralelo import EjecutorRegional
+
+
+def niveles_workers(maximo):
+    """
+    1, 2, 4, ... hasta 'maximo' (incluido aunque no sea potencia de 2).
+    """
+    niveles, w = [], 1
+    while w < maximo:
+        niveles.append(w)
+        w *= 2
+    return niveles + [maximo]
+
+
+def ejecutar(n=50_000, max_workers=None, indicadores=True, min_segundos=0.5, progreso=True):
+    """
+    Devuelve el informe {metadatos, resultados} con una fila por número de workers.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    sitios = generar_sitios(n)
+    series = generar_series(n) if indicadores else None
+    analista = AgroAnalisis()
+
+    resultados = []
+    base = None
+    for workers in niveles_workers(max_workers):
+        with EjecutorRegional(analista, workers=workers) as ejecutor:
+            tiempos = medir(lambda: ejecutor.procesar_region(sitios, series=series),
+                            min_segundos=min_segundos, max_repeticiones=5)
+        mediana = statistics.median(tiempos)
+        base = base or mediana
+        resultados.append({
+            "workers": workers,
+            "sitios": n,
+            "repeticiones": len(tiempos),
+            "mediana_s": mediana,
+            "sitios_por_segundo": n / mediana,
+            "aceleracion": base / mediana,
+            "eficiencia": base / mediana / workers,
+        })
+        if progreso:
+            print(f"workers={workers:<3} mediana={mediana:8.3f} s  x{base / mediana:5.2f} "
+                  f"({n / mediana:,.0f} sitios/s)", file=sys.stderr)
+
+    metadatos = _metadatos(None)
+    metadatos.pop("latencia_stub")
+    metadatos["nucleos"] = os.cpu_count()
+    return {"metadatos": metadatos, "resultados": resultados}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.escalamiento",
+                                     description="Escalamiento de EjecutorRegional de 1 a N procesos.")
+    parser.add_argument("--sitios", type=int, default=50_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sin-indicadores", action="store_true", help="Solo puntaje y consejos")
+    parser.add_argument("--min-segundos", type=float, default=0.5, help="Tiempo mínimo medido por nivel")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    informe = ejecutar(args.sitios, args.max_workers, not args.sin_indicadores, args.min_segundos)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
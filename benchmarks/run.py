@@ -0,0 +1,219 @@
+"""
+SUITE DE RENDIMIENTO (benchmarks/run.py)
+Mide los caminos críticos (puntaje, reglas, consejos y cliente HTTP) sobre sitios
+sintéticos de 1, 1k, 100k y 1M y escribe un JSON comparable entre commits.
+Uso:
+    python -m benchmarks --salida base.json
+    python -m benchmarks --salida nuevo.json --comparar base.json --umbral 1.2
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.servidor_stub import ServidorStub
+from benchmarks.sitios import datos_api, generar_series, generar_sitios
+from src.agro_logic import AgroAnalisis
+from src.api_client import AgroClimaClient
+from src.diagnostico import consejos_lote, generar_consejos_experto
+from src.indicadores import ranking_siembra
+
+TAMANOS = [1, 1_000, 100_000, 1_000_000]
+
+
+def medir(funcion, min_segundos=0.2, max_repeticiones=50):
+    """
+    Ejecuta 'funcion' (una vez de calentamiento) y repite hasta acumular
+    min_segundos o max_repeticiones. Devuelve los tiempos en segundos.
+    """
+    funcion()
+    tiempos = []
+    total = 0.0
+    while total < min_segundos and len(tiempos) < max_repeticiones:
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        total += tiempos[-1]
+    return tiempos
+
+
+# --- CASOS: cada uno recibe (n, contexto) y devuelve la función a medir ---
+
+def caso_cargar_reglas(n, contexto):
+    analista = contexto["analista"]
+    return lambda: [analista.cargar_reglas("cultivos") for _ in range(n)]
+
+
+def caso_analizar(n, contexto):
+    analista = contexto["analista"]
+    datos = datos_api(generar_sitios(n))
+    return lambda: [analista.analizar(d, "cultivos", "Papa") for d in datos]
+
+
+def caso_recomendar(n, contexto):
+    analista = contexto["analista"]
+    datos = datos_api(generar_sitios(n))
+    return lambda: [analista.recomendar(d) for d in datos]
+
+
+def caso_analizar_lote(n, contexto):
+    analista = contexto["analista"]
+    sitios = generar_sitios(n)
+    return lambda: analista.analizar_lote(sitios)
+
+
+def caso_generar_consejos(n, contexto):
+    datos = datos_api(generar_sitios(n))
+    return lambda: [generar_consejos_experto(d, "cultivos", d["suelo"]["ph"]) for d in datos]
+
+
+def caso_consejos_lote(n, contexto):
+    sitios = generar_sitios(n)
+    return lambda: consejos_lote(sitios, "cultivos")
+
+
+def caso_ranking_siembra(n, contexto):
+    series = generar_series(n)
+    return lambda: ranking_siembra(series, contexto["analista"].registro)
+
+
+def caso_obtener_todo(n, contexto):
+    # Cliente nuevo por repetición: sin él, los historiales en memoria del cliente
+    # responderían el archivo desde la segunda vuelta y solo se mediría el pronóstico
+    urls = contexto["stub"].urls()
+    puntos = generar_sitios(n)[["lat", "lon"]].to_numpy()
+
+    def funcion():
+        cliente = AgroClimaClient(**urls)
+        return [cliente.obtener_todo(lat, lon) for lat, lon in puntos]
+    return funcion
+
+
+def caso_obtener_todo_historial_en_memoria(n, contexto):
+    cliente = AgroClimaClient(**contexto["stub"].urls())
+    puntos = generar_sitios(n)[["lat", "lon"]].to_numpy()
+    return lambda: [cliente.obtener_todo(lat, lon) for lat, lon in puntos]
+
+
+def caso_obtener_lote(n, contexto):
+    cliente = AgroClimaClient(**contexto["stub"].urls())
+    puntos = generar_sitios(n)[["lat", "lon"]].to_numpy()
+    return lambda: cliente.obtener_lote(puntos, peticiones_por_segundo=None)
+
+
+# nombre -> (caso, tamaños aplicables, usa el servidor simulado)
+CASOS = {
+    "cargar_reglas": (caso_cargar_reglas, [1, 1_000], False),
+    "analizar": (caso_analizar, [1, 1_000, 100_000], False),
+    "recomendar": (caso_recomendar, [1, 1_000], False),
+    "analizar_lote": (caso_analizar_lote, TAMANOS, False),
+    "generar_consejos_experto": (caso_generar_consejos, [1, 1_000, 100_000], False),
+    "consejos_lote": (caso_consejos_lote, TAMANOS, False),
+    "ranking_siembra": (caso_ranking_siembra, [1, 1_000, 100_000], False),
+    "obtener_todo": (caso_obtener_todo, [1], True),
+    "obtener_todo_historial_en_memoria": (caso_obtener_todo_historial_en_memoria, [1], True),
+    "obtener_lote": (caso_obtener_lote, [1, 1_000], True),
+}
+
+
+def _metadatos(latencia):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "latencia_stub": latencia,
+    }
+
+
+def ejecutar(casos=None, tamanos=None, latencia=0.02, min_segundos=0.2, progreso=True):
+    """
+    Ejecuta los casos pedidos y devuelve el informe {metadatos, resultados}.
+    """
+    casos = casos or list(CASOS)
+    tamanos = tamanos or TAMANOS
+    contexto = {"analista": AgroAnalisis()}
+    stub = None
+    if any(CASOS[nombre][2] for nombre in casos):
+        stub = contexto["stub"] = ServidorStub(latencia=latencia).iniciar()
+
+    resultados = []
+    try:
+        for nombre in casos:
+            caso, aplicables, _ = CASOS[nombre]
+            for n in [t for t in aplicables if t in tamanos]:
+                tiempos = medir(caso(n, contexto), min_segundos=min_segundos)
+                mediana = statistics.median(tiempos)
+                resultados.append({
+                    "caso": nombre,
+                    "tamano": n,
+                    "repeticiones": len(tiempos),
+                    "min_s": min(tiempos),
+                    "mediana_s": mediana,
+                    "media_s": statistics.fmean(tiempos),
+                    "max_s": max(tiempos),
+                    "sitios_por_segundo": n / mediana if mediana else None,
+                })
+                if progreso:
+                    print(f"{nombre:<26} n={n:<9} mediana={mediana * 1e3:10.3f} ms "
+                          f"({n / mediana:,.0f} sitios/s)", file=sys.stderr)
+    finally:
+        if stub is not None: stub.detener()
+
+    return {"metadatos": _metadatos(latencia), "resultados": resultados}
+
+
+def comparar(actual, base, umbral=1.2):
+    """
+    Compara medianas contra un informe base. Devuelve las filas
+    (caso, tamano, base_s, actual_s, ratio) y si alguna supera el umbral.
+    """
+    previos = {(r["caso"], r["tamano"]): r["mediana_s"] for r in base["resultados"]}
+    filas = []
+    for r in actual["resultados"]:
+        clave = (r["caso"], r["tamano"])
+        if clave in previos and previos[clave]:
+            filas.append((*clave, previos[clave], r["mediana_s"], r["mediana_s"] / previos[clave]))
+    return filas, any(ratio > umbral for *_, ratio in filas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Mide los caminos críticos de ApiAgro.")
+    parser.add_argument("--casos", nargs="+", choices=list(CASOS), default=list(CASOS))
+    parser.add_argument("--tamanos", nargs="+", type=int, default=TAMANOS)
+    parser.add_argument("--latencia", type=float, default=0.02, help="Latencia del servidor simulado (s)")
+    parser.add_argument("--min-segundos", type=float, default=0.2, help="Tiempo mínimo medido por caso")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--umbral", type=float, default=1.2, help="Ratio máximo aceptado contra la base")
+    args = parser.parse_args(argv)
+
+    informe = ejecutar(args.casos, args.tamanos, args.latencia, args.min_segundos)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        filas, regresion = comparar(informe, base, args.umbral)
+        for caso, n, previo, actual, ratio in filas:
+            marca = "⚠️" if ratio > args.umbral else "  "
+            print(f"{marca} {caso:<26} n={n:<9} {previo * 1e3:10.3f} -> {actual * 1e3:10.3f} ms (x{ratio:.2f})")
+        if regresion:
+            sys.exit(1)
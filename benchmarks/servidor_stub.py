@@ -0,0 +1,145 @@
+"""
+SERVIDOR OPEN-METEO SIMULADO (benchmarks/servidor_stub.py)
+Servidor HTTP local que imita los endpoints de pronóstico, archivo y
+geocodificación con una latencia configurable, para medir AgroClimaClient sin
+depender de la red. Acepta listas de coordenadas separadas por comas como la API real.
+"""
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Días del archivo simulado (un año, como la consulta real de 365 días)
+_FECHAS = [date(2024, 1, 1) + timedelta(days=i) for i in range(366)]
+
+
+def _pronostico(lat, lon):
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "elevation": round(abs(lat) * 150 + abs(lon) * 10, 1),
+        "current": {"temperature_2m": round(25 - abs(lat) * 0.5, 1), "relative_humidity_2m": 65},
+        "daily": {"sunshine_duration": [36000.0]},
+    }
+
+
+def _archivo(lat, lon):
+    diaria = round(abs(lat + lon) % 5, 2)
+    tmin = round(18 - abs(lat) * 0.5, 1)
+    return {"latitude": lat, "longitude": lon, "daily": {
+        "time": [str(d) for d in _FECHAS],
+        "precipitation_sum": [diaria] * 366,
+        "temperature_2m_min": [tmin] * 366,
+        "temperature_2m_max": [tmin + 10] * 366,
+        "et0_fao_evapotranspiration": [3.5] * 366,
+        "relative_humidity_2m_mean": [70] * 366,
+    }}
+
+
+def _geocodificacion(nombre):
+    return {"results": [
+        {"name": f"{nombre} {i}", "country": "Perú", "country_code": "PE", "admin1": "Lima",
+         "latitude": -12.0 - i, "longitude": -77.0 + i}
+        for i in range(5)
+    ]}
+
+
+class ServidorStub:
+    """
+    Servidor simulado en 127.0.0.1 (puerto libre). Se usa como contexto:
+
+        with ServidorStub(latencia=0.05) as stub:
+            cliente = AgroClimaClient(**stub.urls())
+
+    - latencia: segundos de espera por petición antes de responder.
+    - peticiones: contador de peticiones atendidas (por ruta).
+    - fallar_siguientes(n, estado): las próximas n peticiones responden con ese
+      código de error (para probar reintentos y el circuit breaker).
+    """
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.peticiones = {}
+        self._fallos_pendientes = 0
+        self._estado_fallo = 503
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._manejador())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    def _manejador(self):
+        stub = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.peticiones[url.path] = stub.peticiones.get(url.path, 0) + 1
+                    fallar = stub._fallos_pendientes > 0
+                    if fallar: stub._fallos_pendientes -= 1
+                if stub.latencia: time.sleep(stub.latencia)
+
+                if fallar:
+                    self.send_response(stub._estado_fallo)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if url.path.endswith("/search"):
+                    cuerpo = _geocodificacion(params.get("name", ""))
+                else:
+                    generar = _archivo if url.path.endswith("/archive") else _pronostico
+                    lats = [float(x) for x in params.get("latitude", "0").split(",")]
+                    lons = [float(x) for x in params.get("longitude", "0").split(",")]
+                    respuestas = [generar(lat, lon) for lat, lon in zip(lats, lons)]
+                    cuerpo = respuestas[0] if len(respuestas) == 1 else respuestas
+
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+    def fallar_siguientes(self, n, estado=503):
+        with self._lock:
+            self._fallos_pendientes = n
+            self._estado_fallo = estado
+        return self
+
+    def urls(self):
+        """
+        Argumentos *_url para AgroClimaClient apuntando a este servidor.
+        """
+        host, puerto = self._servidor.server_address
+        base = f"http://{host}:{puerto}"
+        return {
+            "weather_url": f"{base}/v1/forecast",
+            "archive_url": f"{base}/v1/archive",
+            "geocoding_url": f"{base}/v1/search",
+        }
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
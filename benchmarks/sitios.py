@@ -0,0 +1,68 @@
+"""
+GENERADOR DE SITIOS SINTÉTICOS (benchmarks/sitios.py)
+Produce tablas de sitios con las mismas columnas que AgroClimaClient.obtener_lote,
+con valores reproducibles (semilla fija) que recorren todos los umbrales de las reglas.
+"""
+import numpy as np
+import pandas as pd
+
+
+def generar_sitios(n, semilla=0):
+    """
+    DataFrame de n sitios con columnas lat, lon, temp_actual, humedad,
+    precipitacion_anual_estimada, altitud, pendiente, horas_luz y ph.
+    """
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "lat": rng.uniform(-18.0, 0.0, n),
+        "lon": rng.uniform(-81.0, -68.0, n),
+        "temp_actual": rng.uniform(-5.0, 35.0, n).round(1),
+        "humedad": rng.uniform(10.0, 100.0, n).round(0),
+        "precipitacion_anual_estimada": rng.uniform(0.0, 2500.0, n).round(1),
+        "altitud": rng.uniform(0.0, 4800.0, n).round(0),
+        "pendiente": rng.uniform(0.0, 40.0, n).round(1),
+        "horas_luz": rng.uniform(4.0, 12.0, n).round(1),
+        "ph": rng.uniform(4.0, 9.0, n).round(1),
+    })
+
+
+def datos_api(sitios):
+    """
+    Lista de objetos anidados (clima/topografia/solar/suelo), como los de obtener_todo.
+    """
+    return [
+        {
+            "clima": {
+                "temp_actual": fila["temp_actual"],
+                "humedad": fila["humedad"],
+                "precipitacion_anual_estimada": fila["precipitacion_anual_estimada"],
+            },
+            "topografia": {"altitud": fila["altitud"], "pendiente": fila["pendiente"]},
+            "solar": {"horas_luz": fila["horas_luz"]},
+            "suelo": {"ph": fila["ph"]},
+        }
+        for fila in sitios.to_dict("records")
+    ]
+
+
+def generar_series(n, dias=365, semilla=0):
+    """
+    SeriesDiarias sintéticas de n sitios: temperatura con ciclo anual, lluvia
+    con días secos, ET0 y humedad, en float32 como las del archivo.
+    """
+    from src.indicadores import SeriesDiarias
+
+    rng = np.random.default_rng(semilla)
+    dia = np.arange(dias, dtype=np.float32)
+    media = rng.uniform(2.0, 26.0, (n, 1)).astype(np.float32)
+    estacion = rng.uniform(2.0, 8.0, (n, 1)).astype(np.float32) * np.sin(2 * np.pi * dia / 365)
+    tmin = media + estacion - rng.uniform(2.0, 6.0, (n, dias)).astype(np.float32)
+    variables = {
+        "tmin": tmin,
+        "tmax": tmin + rng.uniform(6.0, 14.0, (n, dias)).astype(np.float32),
+        "precipitacion": np.where(rng.random((n, dias)) < 0.3, rng.exponential(8.0, (n, dias)), 0).astype(np.float32),
+        "et0": rng.uniform(2.0, 5.0, (n, dias)).astype(np.float32),
+        "humedad": rng.uniform(40.0, 95.0, (n, dias)).astype(np.float32),
+    }
+    sitios = generar_sitios(n, semilla)
+    return SeriesDiarias(sitios["lat"], sitios["lon"], np.datetime64("2024-01-01"), variables)
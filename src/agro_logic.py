@@ -1,5 +1,238 @@
+import numpy as np
 import pandas as pd
-import os
+
+from src.metricas import SIN_METRICAS, medido
+from src.reglas import obtener_registro
+
+# Categorías disponibles en el repositorio de datos técnicos (data/referencias)
+CATEGORIAS = ["cultivos", "bovinos", "porcinos", "aves"]
+
+# Variables de sitio que consume el motor por lotes y su valor por defecto
+# (mismos valores que usa AgroClimaClient cuando la API no entrega el dato)
+VARIABLES_SITIO = {
+    "temp_actual": np.nan,
+    "humedad": np.nan,
+    "precipitacion_anual_estimada": np.nan,
+    "altitud": np.nan,
+    "pendiente": 0.0,
+    "ph": 6.5,
+}
+
+# Códigos de razón (bits) devueltos por el análisis por lotes
+RAZON_TEMPERATURA = 1
+RAZON_PENDIENTE = 2
+RAZON_PH = 4
+RAZON_LLUVIA = 8
+RAZON_ALTITUD = 16
+RAZON_HUMEDAD = 32
+
+DESCRIPCION_RAZONES = {
+    RAZON_TEMPERATURA: "Temperatura fuera de rango",
+    RAZON_PENDIENTE: "Pendiente excesiva",
+    RAZON_PH: "pH inadecuado",
+    RAZON_LLUVIA: "Falta de agua",
+    RAZON_ALTITUD: "Altitud excesiva",
+    RAZON_HUMEDAD: "Humedad alta",
+}
+
+
+def describir_codigos(codigo):
+    """
+    Traduce un código de razón (combinación de bits) a su lista de etiquetas.
+    """
+    return [texto for bit, texto in DESCRIPCION_RAZONES.items() if int(codigo) & bit]
+
+
+def puntuar_matriz(sitios, reglas):
+    """
+    PROCESAMIENTO VECTORIZADO:
+    Aplica las mismas penalizaciones que AgroAnalisis.analizar sobre todas las
+    combinaciones (sitio x variedad) mediante broadcasting de NumPy.
+
+    - sitios: dict con un array (n,) por cada clave de VARIABLES_SITIO.
+    - reglas: dict con un array (m,) por columna técnica más 'es_cultivo' (bool).
+    Devuelve (scores int64 (n, m), codigos uint8 (n, m)).
+    """
+    temp = np.asarray(sitios["temp_actual"], dtype=float)[:, None]
+    humedad = np.asarray(sitios["humedad"], dtype=float)[:, None]
+    lluvia = np.asarray(sitios["precipitacion_anual_estimada"], dtype=float)[:, None]
+    altitud = np.asarray(sitios["altitud"], dtype=float)[:, None]
+    pendiente = np.asarray(sitios["pendiente"], dtype=float)[:, None]
+    ph = np.asarray(sitios["ph"], dtype=float)[:, None]
+
+    cultivo = np.asarray(reglas["es_cultivo"], dtype=bool)[None, :]
+    animal = ~cultivo
+
+    # --- 1. VALIDACIONES COMUNES ---
+    fuera_temp = ~((reglas["temp_min"] <= temp) & (temp <= reglas["temp_max"]))
+    exceso_pendiente = pendiente > reglas["pendiente_max"]
+
+    # --- 2. VALIDACIONES POR TIPO DE ESPECIE ---
+    ph_malo = cultivo & ~((reglas["ph_min"] <= ph) & (ph <= reglas["ph_max"]))
+    falta_agua = cultivo & (lluvia < reglas["precip_min_mm"])
+    exceso_altitud = animal & (altitud > reglas["altitud_max_m"])
+    exceso_humedad = animal & (humedad > reglas["humedad_max"])
+
+    penalizacion = (
+        20 * fuera_temp
+        + np.where(cultivo, 30, 15) * exceso_pendiente
+        + 25 * ph_malo
+        + 20 * falta_agua
+        + 40 * exceso_altitud
+        + 10 * exceso_humedad
+    )
+    scores = np.clip(100 - penalizacion, 0, 100).astype(np.int64)
+
+    codigos = (
+        RAZON_TEMPERATURA * fuera_temp
+        + RAZON_PENDIENTE * exceso_pendiente
+        + RAZON_PH * ph_malo
+        + RAZON_LLUVIA * falta_agua
+        + RAZON_ALTITUD * exceso_altitud
+        + RAZON_HUMEDAD * exceso_humedad
+    ).astype(np.uint8)
+    return scores, codigos
+
+
+# Variedades a partir de las cuales la poda por cotas ahorra más de lo que cuesta
+PODA_MIN_VARIEDADES = 5000
+
+
+def cota_superior(sitios, reglas):
+    """
+    PODA POR COTAS:
+    Score máximo que puede alcanzar cada (sitio, variedad) evaluando solo las
+    validaciones de mayor peso (altitud, pendiente y pH); las restantes solo pueden
+    bajarlo. Permite descartar variedades antes del puntaje completo.
+    Mismas entradas que puntuar_matriz; devuelve int64 (n, m).
+    """
+    altitud = np.asarray(sitios["altitud"], dtype=float)[:, None]
+    pendiente = np.asarray(sitios["pendiente"], dtype=float)[:, None]
+    ph = np.asarray(sitios["ph"], dtype=float)[:, None]
+    cultivo = np.asarray(reglas["es_cultivo"], dtype=bool)[None, :]
+
+    penalizacion = (
+        np.where(cultivo, 30, 15) * (pendiente > reglas["pendiente_max"])
+        + 25 * (cultivo & ~((reglas["ph_min"] <= ph) & (ph <= reglas["ph_max"])))
+        + 40 * (~cultivo & (altitud > reglas["altitud_max_m"]))
+    )
+    return np.clip(100 - penalizacion, 0, 100).astype(np.int64)
+
+
+# Sección de datos_api (salida de obtener_todo) donde vive cada variable de sitio
+SECCION_VARIABLE = {
+    "temp_actual": "clima",
+    "humedad": "clima",
+    "precipitacion_anual_estimada": "clima",
+    "altitud": "topografia",
+    "pendiente": "topografia",
+    "ph": "suelo",
+}
+
+
+# --- VALIDACIONES INDIVIDUALES: (regla, valores) -> (penalización, razón o None) ---
+
+def _validar_temperatura(regla, v):
+    # Validación de Temperatura (API vs CSV)
+    if not (regla['temp_min'] <= v['temp_actual'] <= regla['temp_max']):
+        return 20, f"⚠️ Temperatura actual ({v['temp_actual']}°C) fuera de rango ideal ({regla['temp_min']}-{regla['temp_max']}°C)."
+    return 0, f"✅ Temperatura adecuada."
+
+
+def _validar_pendiente(regla, v):
+    # Validación de Pendiente del Terreno
+    if v['pendiente'] > regla['pendiente_max']:
+        penalizacion = 30 if "Cultivo" in regla['especie'] else 15
+        return penalizacion, f"⛔ Pendiente del terreno ({v['pendiente']:.1f}%) excede el máximo permitido ({regla['pendiente_max']}%)."
+    return 0, None
+
+
+def _validar_ph(regla, v):
+    if not (regla['ph_min'] <= v['ph'] <= regla['ph_max']):
+        return 25, f"⚠️ pH del suelo ({v['ph']}) inadecuado. Ideal: {regla['ph_min']}-{regla['ph_max']}."
+    return 0, f"✅ pH del suelo óptimo."
+
+
+def _validar_lluvia(regla, v):
+    lluvia = v['precipitacion_anual_estimada']
+    if lluvia < regla['precip_min_mm']:
+        return 20, f"💧 Falta de agua estimada ({lluvia:.0f}mm). Requiere: {regla['precip_min_mm']}mm."
+    return 0, None
+
+
+def _validar_altitud(regla, v):
+    if v['altitud'] > regla['altitud_max_m']:
+        return 40, f"⛔ Altitud excesiva ({v['altitud']:.0f} msnm). Riesgo de mal de altura (Máx: {regla['altitud_max_m']}m)."
+    return 0, f"✅ Altitud segura."
+
+
+def _validar_humedad(regla, v):
+    if v['humedad'] > regla['humedad_max']:
+        return 10, f"⚠️ Humedad alta ({v['humedad']}%). Riesgo de patógenos."
+    return 0, None
+
+
+# Validaciones por tipo de especie, en el orden en que se informan: (nombre, variable, función)
+# 1. Comunes (Temperatura y Pendiente); 2. pH/Lluvia para cultivos, Altitud/Humedad para animales.
+VALIDACIONES_CULTIVO = [
+    ("temperatura", "temp_actual", _validar_temperatura),
+    ("pendiente", "pendiente", _validar_pendiente),
+    ("ph", "ph", _validar_ph),
+    ("lluvia", "precipitacion_anual_estimada", _validar_lluvia),
+]
+VALIDACIONES_ANIMAL = [
+    ("temperatura", "temp_actual", _validar_temperatura),
+    ("pendiente", "pendiente", _validar_pendiente),
+    ("altitud", "altitud", _validar_altitud),
+    ("humedad", "humedad", _validar_humedad),
+]
+
+
+class EvaluacionSitio:
+    """
+    Resultado intermedio de 'analizar' para un sitio y una variedad.
+    Guarda la penalización y la razón de cada validación; actualizar() recalcula
+    solo las validaciones que dependen de los datos cambiados y ajusta el score
+    con la diferencia de penalización.
+    """
+
+    def __init__(self, regla, datos_api):
+        self.regla = regla
+        self.validaciones = VALIDACIONES_CULTIVO if "Cultivo" in regla['especie'] else VALIDACIONES_ANIMAL
+        self.valores = {
+            variable: datos_api[SECCION_VARIABLE[variable]][variable]
+            for _, variable, _ in self.validaciones
+        }
+        self.resultados = {nombre: validar(regla, self.valores) for nombre, _, validar in self.validaciones}
+        self.penalizacion = sum(penalizacion for penalizacion, _ in self.resultados.values())
+
+    def actualizar(self, **cambios):
+        """
+        Aplica nuevos valores (p. ej. ph=5.2, pendiente=12) y devuelve el score.
+        """
+        for variable in cambios:
+            if variable not in SECCION_VARIABLE:
+                raise ValueError(f"Variable de sitio desconocida: '{variable}'")
+        self.valores.update(cambios)
+        for nombre, variable, validar in self.validaciones:
+            if variable in cambios:
+                anterior = self.resultados[nombre][0]
+                self.resultados[nombre] = validar(self.regla, self.valores)
+                self.penalizacion += self.resultados[nombre][0] - anterior
+        return self.score
+
+    @property
+    def score(self):
+        # Normalización del Score final
+        return max(0, min(100, 100 - self.penalizacion))
+
+    def resultado(self):
+        """
+        (score, razones, riesgo_extra), igual que AgroAnalisis.analizar.
+        """
+        razones = [razon for _, razon in self.resultados.values() if razon is not None]
+        return self.score, razones, self.regla.get('riesgo_extra', 'N/A')
+
 
 class AgroAnalisis:
     """
@@ -9,22 +242,27 @@ class AgroAnalisis:
     determinar la viabilidad agropecuaria mediante un sistema de puntaje (Score).
     """
 
-    def __init__(self):
+    def __init__(self, registro=None, metricas=None):
         # ESTRUCTURACIÓN: Ruta base hacia el repositorio de datos técnicos
         self.base_path = "data/referencias"
+        # Registro compartido de reglas compiladas (se carga una vez por proceso)
+        self.registro = registro or obtener_registro(self.base_path)
+        # Instrumentación opcional (tiempo de puntaje por sitio y por lote)
+        self.metricas = metricas or SIN_METRICAS
 
     def cargar_reglas(self, categoria):
         """
         ESTRUCTURACIÓN DE DATOS:
-        Utiliza Pandas para cargar archivos estructurados (.CSV) dinámicamente.
-        Normaliza la fuente de datos para su procesamiento en memoria.
+        Devuelve las reglas de la categoría como DataFrame de Pandas (.CSV).
+        La lectura la resuelve el RegistroReglas, que solo vuelve a parsear el
+        archivo si cambió en disco. El DataFrame es compartido: no modificarlo.
         """
-        archivo = os.path.join(self.base_path, f"{categoria}.csv")
         try:
-            return pd.read_csv(archivo)
+            return self.registro.dataframe(categoria)
         except FileNotFoundError:
             return None
 
+    @medido("latencia_puntaje", operacion="analizar")
     def analizar(self, datos_api, categoria, variedad_nombre):
         """
         PROCESAMIENTO LÓGICO Y CÁLCULO DE APTITUD:
@@ -36,59 +274,144 @@ class AgroAnalisis:
         """
         df = self.cargar_reglas(categoria)
         if df is None: return 0, ["Error al cargar datos"], "N/A"
+        return self.evaluacion(datos_api, categoria, variedad_nombre).resultado()
 
-        # Localización de la regla específica mediante filtrado en DataFrame
-        regla = df[df['variedad'] == variedad_nombre].iloc[0]
-        
-        clima = datos_api['clima']
-        topo = datos_api['topografia']
-        suelo = datos_api['suelo']
-        
-        score = 100
-        razones = []
+    def evaluacion(self, datos_api, categoria, variedad_nombre):
+        """
+        EVALUACIÓN INCREMENTAL:
+        Devuelve una EvaluacionSitio que guarda el resultado de cada validación,
+        para recalcular solo las afectadas cuando el usuario cambia un dato
+        (p. ej. evaluacion.actualizar(ph=5.2)). Lanza KeyError si la variedad no existe;
+        las variables de sitio ausentes (p. ej. la pendiente del objeto de respaldo)
+        toman su valor por defecto.
+        """
+        # Localización de la regla específica (índice por variedad, O(1))
+        regla = self.registro.regla(categoria, variedad_nombre)
+        return EvaluacionSitio(regla, self._completar(datos_api))
 
-        # --- 1. PROCESAMIENTO: VALIDACIONES COMUNES ---
-        
-        # Validación de Temperatura (API vs CSV)
-        if not (regla['temp_min'] <= clima['temp_actual'] <= regla['temp_max']):
-            score -= 20
-            razones.append(f"⚠️ Temperatura actual ({clima['temp_actual']}°C) fuera de rango ideal ({regla['temp_min']}-{regla['temp_max']}°C).")
-        else:
-            razones.append(f"✅ Temperatura adecuada.")
-
-        # Validación de Pendiente del Terreno
-        if topo['pendiente'] > regla['pendiente_max']:
-            penalizacion = 30 if "Cultivo" in regla['especie'] else 15
-            score -= penalizacion
-            razones.append(f"⛔ Pendiente del terreno ({topo['pendiente']:.1f}%) excede el máximo permitido ({regla['pendiente_max']}%).")
-        
-        # --- 2. PROCESAMIENTO: VALIDACIONES POR TIPO DE ESPECIE ---
+    def barrido(self, datos_api, variable, valores, categorias=None):
+        """
+        ANÁLISIS "QUÉ PASA SI":
+        Puntúa el sitio para cada valor de 'variable' (columna de VARIABLES_SITIO,
+        p. ej. 'ph' de 3.0 a 10.0) contra todas las variedades en una sola pasada
+        vectorizada. Devuelve un DataFrame valores x (categoria, variedad).
+        """
+        if variable not in VARIABLES_SITIO:
+            raise ValueError(f"Variable de sitio desconocida: '{variable}'")
+        valores = np.asarray(valores, dtype=float)
+        tabla, reglas = self.registro.tabla(categorias or CATEGORIAS)
 
-        if "Cultivo" in regla['especie']:
-            # Lógica para Vegetales: Validar pH y Necesidad Hídrica (Lluvia Real Anual)
-            if not (regla['ph_min'] <= suelo['ph'] <= regla['ph_max']):
-                score -= 25
-                razones.append(f"⚠️ pH del suelo ({suelo['ph']}) inadecuado. Ideal: {regla['ph_min']}-{regla['ph_max']}.")
-            else:
-                razones.append(f"✅ pH del suelo óptimo.")
-            
-            lluvia = clima['precipitacion_anual_estimada']
-            if lluvia < regla['precip_min_mm']:
-                score -= 20
-                razones.append(f"💧 Falta de agua estimada ({lluvia:.0f}mm). Requiere: {regla['precip_min_mm']}mm.")
-        
-        else:
-            # Lógica para Animales: Validar Altitud (Estrés por Hipoxia) y Humedad (Sanidad)
-            if topo['altitud'] > regla['altitud_max_m']:
-                score -= 40
-                razones.append(f"⛔ Altitud excesiva ({topo['altitud']:.0f} msnm). Riesgo de mal de altura (Máx: {regla['altitud_max_m']}m).")
-            else:
-                razones.append(f"✅ Altitud segura.")
+        sitios = {columna: np.full(len(valores), valor) for columna, valor in self._valores_sitio(datos_api).items()}
+        sitios[variable] = valores
 
-            if clima['humedad'] > regla['humedad_max']:
-                score -= 10
-                razones.append(f"⚠️ Humedad alta ({clima['humedad']}%). Riesgo de patógenos.")
+        scores, _ = puntuar_matriz(sitios, reglas)
+        return pd.DataFrame(
+            scores,
+            index=pd.Index(valores, name=variable),
+            columns=pd.MultiIndex.from_frame(tabla[["categoria", "variedad"]]),
+        )
 
-        # Normalización del Score final
-        score = max(0, min(100, score))
-        return score, razones, regla.get('riesgo_extra', 'N/A')
\ No newline at end of file
+    @staticmethod
+    def _valores_sitio(datos_api):
+        """
+        Valor float de cada variable de VARIABLES_SITIO en datos_api (o su valor por defecto).
+        """
+        return {
+            columna: float(datos_api[SECCION_VARIABLE[columna]].get(columna, defecto))
+            for columna, defecto in VARIABLES_SITIO.items()
+        }
+
+    @staticmethod
+    def _completar(datos_api):
+        """
+        datos_api con todas las variables de VARIABLES_SITIO (las faltantes con su valor
+        por defecto). Los valores presentes se conservan tal cual.
+        """
+        if all(columna in datos_api.get(SECCION_VARIABLE[columna], ()) for columna in VARIABLES_SITIO):
+            return datos_api
+        datos = {seccion: dict(valores) for seccion, valores in datos_api.items() if isinstance(valores, dict)}
+        for columna, defecto in VARIABLES_SITIO.items():
+            datos.setdefault(SECCION_VARIABLE[columna], {}).setdefault(columna, defecto)
+        return datos
+
+    @medido("latencia_puntaje", operacion="recomendar")
+    def recomendar(self, datos_api, categorias=None, top=5, umbral=50):
+        """
+        RECOMENDACIÓN MULTI-VARIEDAD:
+        ¿Qué producir en este sitio? Puntúa los mismos datos de la API contra todas
+        las variedades de todas las categorías en una sola pasada y devuelve las
+        'top' mejores con score >= umbral, ordenadas de mayor a menor.
+        1. Poda (solo con tablas de PODA_MIN_VARIEDADES o más): se descartan las
+           variedades cuya cota superior no alcanza el umbral.
+        2. Puntaje vectorizado (puntuar_matriz) de las restantes.
+        3. Razones detalladas (las mismas de 'analizar') solo para las elegidas.
+        Devuelve una lista de dicts: puesto, categoria, variedad, especie, score,
+        razones y riesgo_extra.
+        """
+        _, reglas, etiquetas = self.registro.tabla(categorias or CATEGORIAS, con_etiquetas=True)
+        datos = self._completar(datos_api)
+        sitio = {columna: np.array([valor]) for columna, valor in self._valores_sitio(datos).items()}
+
+        vivas = np.arange(len(etiquetas["variedad"]))
+        if len(vivas) >= PODA_MIN_VARIEDADES:
+            vivas = np.flatnonzero(cota_superior(sitio, reglas)[0] >= umbral)
+            self.metricas.contar("variedades_podadas", len(etiquetas["variedad"]) - len(vivas))
+            reglas = {columna: arreglo[vivas] for columna, arreglo in reglas.items()}
+        scores = puntuar_matriz(sitio, reglas)[0][0]
+
+        orden = np.argsort(-scores, kind="stable")[:top]
+        elegidas = vivas[orden[scores[orden] >= umbral]]
+
+        recomendaciones = []
+        for puesto, k in enumerate(elegidas, start=1):
+            score, razones, riesgo = EvaluacionSitio(etiquetas["regla"][k], datos).resultado()
+            recomendaciones.append({
+                "puesto": puesto,
+                "categoria": etiquetas["categoria"][k],
+                "variedad": etiquetas["variedad"][k],
+                "especie": etiquetas["especie"][k],
+                "score": int(score),
+                "razones": razones,
+                "riesgo_extra": riesgo,
+            })
+        return recomendaciones
+
+    def tabla_reglas(self, categorias=None):
+        """
+        ESTRUCTURACIÓN DE DATOS:
+        Une las reglas de varias categorías en un único DataFrame (una fila por
+        variedad) con una columna 'categoria'. Las columnas que no aplican a una
+        especie quedan como NaN.
+        """
+        return self.registro.tabla(categorias or CATEGORIAS)[0]
+
+    def analizar_lote(self, sitios, categorias=None):
+        """
+        PROCESAMIENTO POR LOTES:
+        Evalúa muchos sitios contra todas las variedades de las categorías pedidas
+        en una sola pasada vectorizada (mismas penalizaciones que 'analizar').
+
+        - sitios: DataFrame (o dict de arrays) con las columnas de VARIABLES_SITIO;
+          'pendiente' y 'ph' son opcionales y toman los valores por defecto de la API.
+        Devuelve (scores, codigos): DataFrames sitios x (categoria, variedad). Los
+        códigos se traducen con describir_codigos.
+        """
+        if not isinstance(sitios, pd.DataFrame):
+            sitios = pd.DataFrame(sitios)
+        tabla, reglas = self.registro.tabla(categorias or CATEGORIAS)
+
+        entradas = {}
+        for columna, defecto in VARIABLES_SITIO.items():
+            if columna in sitios:
+                entradas[columna] = sitios[columna].to_numpy(dtype=float)
+            else:
+                entradas[columna] = np.full(len(sitios), defecto)
+
+        with self.metricas.medir("latencia_puntaje", operacion="analizar_lote"):
+            scores, codigos = puntuar_matriz(entradas, reglas)
+        self.metricas.contar("sitios_puntuados", len(sitios))
+        columnas = pd.MultiIndex.from_frame(tabla[["categoria", "variedad"]])
+        return (
+            pd.DataFrame(scores, index=sitios.index, columns=columnas),
+            pd.DataFrame(codigos, index=sitios.index, columns=columnas),
+        )
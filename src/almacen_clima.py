@@ -0,0 +1,176 @@
+"""
+MÓDULO DE ALMACÉN CLIMÁTICO LOCAL (almacen_clima.py)
+Malla regular lat/lon guardada en disco (un .npy float32 por variable + meta.json)
+que se abre con memoria mapeada: consultar un punto lee solo las 4 celdas vecinas
+e interpola de forma bilineal, sin red. AgroClimaClient lo usa como camino rápido
+antes de cualquier petición HTTP, y permite trabajar sin conexión en campo.
+"""
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# Variables guardadas en la malla (mismos nombres que las columnas de obtener_lote)
+VARIABLES_CLIMA = ["temp_actual", "humedad", "precipitacion_anual_estimada", "altitud", "horas_luz"]
+
+
+class AlmacenClima:
+    """
+    Almacén de solo lectura. Estructura de la carpeta:
+        meta.json              -> {lat_min, lon_min, resolucion, filas, columnas, variables}
+        <variable>.npy         -> float32 (filas x columnas), NaN = sin dato
+    El nodo (i, j) está en (lat_min + i * resolucion, lon_min + j * resolucion).
+    """
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        with open(os.path.join(carpeta, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.lat_min = self.meta["lat_min"]
+        self.lon_min = self.meta["lon_min"]
+        self.resolucion = self.meta["resolucion"]
+        self.filas = self.meta["filas"]
+        self.columnas = self.meta["columnas"]
+        self.variables = self.meta["variables"]
+        self._mallas = {
+            variable: np.load(os.path.join(carpeta, f"{variable}.npy"), mmap_mode="r")
+            for variable in self.variables
+        }
+
+    def contiene(self, lat, lon):
+        fila = (lat - self.lat_min) / self.resolucion
+        columna = (lon - self.lon_min) / self.resolucion
+        return 0 <= fila <= self.filas - 1 and 0 <= columna <= self.columnas - 1
+
+    def _interpolar(self, lats, lons):
+        """
+        INTERPOLACIÓN BILINEAL VECTORIZADA: dict variable -> array. Los puntos
+        fuera de la malla o con algún vecino sin dato quedan en NaN.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        fila = (lats - self.lat_min) / self.resolucion
+        columna = (lons - self.lon_min) / self.resolucion
+        dentro = (fila >= 0) & (fila <= self.filas - 1) & (columna >= 0) & (columna <= self.columnas - 1)
+
+        # Índice del nodo inferior-izquierdo (acotado para que i0 + 1 exista)
+        i0 = np.clip(np.floor(np.where(dentro, fila, 0)), 0, max(self.filas - 2, 0)).astype(np.intp)
+        j0 = np.clip(np.floor(np.where(dentro, columna, 0)), 0, max(self.columnas - 2, 0)).astype(np.intp)
+        i1 = np.minimum(i0 + 1, self.filas - 1)
+        j1 = np.minimum(j0 + 1, self.columnas - 1)
+        ti = np.where(dentro, fila - i0, 0.0)
+        tj = np.where(dentro, columna - j0, 0.0)
+
+        resultado = {}
+        for variable, malla in self._mallas.items():
+            valor = (
+                malla[i0, j0] * (1 - ti) * (1 - tj)
+                + malla[i1, j0] * ti * (1 - tj)
+                + malla[i0, j1] * (1 - ti) * tj
+                + malla[i1, j1] * ti * tj
+            )
+            resultado[variable] = np.where(dentro, valor, np.nan)
+        return resultado
+
+    def consultar_lote(self, lats, lons):
+        """
+        Valores interpolados de muchos puntos: DataFrame con una fila por punto.
+        """
+        return pd.DataFrame(self._interpolar(lats, lons))
+
+    def consultar(self, lat, lon):
+        """
+        Valores interpolados en un punto (NaN si falta el dato de una variable),
+        o None si el punto está fuera de la malla.
+        """
+        if not self.contiene(lat, lon):
+            return None
+        return {variable: float(v[0]) for variable, v in self._interpolar(lat, lon).items()}
+
+
+def _crear_mallas(carpeta, bbox, resolucion, variables):
+    """
+    Crea meta.json y los .npy vacíos (NaN) de una malla que cubre el bbox.
+    """
+    lat_min, lon_min, lat_max, lon_max = bbox
+    filas = int(math.floor(round((lat_max - lat_min) / resolucion, 9))) + 1
+    columnas = int(math.floor(round((lon_max - lon_min) / resolucion, 9))) + 1
+    os.makedirs(carpeta, exist_ok=True)
+    meta = {
+        "lat_min": float(lat_min), "lon_min": float(lon_min), "resolucion": float(resolucion),
+        "filas": filas, "columnas": columnas, "variables": list(variables),
+    }
+    mallas = {}
+    for variable in variables:
+        mallas[variable] = np.lib.format.open_memmap(
+            os.path.join(carpeta, f"{variable}.npy"), mode="w+", dtype=np.float32, shape=(filas, columnas)
+        )
+        mallas[variable][:] = np.nan
+    with open(os.path.join(carpeta, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta, mallas
+
+
+def construir_desde_api(cliente, carpeta, bbox, resolucion, tam_bloque=500, progreso=None, **opciones_lote):
+    """
+    CONSTRUCTOR DESDE LA API:
+    Consulta con cliente.obtener_lote cada nodo de la malla (por bloques de filas)
+    y guarda el resultado. Los nodos cuyo pronóstico falló quedan sin dato (NaN), y
+    los nodos cuyo archivo falló quedan sin lluvia anual (NaN, no 0 mm).
+    - progreso: callback opcional (nodos_hechos, total).
+    """
+    meta, mallas = _crear_mallas(carpeta, bbox, resolucion, VARIABLES_CLIMA)
+    lats = meta["lat_min"] + np.arange(meta["filas"]) * resolucion
+    lons = meta["lon_min"] + np.arange(meta["columnas"]) * resolucion
+    filas_por_bloque = max(1, tam_bloque // meta["columnas"])
+    total = meta["filas"] * meta["columnas"]
+
+    for f0 in range(0, meta["filas"], filas_por_bloque):
+        sub_lat, sub_lon = np.meshgrid(lats[f0:f0 + filas_por_bloque], lons, indexing="ij")
+        datos = cliente.obtener_lote(zip(sub_lat.ravel(), sub_lon.ravel()), **opciones_lote)
+        valido = ~datos["respaldo"].to_numpy(dtype=bool)
+        con_archivo = valido & ~datos["respaldo_archivo"].to_numpy(dtype=bool)
+        for variable in VARIABLES_CLIMA:
+            mascara = con_archivo if variable == "precipitacion_anual_estimada" else valido
+            valores = np.where(mascara, datos[variable].to_numpy(dtype=float), np.nan)
+            mallas[variable][f0:f0 + sub_lat.shape[0]] = valores.reshape(sub_lat.shape)
+        if progreso: progreso(min(total, (f0 + sub_lat.shape[0]) * meta["columnas"]), total)
+
+    for malla in mallas.values():
+        malla.flush()
+    return AlmacenClima(carpeta)
+
+
+def construir_desde_tabla(tabla, carpeta, resolucion, bbox=None):
+    """
+    CONSTRUCTOR DESDE ARCHIVOS LOCALES:
+    'tabla' es un DataFrame o una ruta CSV/Parquet con columnas lat, lon y
+    cualquiera de VARIABLES_CLIMA (p. ej. exportada de una estación o un ráster).
+    Cada fila se asigna al nodo más cercano; varias filas en un nodo se promedian.
+    """
+    if isinstance(tabla, str):
+        tabla = pd.read_parquet(tabla) if tabla.endswith(".parquet") else pd.read_csv(tabla)
+    variables = [v for v in VARIABLES_CLIMA if v in tabla]
+    if not variables:
+        raise ValueError(f"La tabla no tiene ninguna de las variables {VARIABLES_CLIMA}")
+    if bbox is None:
+        bbox = (tabla["lat"].min(), tabla["lon"].min(), tabla["lat"].max(), tabla["lon"].max())
+
+    meta, mallas = _crear_mallas(carpeta, bbox, resolucion, variables)
+    i = np.rint((tabla["lat"].to_numpy(dtype=float) - meta["lat_min"]) / resolucion).astype(np.intp)
+    j = np.rint((tabla["lon"].to_numpy(dtype=float) - meta["lon_min"]) / resolucion).astype(np.intp)
+    dentro = (i >= 0) & (i < meta["filas"]) & (j >= 0) & (j < meta["columnas"])
+
+    for variable in variables:
+        valores = tabla[variable].to_numpy(dtype=float)
+        usar = dentro & ~np.isnan(valores)
+        suma = np.zeros((meta["filas"], meta["columnas"]))
+        cuenta = np.zeros((meta["filas"], meta["columnas"]))
+        np.add.at(suma, (i[usar], j[usar]), valores[usar])
+        np.add.at(cuenta, (i[usar], j[usar]), 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mallas[variable][:] = np.where(cuenta > 0, suma / cuenta, np.nan)
+        mallas[variable].flush()
+    return AlmacenClima(carpeta)
@@ -1,10 +1,76 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
 import requests
 import urllib3
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime, timedelta
 
+from src.historial import VARIABLES_DIARIAS, HistorialClima
+from src.metricas import SIN_METRICAS, medido
+from src.transporte import Transporte
+
 # Desactivamos alertas SSL para asegurar la compatibilidad en diferentes entornos de red
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+log = logging.getLogger(__name__)
+
+# Pool compartido para lanzar en paralelo las consultas independientes (archivo + pronóstico)
+_POOL_CONSULTAS = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agroclima")
+
+# Valores de respaldo cuando la API no responde (mismos que obtener_todo)
+RESPALDO_CLIMA = {"temp_actual": 20, "humedad": 60, "altitud": 0, "horas_luz": 12}
+
+# Variables que el almacén climático local debe tener para evitar la consulta HTTP
+VARIABLES_ALMACEN = ["temp_actual", "humedad", "precipitacion_anual_estimada", "altitud"]
+
+# Historiales diarios conservados en memoria por cliente (~8 KB de float32 cada uno;
+# la respuesta JSON original la conserva, si hay, la caché de respuestas)
+MAX_HISTORIALES = 256
+
+
+def datos_api_desde_fila(fila):
+    """
+    ESTRUCTURACIÓN: Convierte una fila del resultado columnar de obtener_lote
+    al objeto anidado (clima/topografia/solar/suelo) que devuelve obtener_todo.
+    """
+    return {
+        "clima": {
+            "temp_actual": fila["temp_actual"],
+            "humedad": fila["humedad"],
+            "precipitacion_anual_estimada": fila["precipitacion_anual_estimada"]
+        },
+        "topografia": {"altitud": fila["altitud"], "pendiente": fila["pendiente"]},
+        "solar": {"horas_luz": fila["horas_luz"]},
+        "suelo": {"ph": fila["ph"]},
+        "respaldo": bool(fila.get("respaldo", False)),
+        "respaldo_archivo": bool(fila.get("respaldo_archivo", False)),
+        "origen": fila.get("origen", "api"),
+    }
+
+
+class _LimitadorTasa:
+    """
+    Limita el número de peticiones por segundo compartido entre hilos del mismo proceso.
+    """
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._siguiente = 0.0
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        if not self.intervalo: return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora: time.sleep(turno - ahora)
+
+
 class AgroClimaClient:
     """
     MÓDULO DE EXTRACCIÓN (api_client.py)
@@ -12,111 +78,471 @@ class AgroClimaClient:
     Gestiona tres endpoints de la API Open-Meteo: Pronóstico, Archivo Histórico y Geocodificación.
     """
 
-    def __init__(self):
+    def __init__(self, cache=None, metricas=None, almacen=None, dem=None, transporte=None, nomenclator=None,
+                 weather_url="https://api.open-meteo.com/v1/forecast",
+                 archive_url="https://archive-api.open-meteo.com/v1/archive",
+                 geocoding_url="https://geocoding-api.open-meteo.com/v1/search"):
         """
         Inicializa las URLs base para los distintos servicios de extracción de datos.
+        - cache: instancia opcional de CacheRespuestas para reutilizar respuestas recientes.
+        - metricas: instancia opcional de Metricas (latencias, errores, aciertos de caché).
+        - almacen: instancia opcional de AlmacenClima; si cubre el punto se responde
+          desde disco sin ninguna petición HTTP (uso sin conexión).
+        - dem: instancia opcional de ModeloElevacion para calcular la pendiente real
+          del terreno (sin DEM, o fuera de él, la pendiente queda en 0).
+        - transporte: instancia opcional de Transporte (reintentos, circuit breaker,
+          timeouts, TLS); por defecto se crea uno con la configuración estándar.
+        - nomenclator: instancia opcional de Nomenclator; las búsquedas de lugares se
+          resuelven primero en ese índice local y la API de geocodificación queda de respaldo.
+        - *_url: permiten apuntar el cliente a un servidor local (pruebas o réplica propia).
         """
         # API de Pronóstico: Extrae variables climáticas actuales
-        self.weather_url = "https://api.open-meteo.com/v1/forecast"
+        self.weather_url = weather_url
         
         # API Histórica: Extrae acumulados anuales reales (Estructuración de datos históricos)
-        self.archive_url = "https://archive-api.open-meteo.com/v1/archive"
+        self.archive_url = archive_url
         
         # API de Búsqueda: Extrae coordenadas geográficas a partir de nombres de ciudades
-        self.geocoding_url = "https://geocoding-api.open-meteo.com/v1/search"
+        self.geocoding_url = geocoding_url
+
+        self.cache = cache
+        self.metricas = metricas or SIN_METRICAS
+        self.almacen = almacen
+        self.dem = dem
+        self.nomenclator = nomenclator
+
+        # Transporte HTTP compartido: keep-alive, reintentos, circuit breaker y coalescencia
+        self.transporte = transporte or Transporte(metricas=self.metricas)
+
+        self._historiales = OrderedDict()
+        self._lock_historiales = threading.Lock()
+
+        # Limitadores de tasa por valor de peticiones_por_segundo, compartidos por todas
+        # las llamadas masivas de este cliente (p. ej. varias sesiones de Streamlit)
+        self._limitadores = {}
+        self._lock_limitadores = threading.Lock()
 
-    def buscar_opciones_ciudades(self, nombre_ciudad):
+    def _limitador(self, por_segundo):
+        with self._lock_limitadores:
+            if por_segundo not in self._limitadores:
+                self._limitadores[por_segundo] = _LimitadorTasa(por_segundo)
+            return self._limitadores[por_segundo]
+
+    def _params_clima(self, lat, lon):
+        """
+        Parámetros del endpoint de pronóstico (clima actual + horas de sol).
+        """
+        return {
+            "latitude": lat, 
+            "longitude": lon,
+            "current": ["temperature_2m", "relative_humidity_2m"],
+            "daily": "sunshine_duration",
+            "timezone": "auto"
+        }
+
+    def _params_archivo(self, lat, lon):
+        """
+        Parámetros del endpoint histórico: serie diaria de los últimos 365 días con
+        todas las VARIABLES_DIARIAS (una sola descarga para lluvia, balance y GDD).
+        """
+        fecha_fin = datetime.now() - timedelta(days=1)
+        fecha_inicio = fecha_fin - timedelta(days=365)
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "start_date": fecha_inicio.strftime("%Y-%m-%d"),
+            "end_date": fecha_fin.strftime("%Y-%m-%d"),
+            "daily": list(VARIABLES_DIARIAS.values()),
+            "timezone": "auto"
+        }
+
+    @staticmethod
+    def _horas_luz(resp):
+        """
+        Procesar Horas Luz: Conversión de segundos a horas (Normalización).
+        """
+        horas_luz = 12.0
+        if "daily" in resp and "sunshine_duration" in resp["daily"]:
+            segundos = resp["daily"]["sunshine_duration"][0]
+            if segundos: horas_luz = round(segundos / 3600, 1)
+        return horas_luz
+
+    def _consultar(self, servicio, url, params, timeout):
+        """
+        Realiza la petición GET y devuelve el JSON, pasando primero por la caché.
+        Las respuestas de error de la API ("error": true) no se guardan.
         """
-        FUENTE: API de Geocodificación.
+        if self.cache is not None:
+            datos = self.cache.obtener(servicio, params)
+            if datos is not None:
+                self.metricas.contar("cache_aciertos", servicio=servicio)
+                return datos
+            self.metricas.contar("cache_fallos", servicio=servicio)
+
+        datos = self._get(servicio, url, params, timeout)
+
+        if self.cache is not None and not (isinstance(datos, dict) and datos.get("error")):
+            self.cache.guardar(servicio, params, datos)
+        return datos
+
+    def _get(self, servicio, url, params, timeout):
+        """
+        GET instrumentado: mide la latencia del endpoint y cuenta errores y timeouts.
+        """
+        try:
+            with self.metricas.medir("latencia_http", servicio=servicio):
+                return self.transporte.get_json(servicio, url, params, timeout=timeout)
+        except requests.Timeout:
+            self.metricas.contar("timeouts", servicio=servicio)
+            raise
+        except Exception as e:
+            self.metricas.contar("errores", servicio=servicio, error=type(e).__name__)
+            raise
+
+    def buscar_opciones_ciudades(self, nombre_ciudad, limite=5, remoto=False, estricto=False):
+        """
+        FUENTE: Nomenclátor local y API de Geocodificación.
         Busca ciudades y devuelve una lista de coordenadas (latitud/longitud).
+        Con nomenclátor se responde desde el índice local si algún lugar empieza por
+        el texto (sin red). Si no, o con remoto=True, se consulta la API y sus
+        resultados se incorporan al índice; las coincidencias aproximadas del índice
+        (errores de tipeo) solo se usan cuando la API no encuentra nada o no responde.
+        - estricto: si la API falla se propaga el error en lugar de devolver []
+          (para no confundir una caída de la red con "sin resultados").
         """
         if not nombre_ciudad: return []
+        if self.nomenclator is not None and not remoto:
+            # Solo un prefijo evita la API: un parecido aproximado puede ser otro lugar
+            opciones = self.nomenclator.buscar(nombre_ciudad, limite, aproximado=False)
+            self.metricas.contar("nomenclator_aciertos" if opciones else "nomenclator_fallos")
+            if opciones: return opciones
         try:
-            params = {"name": nombre_ciudad, "count": 5, "language": "es", "format": "json"}
-            resp = requests.get(self.geocoding_url, params=params, verify=False, timeout=5).json()
+            params = {"name": nombre_ciudad, "count": limite, "language": "es", "format": "json"}
+            resp = self._consultar("geocodificacion", self.geocoding_url, params, timeout=5)
+            if estricto and resp.get("error"):
+                raise ValueError(f"Error de la API de geocodificación: {resp.get('reason')}")
             
-            if "results" not in resp: return []
+            if "results" not in resp: return self._aproximados_locales(nombre_ciudad, limite)
                 
             opciones = []
             for r in resp["results"]:
                 label = f"{r['name']}, {r.get('country', '')}"
                 opciones.append({"label": label, "lat": r["latitude"], "lon": r["longitude"]})
+            if self.nomenclator is not None:
+                # Mismos campos que GeoNames (código ISO de país) para no duplicar lugares
+                self.nomenclator.agregar(
+                    {"nombre": r["name"], "pais": r.get("country_code", ""), "region": r.get("admin1", ""),
+                     "lat": r["latitude"], "lon": r["longitude"], "poblacion": r.get("population")}
+                    for r in resp["results"]
+                )
             return opciones
-        except:
-            return []
+        except Exception as e:
+            log.warning("Error geocodificación: %r", e)
+            self.metricas.contar("respaldos", servicio="geocodificacion")
+            if estricto: raise
+            return self._aproximados_locales(nombre_ciudad, limite)
 
-    def _obtener_lluvia_real_anual(self, lat, lon):
+    def _aproximados_locales(self, nombre_ciudad, limite):
         """
-        EXTRACCIÓN HISTÓRICA: Consulta el ARCHIVO (últimos 365 días).
-        Calcula el acumulado real de precipitaciones, evitando estimaciones genéricas.
+        Coincidencias aproximadas del nomenclátor (o [] sin nomenclátor).
         """
+        if self.nomenclator is None: return []
+        return self.nomenclator.buscar(nombre_ciudad, limite)
+
+    def obtener_historial(self, lat, lon, timeout=10):
+        """
+        EXTRACCIÓN HISTÓRICA: Consulta el ARCHIVO (últimos 365 días) y devuelve un
+        HistorialClima con precipitación, temperaturas mínima/máxima, ET0 y humedad diarias,
+        o None si la consulta falla. Los historiales recientes quedan en memoria,
+        así la lluvia anual, el balance hídrico y los GDD comparten una descarga.
+        """
+        params = self._params_archivo(lat, lon)
+        clave = (round(float(lat), 3), round(float(lon), 3), params["end_date"])
+        with self._lock_historiales:
+            historial = self._historiales.get(clave)
+            if historial is not None:
+                self._historiales.move_to_end(clave)
+                return historial
         try:
-            fecha_fin = datetime.now() - timedelta(days=1)
-            fecha_inicio = fecha_fin - timedelta(days=365)
-            
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "start_date": fecha_inicio.strftime("%Y-%m-%d"),
-                "end_date": fecha_fin.strftime("%Y-%m-%d"),
-                "daily": "precipitation_sum",
-                "timezone": "auto"
-            }
-            
-            resp = requests.get(self.archive_url, params=params, verify=False, timeout=10).json()
-            
-            if "daily" in resp and "precipitation_sum" in resp["daily"]:
-                lluvias = resp["daily"]["precipitation_sum"]
-                total = sum(x for x in lluvias if x is not None)
-                return total
-            
-            return 0.0
+            resp = self._consultar("archivo", self.archive_url, params, timeout=timeout)
         except Exception as e:
-            print(f"Error lluvia histórica: {e}")
-            return 0.0
+            log.warning("Error lluvia histórica: %r", e)
+            self.metricas.contar("respaldos", servicio="archivo")
+            return None
+        historial = HistorialClima.desde_respuesta(resp, lat, lon)
+        if historial is not None:
+            with self._lock_historiales:
+                self._historiales[clave] = historial
+                while len(self._historiales) > MAX_HISTORIALES:
+                    self._historiales.popitem(last=False)
+        return historial
+
+    def _obtener_lluvia_real_anual(self, lat, lon, timeout=10):
+        """
+        Acumulado real de precipitaciones del último año (None si el archivo no responde).
+        """
+        historial = self.obtener_historial(lat, lon, timeout=timeout)
+        return historial.lluvia_anual if historial is not None else None
 
-    def obtener_todo(self, lat, lon):
+    def _consultar_almacen(self, lat, lon):
+        """
+        Camino rápido: valores del almacén climático local o None si no cubre el punto.
+        """
+        if self.almacen is None: return None
+        local = self.almacen.consultar(lat, lon)
+        if local is None or any(pd.isna(local.get(variable)) for variable in VARIABLES_ALMACEN):
+            self.metricas.contar("almacen_fallos")
+            return None
+        self.metricas.contar("almacen_aciertos")
+        return self._fila_almacen(local)
+
+    def _pendiente(self, lat, lon):
+        """
+        Pendiente del terreno (%) según el DEM local, o 0 si no hay DEM que cubra el punto.
+        """
+        if self.dem is None: return 0
+        topo = self.dem.consultar(lat, lon)
+        return 0 if topo is None else round(topo[0], 1)
+
+    @staticmethod
+    def _fila_almacen(local):
+        """
+        Normaliza los valores interpolados del almacén al esquema de obtener_lote.
+        """
+        horas_luz = local.get("horas_luz")
+        return {
+            "temp_actual": round(local["temp_actual"], 1),
+            "humedad": round(local["humedad"]),
+            "precipitacion_anual_estimada": round(local["precipitacion_anual_estimada"], 1),
+            "altitud": round(local["altitud"], 1),
+            "horas_luz": 12.0 if pd.isna(horas_luz) else round(horas_luz, 1),
+        }
+
+    @medido("latencia_operacion", operacion="obtener_todo")
+    def obtener_todo(self, lat, lon, timeout_total=12):
         """
         ORQUESTADOR DE EXTRACCIÓN: Combina datos dinámicos y estáticos.
         Integra Clima, Topografía (Altitud) y Datos Solares en un solo objeto estructurado.
+        Si hay un almacén climático local que cubre el punto, se responde desde él.
+        Si no, las consultas de archivo y pronóstico se lanzan en paralelo bajo un único
+        plazo 'timeout_total' (segundos); si el archivo no llega a tiempo la lluvia
+        queda en 0.0 y si falla el pronóstico se devuelve el objeto de respaldo.
+        Las claves 'respaldo' (pronóstico) y 'respaldo_archivo' (lluvia) marcan esos casos,
+        y 'origen' indica de dónde salieron los datos ("almacen" o "api").
         """
+        local = self._consultar_almacen(lat, lon)
+        if local is not None:
+            return datos_api_desde_fila(dict(local, pendiente=self._pendiente(lat, lon), ph=6.5,
+                                             origen="almacen"))
+
+        inicio = time.monotonic()
+        params_clima = self._params_clima(lat, lon)
+        # 1. Lluvia Real (Dato Histórico) y 2. Clima Actual (Tiempo Real), en paralelo
+        futuro_lluvia = _POOL_CONSULTAS.submit(
+            self._obtener_lluvia_real_anual, lat, lon, min(10, timeout_total)
+        )
+        futuro_clima = _POOL_CONSULTAS.submit(
+            self._consultar, "pronostico", self.weather_url, params_clima, min(5, timeout_total)
+        )
         try:
-            # 1. Obtención de Lluvia Real (Dato Histórico)
-            lluvia_real = self._obtener_lluvia_real_anual(lat, lon)
-
-            # 2. Obtención de Clima Actual y Horas de Sol (Dato en Tiempo Real)
-            params_clima = {
-                "latitude": lat, 
-                "longitude": lon,
-                "current": ["temperature_2m", "relative_humidity_2m"],
-                "daily": "sunshine_duration",
-                "timezone": "auto"
-            }
-            resp = requests.get(self.weather_url, params=params_clima, verify=False, timeout=5).json()
-            
-            # Procesar Horas Luz: Conversión de segundos a horas (Normalización)
-            horas_luz = 12.0
-            if "daily" in resp and "sunshine_duration" in resp["daily"]:
-                segundos = resp["daily"]["sunshine_duration"][0]
-                if segundos: horas_luz = round(segundos / 3600, 1)
+            resp = futuro_clima.result(timeout=timeout_total)
+
+            restante = max(0.0, timeout_total - (time.monotonic() - inicio))
+            try:
+                lluvia_real = futuro_lluvia.result(timeout=restante)
+            except FuturesTimeout:
+                log.warning("Error lluvia histórica: tiempo de espera agotado")
+                self.metricas.contar("timeouts", servicio="archivo")
+                self.metricas.contar("respaldos", servicio="archivo")
+                lluvia_real = None
 
+            horas_luz = self._horas_luz(resp)
             altitud = resp.get("elevation", 500) 
 
             return {
                 "clima": {
                     "temp_actual": resp["current"]["temperature_2m"],
                     "humedad": resp["current"]["relative_humidity_2m"],
-                    "precipitacion_anual_estimada": lluvia_real
+                    "precipitacion_anual_estimada": 0.0 if lluvia_real is None else lluvia_real
                 },
-                "topografia": {"altitud": altitud, "pendiente": 0},
+                "topografia": {"altitud": altitud, "pendiente": self._pendiente(lat, lon)},
                 "solar": {"horas_luz": horas_luz},
-                "suelo": {"ph": 6.5}
+                "suelo": {"ph": 6.5},
+                "respaldo": False,
+                "respaldo_archivo": lluvia_real is None,
+                "origen": "api",
             }
         except Exception as e:
-            print(f"Error general API: {e}")
+            log.warning("Error general API: %r", e)
+            if isinstance(e, FuturesTimeout):
+                self.metricas.contar("timeouts", servicio="pronostico")
+            self.metricas.contar("respaldos", servicio="pronostico")
             return {
                 "clima": {"temp_actual": 20, "humedad": 60, "precipitacion_anual_estimada": 0},
-                "topografia": {"altitud": 0},
+                "topografia": {"altitud": 0, "pendiente": self._pendiente(lat, lon)},
                 "solar": {"horas_luz": 12},
-                "suelo": {"ph": 6.5}
-            }
\ No newline at end of file
+                "suelo": {"ph": 6.5},
+                "respaldo": True,
+                "respaldo_archivo": True,
+                "origen": "api",
+            }
+
+    def _respuestas_lote(self, servicios, puntos, omitir, tam_grupo, max_concurrencia,
+                         peticiones_por_segundo, timeout):
+        """
+        Respuestas JSON por punto de cada servicio ({servicio: (url, armar_params)}):
+        primero desde la caché y luego con peticiones multi-ubicación agrupadas.
+        Los índices en 'omitir' no se consultan; los que fallan quedan en None.
+        """
+        respuestas = {servicio: [None] * len(puntos) for servicio in servicios}
+
+        # 1. Resolver desde caché lo que ya se consultó antes
+        pendientes = {servicio: [] for servicio in servicios}
+        for servicio, (_, armar_params) in servicios.items():
+            for i, (lat, lon) in enumerate(puntos):
+                if i in omitir: continue
+                if self.cache is not None:
+                    respuestas[servicio][i] = self.cache.obtener(servicio, armar_params(lat, lon))
+                if respuestas[servicio][i] is None:
+                    pendientes[servicio].append(i)
+            if self.cache is not None:
+                aciertos = len(puntos) - len(omitir) - len(pendientes[servicio])
+                self.metricas.contar("cache_aciertos", aciertos, servicio=servicio)
+                self.metricas.contar("cache_fallos", len(pendientes[servicio]), servicio=servicio)
+
+        # 2. Descargar los faltantes agrupando coordenadas en peticiones multi-ubicación
+        limitador = self._limitador(peticiones_por_segundo)
+
+        def descargar(servicio, indices):
+            url, armar_params = servicios[servicio]
+            params = armar_params(
+                ",".join(str(puntos[i][0]) for i in indices),
+                ",".join(str(puntos[i][1]) for i in indices),
+            )
+            limitador.esperar()
+            try:
+                resp = self._get(servicio, url, params, timeout)
+            except Exception as e:
+                log.warning("Error lote %s: %r", servicio, e)
+                return
+            if isinstance(resp, dict):
+                if resp.get("error"):
+                    log.warning("Error lote %s: %s", servicio, resp.get("reason"))
+                    self.metricas.contar("errores", servicio=servicio, error="api")
+                    return
+                resp = [resp]
+            for i, r in zip(indices, resp):
+                respuestas[servicio][i] = r
+            # Guardar después de conservar todo el grupo: un fallo de la caché no descarta datos
+            if self.cache is not None:
+                for i, r in zip(indices, resp):
+                    try:
+                        self.cache.guardar(servicio, armar_params(*puntos[i]), r)
+                    except Exception as e:
+                        log.warning("Error caché lote %s: %r", servicio, e)
+
+        with ThreadPoolExecutor(max_workers=max_concurrencia) as pool:
+            futuros = [
+                pool.submit(descargar, servicio, indices[inicio:inicio + tam_grupo])
+                for servicio, indices in pendientes.items()
+                for inicio in range(0, len(indices), tam_grupo)
+            ]
+        for futuro in futuros:
+            if futuro.exception() is not None:
+                log.warning("Error lote: %r", futuro.exception())
+        return respuestas
+
+    @medido("latencia_operacion", operacion="obtener_lote")
+    def obtener_lote(self, puntos, tam_grupo=50, max_concurrencia=4, peticiones_por_segundo=5,
+                     timeout=30):
+        """
+        EXTRACCIÓN MASIVA: Obtiene clima, topografía y sol para muchos puntos.
+        - puntos: lista de (lat, lon).
+        - tam_grupo: coordenadas por petición (Open-Meteo acepta listas separadas por comas).
+        - max_concurrencia / peticiones_por_segundo: límites hacia la API. El límite de
+          tasa es del cliente (lo comparten las llamadas simultáneas) y por proceso:
+          N procesos con su propio cliente suman N veces la tasa.
+        Reutiliza la caché por punto (compartida con obtener_todo) y devuelve un
+        DataFrame columnar con una fila por punto. Dos columnas marcan los datos no reales:
+        - 'respaldo': el pronóstico no pudo obtenerse y se usan los valores por defecto.
+        - 'respaldo_archivo': el archivo no respondió; la lluvia anual queda en NaN.
+        """
+        puntos = [(float(lat), float(lon)) for lat, lon in puntos]
+        servicios = {
+            "pronostico": (self.weather_url, self._params_clima),
+            "archivo": (self.archive_url, self._params_archivo),
+        }
+
+        # 0. Camino rápido: puntos cubiertos por el almacén climático local (sin red)
+        locales = {}
+        if self.almacen is not None and puntos:
+            tabla = self.almacen.consultar_lote([p[0] for p in puntos], [p[1] for p in puntos])
+            if all(variable in tabla for variable in VARIABLES_ALMACEN):
+                completos = tabla[VARIABLES_ALMACEN].notna().all(axis=1).to_numpy()
+                registros = tabla.to_dict("records")
+                locales = {i: registros[i] for i in completos.nonzero()[0]}
+            self.metricas.contar("almacen_aciertos", len(locales))
+            self.metricas.contar("almacen_fallos", len(puntos) - len(locales))
+
+        # 1-2. Caché y descargas agrupadas de los puntos no resueltos localmente
+        respuestas = self._respuestas_lote(servicios, puntos, locales, tam_grupo, max_concurrencia,
+                                           peticiones_por_segundo, timeout)
+
+        # 3. Estructuración columnar (mismo esquema que obtener_todo, aplanado)
+        filas = []
+        for i, (lat, lon) in enumerate(puntos):
+            clima = respuestas["pronostico"][i]
+            archivo = respuestas["archivo"][i]
+            fila = {"lat": lat, "lon": lon}
+            if i in locales:
+                fila.update(self._fila_almacen(locales[i]), pendiente=0, ph=6.5, respaldo=False,
+                            respaldo_archivo=False)
+                filas.append(fila)
+                continue
+            try:
+                fila.update({
+                    "temp_actual": clima["current"]["temperature_2m"],
+                    "humedad": clima["current"]["relative_humidity_2m"],
+                    "altitud": clima.get("elevation", 500),
+                    "horas_luz": self._horas_luz(clima),
+                    "respaldo": False,
+                })
+            except (TypeError, KeyError):
+                fila.update(RESPALDO_CLIMA, respaldo=True)
+            historial = HistorialClima.desde_respuesta(archivo) if archivo else None
+            fila["precipitacion_anual_estimada"] = historial.lluvia_anual if historial is not None else np.nan
+            fila["respaldo_archivo"] = historial is None
+            fila["pendiente"] = 0
+            fila["ph"] = 6.5
+            filas.append(fila)
+
+        self.metricas.contar("respaldos", sum(fila["respaldo"] for fila in filas), servicio="pronostico")
+        self.metricas.contar("respaldos", sum(fila["respaldo_archivo"] for fila in filas), servicio="archivo")
+        resultado = pd.DataFrame(filas, columns=[
+            "lat", "lon", "temp_actual", "humedad", "precipitacion_anual_estimada",
+            "altitud", "pendiente", "horas_luz", "ph", "respaldo", "respaldo_archivo",
+        ])
+        # 4. Pendiente real desde el DEM local (lecturas agrupadas por tile)
+        if self.dem is not None and puntos:
+            pendiente, _ = self.dem.consultar_lote(resultado["lat"], resultado["lon"])
+            resultado["pendiente"] = np.nan_to_num(pendiente.round(1), nan=0.0)
+        return resultado
+
+    @medido("latencia_operacion", operacion="obtener_historiales")
+    def obtener_historiales(self, puntos, tam_grupo=50, max_concurrencia=4, peticiones_por_segundo=5,
+                            timeout=30):
+        """
+        HISTORIAL MASIVO: HistorialClima de muchos puntos con peticiones al archivo
+        agrupadas (mismos límites y caché que obtener_lote). Los puntos cuya
+        consulta falló quedan en None.
+        """
+        puntos = [(float(lat), float(lon)) for lat, lon in puntos]
+        servicios = {"archivo": (self.archive_url, self._params_archivo)}
+        respuestas = self._respuestas_lote(servicios, puntos, (), tam_grupo, max_concurrencia,
+                                           peticiones_por_segundo, timeout)
+        historiales = [
+            HistorialClima.desde_respuesta(resp, lat, lon) if resp else None
+            for resp, (lat, lon) in zip(respuestas["archivo"], puntos)
+        ]
+        self.metricas.contar("respaldos", historiales.count(None), servicio="archivo")
+        return historiales
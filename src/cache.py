@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class CacheRespuestas:
+    """
+    MÓDULO DE CACHÉ (cache.py)
+    Almacena las respuestas JSON de Open-Meteo para no repetir consultas recientes.
+    Combina una caché LRU en memoria con un almacén persistente opcional en SQLite,
+    con tiempos de vida (TTL) distintos por servicio y contadores de aciertos/fallos.
+    """
+
+    # TTL en segundos por servicio (None = no expira)
+    TTL_POR_DEFECTO = {
+        "pronostico": 15 * 60,
+        "archivo": 24 * 3600,
+        "geocodificacion": None,
+    }
+
+    def __init__(self, max_entradas=512, ruta_sqlite=None, max_bytes_disco=64 * 1024 * 1024,
+                 ttl=None, decimales=3):
+        """
+        - max_entradas: tamaño máximo de la caché en memoria (desalojo LRU).
+        - ruta_sqlite: archivo para persistir respuestas entre sesiones (opcional).
+        - max_bytes_disco: tamaño máximo de las respuestas guardadas en disco.
+        - ttl: dict servicio -> segundos que reemplaza a TTL_POR_DEFECTO.
+        - decimales: redondeo de latitud/longitud en la clave (3 ≈ 110 m).
+        """
+        self.max_entradas = max_entradas
+        self.max_bytes_disco = max_bytes_disco
+        self.ttl = dict(self.TTL_POR_DEFECTO, **(ttl or {}))
+        self.decimales = decimales
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._escrituras = 0
+
+        self._db = None
+        if ruta_sqlite:
+            carpeta = os.path.dirname(ruta_sqlite)
+            if carpeta: os.makedirs(carpeta, exist_ok=True)
+            self._db = sqlite3.connect(ruta_sqlite, check_same_thread=False, timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS respuestas ("
+                "clave TEXT PRIMARY KEY, servicio TEXT, expira REAL, accedido REAL, valor TEXT)"
+            )
+            self._db.commit()
+
+    def clave(self, servicio, params):
+        """
+        Genera la clave de caché: servicio + parámetros, con lat/lon redondeadas.
+        """
+        normalizados = {}
+        for k, v in params.items():
+            if k in ("latitude", "longitude") and isinstance(v, (int, float)):
+                v = round(float(v), self.decimales)
+            normalizados[k] = v
+        return f"{servicio}:{json.dumps(normalizados, sort_keys=True)}"
+
+    def obtener(self, servicio, params):
+        """
+        Devuelve la respuesta guardada o None si no existe o ya expiró.
+        """
+        clave = self.clave(servicio, params)
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                expira, valor = entrada
+                if expira is None or expira > ahora:
+                    self._memoria.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._memoria[clave]
+
+            if self._db is not None:
+                try:
+                    fila = self._db.execute(
+                        "SELECT expira, valor FROM respuestas WHERE clave = ?", (clave,)
+                    ).fetchone()
+                    if fila is not None and (fila[0] is None or fila[0] > ahora):
+                        valor = json.loads(fila[1])
+                        # Confirmar al instante: una transacción abierta bloquearía a otros procesos
+                        self._db.execute("UPDATE respuestas SET accedido = ? WHERE clave = ?", (ahora, clave))
+                        self._db.commit()
+                        self._guardar_memoria(clave, fila[0], valor)
+                        self.aciertos += 1
+                        return valor
+                except (sqlite3.Error, ValueError) as e:
+                    self._revertir()
+                    log.warning("Error caché en disco (lectura): %r", e)
+
+            self.fallos += 1
+            return None
+
+    def guardar(self, servicio, params, valor):
+        """
+        Guarda una respuesta aplicando el TTL del servicio.
+        """
+        clave = self.clave(servicio, params)
+        ttl = self.ttl.get(servicio)
+        ahora = time.time()
+        expira = None if ttl is None else ahora + ttl
+        with self._lock:
+            self._guardar_memoria(clave, expira, valor)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?)",
+                        (clave, servicio, expira, ahora, json.dumps(valor)),
+                    )
+                    self._db.commit()
+                    self._escrituras += 1
+                    if self._escrituras % 100 == 0:
+                        self._desalojar_disco()
+                except sqlite3.Error as e:
+                    # La respuesta sigue en memoria; perder la copia en disco no es fatal
+                    self._revertir()
+                    log.warning("Error caché en disco (escritura): %r", e)
+
+    def _revertir(self):
+        try:
+            self._db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _guardar_memoria(self, clave, expira, valor):
+        self._memoria[clave] = (expira, valor)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+            self.desalojos += 1
+
+    def _desalojar_disco(self):
+        """
+        Elimina entradas expiradas y, si se supera max_bytes_disco, las menos usadas.
+        """
+        self._db.execute("DELETE FROM respuestas WHERE expira IS NOT NULL AND expira <= ?", (time.time(),))
+        total = self._db.execute("SELECT COALESCE(SUM(LENGTH(valor)), 0) FROM respuestas").fetchone()[0]
+        if total > self.max_bytes_disco:
+            exceso = total - self.max_bytes_disco
+            filas = self._db.execute("SELECT clave, LENGTH(valor) FROM respuestas ORDER BY accedido")
+            borrar = []
+            for clave, tam in filas:
+                if exceso <= 0: break
+                borrar.append((clave,))
+                exceso -= tam
+            self._db.executemany("DELETE FROM respuestas WHERE clave = ?", borrar)
+            self.desalojos += len(borrar)
+        self._db.commit()
+
+    def estadisticas(self):
+        """
+        Resumen de uso: aciertos, fallos, ratio de aciertos y tamaño en memoria.
+        """
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "ratio_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "entradas_memoria": len(self._memoria),
+                "desalojos": self.desalojos,
+            }
+
+    def limpiar(self):
+        """
+        Vacía la caché en memoria y en disco.
+        """
+        with self._lock:
+            self._memoria.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM respuestas")
+                self._db.commit()
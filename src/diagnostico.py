@@ -0,0 +1,236 @@
+"""
+MÓDULO DE DIAGNÓSTICO (diagnostico.py)
+Sistema experto que traduce las variables extraídas en alertas agronómicas.
+Las reglas se declaran como datos (REGLAS_DIAGNOSTICO) y se compilan una vez en
+predicados vectorizados de NumPy, de modo que la interfaz (un sitio) y el
+procesamiento por lotes (miles de sitios) comparten exactamente la misma lógica.
+"""
+import operator
+
+import numpy as np
+import pandas as pd
+
+# Variables que consultan las reglas: (sección de datos_api, valor por defecto).
+# Los nombres coinciden con las columnas de obtener_lote / VARIABLES_SITIO.
+VARIABLES_DIAGNOSTICO = {
+    "temp_actual": ("clima", 20),
+    "humedad": ("clima", 60),
+    "altitud": ("topografia", 500),
+    "precipitacion_anual_estimada": ("clima", 0),
+    "ph": ("suelo", 6.5),
+}
+
+OPERADORES = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+ANIMALES = ("bovinos", "porcinos", "aves")
+
+# TABLA DE REGLAS DEL SISTEMA EXPERTO
+# Cada regla se activa cuando se cumplen TODAS sus condiciones (variable, operador, umbral).
+# El mensaje admite los campos {ph} y {lluvia} del sitio evaluado.
+REGLAS_DIAGNOSTICO = [
+    # 🚨 CULTIVOS: lógica de pH (reacciona al pH ingresado por el usuario)
+    {
+        "id": "acidez",
+        "categorias": ("cultivos",),
+        "condiciones": [("ph", "<", 5.5)],
+        "tipo": "error",
+        "mensaje": (
+            "☠️ **ACIDEZ DETECTADA (pH {ph})**\n\n"
+            "**Diagnóstico:** El suelo es demasiado ácido. Hay toxicidad por Aluminio y bloqueo de Fósforo.\n"
+            "**🛡️ Solución:** Aplicar **Cal Dolomita** inmediatamente (aprox 2 ton/ha)."
+        ),
+    },
+    {
+        "id": "alcalinidad",
+        "categorias": ("cultivos",),
+        "condiciones": [("ph", ">", 7.8)],
+        "tipo": "warning",
+        "mensaje": (
+            "⚠️ **ALCALINIDAD ALTA (pH {ph})**\n\n"
+            "**Diagnóstico:** Bloqueo de micronutrientes (Hierro, Zinc).\n"
+            "**🛡️ Solución:** Aplicar materia orgánica acidificante o Azufre elemental."
+        ),
+    },
+    # 🚨 CULTIVOS: lógica climática
+    {
+        "id": "heladas",
+        "categorias": ("cultivos",),
+        "condiciones": [("altitud", ">", 3500), ("temp_actual", "<", 10)],
+        "tipo": "error",
+        "mensaje": "❄️ **RIESGO DE HELADAS**\n\n**Diagnóstico:** Radiación nocturna extrema.\n**🛡️ Plan:** Riego al atardecer y Potasio foliar.",
+    },
+    {
+        "id": "hongos",
+        "categorias": ("cultivos",),
+        "condiciones": [("temp_actual", ">", 22), ("humedad", ">", 80)],
+        "tipo": "error",
+        "mensaje": "🍄 **ALERTA HONGOS**\n\n**Diagnóstico:** Alta humedad + calor.\n**🛡️ Plan:** Poda de ventilación y Trichoderma.",
+    },
+    {
+        "id": "estres_hidrico",
+        "categorias": ("cultivos",),
+        "condiciones": [("temp_actual", ">", 28), ("humedad", "<", 40)],
+        "tipo": "warning",
+        "mensaje": "🍂 **ESTRÉS HÍDRICO (Aire Seco)**\n\n**Diagnóstico:** Cierre de estomas.\n**🛡️ Plan:** Riegos cortos frecuentes y cobertura (Mulch).",
+    },
+    {
+        "id": "deficit_lluvia",
+        "categorias": ("cultivos",),
+        "condiciones": [("precipitacion_anual_estimada", "<", 500)],
+        "tipo": "warning",
+        "mensaje": "💧 **DÉFICIT LLUVIA ({lluvia} mm)**\n\n**Diagnóstico:** Requiere riego.\n**🛡️ Plan:** Instalar sistema por goteo.",
+    },
+    # 🚨 ANIMALES
+    {
+        "id": "mal_de_altura",
+        "categorias": ("bovinos",),
+        "condiciones": [("altitud", ">", 2800)],
+        "tipo": "error",
+        "mensaje": "⛰️ **RIESGO: MAL DE ALTURA**\n\n**Diagnóstico:** Hipoxia.\n**🛡️ Plan:** Evitar Holstein puro.",
+    },
+    {
+        "id": "estres_termico",
+        "categorias": ("porcinos",),
+        "condiciones": [("temp_actual", ">", 27)],
+        "tipo": "error",
+        "mensaje": "🐷 **ESTRÉS TÉRMICO**\n\n**Diagnóstico:** Riesgo de infarto.\n**🛡️ Plan:** Nebulizadores y ventilación.",
+    },
+    {
+        "id": "bacteriosis",
+        "categorias": ANIMALES,
+        "condiciones": [("humedad", ">", 85)],
+        "tipo": "warning",
+        "mensaje": "🦠 **BACTERIOSIS**\n\n**Diagnóstico:** Camas húmedas.\n**🛡️ Plan:** Cal viva y reducir densidad.",
+    },
+]
+
+# ✅ Consejo cuando ninguna regla se activa
+CONSEJO_IDEAL = (
+    "✨ **CONDICIONES IDEALES**\n\nEl ambiente es favorable.\n**🚀 Plan:** Enfocarse en nutrición para alto rendimiento.",
+    "success",
+)
+
+
+def _compilar_predicado(condiciones):
+    """
+    Convierte una lista de condiciones en una función (variables -> array bool).
+    """
+    for variable, simbolo, _ in condiciones:
+        if variable not in VARIABLES_DIAGNOSTICO:
+            raise ValueError(f"Variable de diagnóstico desconocida: '{variable}'")
+        if simbolo not in OPERADORES:
+            raise ValueError(f"Operador de diagnóstico desconocido: '{simbolo}'")
+    compiladas = [(variable, OPERADORES[simbolo], float(umbral)) for variable, simbolo, umbral in condiciones]
+
+    def predicado(variables):
+        resultado = None
+        for variable, comparar, umbral in compiladas:
+            cumple = comparar(variables[variable], umbral)
+            resultado = cumple if resultado is None else resultado & cumple
+        return resultado
+
+    return predicado
+
+
+def compilar_reglas(reglas=REGLAS_DIAGNOSTICO):
+    """
+    COMPILACIÓN DE LA TABLA DE REGLAS:
+    Devuelve {categoria: [(id, predicado, tipo, mensaje), ...]} conservando el
+    orden declarado (que es el orden en que se muestran los consejos).
+    """
+    compiladas = {}
+    for regla in reglas:
+        predicado = _compilar_predicado(regla["condiciones"])
+        for categoria in regla["categorias"]:
+            compiladas.setdefault(categoria, []).append(
+                (regla["id"], predicado, regla["tipo"], regla["mensaje"])
+            )
+    return compiladas
+
+
+_REGLAS_COMPILADAS = compilar_reglas()
+
+
+def _variables_lote(sitios):
+    """
+    Arrays float por variable de diagnóstico; las columnas ausentes toman el valor por defecto.
+    """
+    if isinstance(sitios, pd.DataFrame):
+        columnas = {columna: sitios[columna].to_numpy(dtype=float) for columna in sitios
+                    if columna in VARIABLES_DIAGNOSTICO}
+        n = len(sitios)
+    else:
+        # dict de arrays/listas: se evita construir un DataFrame (camino de un solo sitio)
+        columnas = {columna: np.asarray(valores, dtype=float) for columna, valores in sitios.items()
+                    if columna in VARIABLES_DIAGNOSTICO}
+        n = len(next(iter(columnas.values()))) if columnas else 0
+    return {
+        variable: columnas[variable] if variable in columnas else np.full(n, float(defecto))
+        for variable, (_, defecto) in VARIABLES_DIAGNOSTICO.items()
+    }, n
+
+
+def evaluar_lote(sitios, categoria):
+    """
+    PROCESAMIENTO VECTORIZADO:
+    Evalúa todas las reglas de la categoría sobre muchos sitios a la vez.
+    - sitios: DataFrame (o dict de arrays) con las columnas de VARIABLES_DIAGNOSTICO.
+    Devuelve un DataFrame booleano sitios x id de regla.
+    """
+    variables, n = _variables_lote(sitios)
+    reglas = _REGLAS_COMPILADAS.get(categoria, [])
+    activas = np.zeros((n, len(reglas)), dtype=bool)
+    for j, (_, predicado, _, _) in enumerate(reglas):
+        activas[:, j] = predicado(variables)
+    indice = sitios.index if isinstance(sitios, pd.DataFrame) else None
+    return pd.DataFrame(activas, index=indice, columns=[regla[0] for regla in reglas])
+
+
+def consejos_lote(sitios, categoria):
+    """
+    Lista de consejos [(msg, tipo), ...] por sitio, en el mismo orden que 'sitios'.
+    Solo se da formato al mensaje de las reglas activas.
+    """
+    variables, n = _variables_lote(sitios)
+    reglas = _REGLAS_COMPILADAS.get(categoria, [])
+    activas = [predicado(variables) for _, predicado, _, _ in reglas]
+
+    resultado = []
+    for i in range(n):
+        consejos = []
+        for j, (_, _, tipo, mensaje) in enumerate(reglas):
+            if activas[j][i]:
+                consejos.append((_formatear(mensaje, variables, i), tipo))
+        resultado.append(consejos or [CONSEJO_IDEAL])
+    return resultado
+
+
+def _formatear(mensaje, variables, i):
+    if "{" not in mensaje:
+        return mensaje
+    lluvia = variables["precipitacion_anual_estimada"][i]
+    return mensaje.format(
+        ph=float(variables["ph"][i]),
+        lluvia=int(lluvia) if np.isfinite(lluvia) else lluvia,
+    )
+
+
+def generar_consejos_experto(datos, categoria, ph_manual):
+    """
+    SISTEMA EXPERTO DE DIAGNÓSTICO:
+    Analiza las variables extraídas y genera alertas agronómicas.
+    Recibe el ph_manual directamente del input del usuario para asegurar reactividad.
+    """
+    # Extraer variables (usamos .get para evitar errores) y EXPLICITAMENTE el ph_manual del usuario
+    sitio = {
+        variable: [datos[seccion].get(variable, defecto)]
+        for variable, (seccion, defecto) in VARIABLES_DIAGNOSTICO.items()
+        if variable != "ph"
+    }
+    sitio["ph"] = [float(ph_manual)]
+    return consejos_lote(sitio, categoria)[0]
@@ -0,0 +1,152 @@
+"""
+MÓDULO DE HISTORIAL CLIMÁTICO (historial.py)
+Serie diaria del archivo Open-Meteo (precipitación, temperatura mínima/máxima,
+ET0 y humedad relativa media) de una ubicación. Todas las variables se
+decodifican a arreglos float32 al crear el historial (~8 KB por año), así no
+se retienen las listas JSON de floats de Python; los agregados (lluvia anual y
+mensual, días de helada, racha seca, etc.) se calculan una vez y quedan en
+caché, y una sola descarga sirve a todos los indicadores.
+"""
+from functools import cached_property
+
+import numpy as np
+
+# Nombre interno -> variable diaria de la API de archivo
+VARIABLES_DIARIAS = {
+    "precipitacion": "precipitation_sum",
+    "tmin": "temperature_2m_min",
+    "tmax": "temperature_2m_max",
+    "et0": "et0_fao_evapotranspiration",
+    "humedad": "relative_humidity_2m_mean",
+}
+
+# Umbral (mm) por debajo del cual un día se considera seco
+LLUVIA_DIA_SECO = 1.0
+
+
+class HistorialClima:
+    """
+    Historial diario compacto de un punto.
+    - inicio: primer día de la serie (np.datetime64[D]); los días son consecutivos.
+    - dias: longitud de la serie.
+    - serie(variable): arreglo float32 (NaN = sin dato) de una variable de VARIABLES_DIARIAS.
+    """
+
+    def __init__(self, lat, lon, inicio, dias, series):
+        self.lat = lat
+        self.lon = lon
+        self.inicio = inicio
+        self.dias = dias
+        self._series = series
+
+    @classmethod
+    def desde_respuesta(cls, resp, lat=None, lon=None):
+        """
+        Crea el historial a partir de la respuesta JSON del archivo, decodificando
+        cada variable a float32 (las que faltan quedan en NaN). Devuelve None si la
+        respuesta no trae datos diarios.
+        """
+        diario = resp.get("daily") if isinstance(resp, dict) else None
+        if not diario or not diario.get("time"):
+            return None
+        dias = len(diario["time"])
+        series = {}
+        for nombre, api in VARIABLES_DIARIAS.items():
+            crudo = diario.get(api)
+            if crudo is None:
+                valores = np.full(dias, np.nan, dtype=np.float32)
+            else:
+                # None -> NaN en la conversión directa a float32
+                valores = np.asarray(crudo, dtype=np.float32)
+            valores.flags.writeable = False
+            series[nombre] = valores
+        return cls(resp.get("latitude", lat) if lat is None else lat,
+                   resp.get("longitude", lon) if lon is None else lon,
+                   np.datetime64(diario["time"][0], "D"), dias, series)
+
+    def serie(self, variable):
+        return self._series[variable]
+
+    def tiene(self, variable):
+        """
+        True si la respuesta trajo la variable con al menos un dato.
+        """
+        return not np.isnan(self.serie(variable)).all()
+
+    @property
+    def fechas(self):
+        return self.inicio + np.arange(self.dias)
+
+    @property
+    def precipitacion(self):
+        return self.serie("precipitacion")
+
+    @property
+    def tmin(self):
+        return self.serie("tmin")
+
+    @property
+    def tmax(self):
+        return self.serie("tmax")
+
+    @property
+    def et0(self):
+        return self.serie("et0")
+
+    @property
+    def humedad(self):
+        return self.serie("humedad")
+
+    # --- AGREGADOS (se calculan una vez por historial) ---
+
+    @cached_property
+    def lluvia_anual(self):
+        """
+        Acumulado de precipitación de toda la serie (mm), ignorando días sin dato.
+        """
+        return round(float(np.nansum(self.precipitacion, dtype=np.float64)), 1)
+
+    @cached_property
+    def et0_anual(self):
+        return round(float(np.nansum(self.et0, dtype=np.float64)), 1)
+
+    @cached_property
+    def lluvia_mensual(self):
+        """
+        Precipitación acumulada por mes calendario: arreglo (12,), índice 0 = enero.
+        """
+        meses = self.fechas.astype("datetime64[M]").astype(int) % 12
+        return np.bincount(meses, weights=np.nan_to_num(self.precipitacion), minlength=12)
+
+    @cached_property
+    def temp_media(self):
+        """
+        Temperatura media diaria (tmin + tmax) / 2 en float32.
+        """
+        return (self.tmin + self.tmax) / np.float32(2)
+
+    @cached_property
+    def dias_helada(self):
+        return int(np.count_nonzero(self.tmin <= 0))
+
+    @cached_property
+    def racha_seca_maxima(self):
+        """
+        Mayor número de días seguidos con precipitación menor a LLUVIA_DIA_SECO.
+        """
+        seco = np.concatenate(([False], self.precipitacion < LLUVIA_DIA_SECO, [False]))
+        cambios = np.flatnonzero(np.diff(seco.astype(np.int8)))
+        if not len(cambios): return 0
+        return int((cambios[1::2] - cambios[::2]).max())
+
+    def resumen(self):
+        """
+        Agregados principales como dict (para mostrar o serializar).
+        """
+        return {
+            "lluvia_anual": self.lluvia_anual,
+            "et0_anual": self.et0_anual,
+            "dias_helada": self.dias_helada,
+            "racha_seca_maxima": self.racha_seca_maxima,
+            "temp_media": round(float(np.nanmean(self.temp_media)), 1) if self.tiene("tmin") else None,
+        }
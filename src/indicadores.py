@@ -0,0 +1,259 @@
+"""
+MÓDULO DE INDICADORES AGROCLIMÁTICOS (indicadores.py)
+Indicadores sobre las series diarias del archivo (ver historial.py) calculados
+para muchos sitios a la vez con operaciones acumuladas de NumPy:
+- Grados día de crecimiento (GDD) acumulados con la temperatura base y tope
+  de cada variedad de cultivos.csv (temp_min / temp_max).
+- Horas diarias de exposición a estrés térmico (ITH) para animales.
+- Balance hídrico móvil (lluvia - ET0 del cultivo).
+- Ranking de ventanas de siembra por región.
+Todas las series tienen forma (sitios, días); una serie 1D se trata como un solo sitio.
+"""
+import numpy as np
+import pandas as pd
+
+from src.historial import VARIABLES_DIARIAS
+from src.reglas import obtener_registro
+
+# Umbral del Índice de Temperatura y Humedad a partir del cual hay estrés (Alerta Leve)
+UMBRAL_ITH = 72
+
+# Temperatura (°C) a partir de la cual un día cuenta como helada
+TEMP_HELADA = 0.0
+
+
+class SeriesDiarias:
+    """
+    Series diarias de una región apiladas en matrices float32 (sitios x días).
+    Los sitios sin historial quedan en NaN; si los historiales tienen distinta
+    longitud se conservan los últimos días comunes a todos.
+    """
+
+    def __init__(self, lats, lons, inicio, variables):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.inicio = inicio
+        self.variables = variables
+        self.dias = next(iter(variables.values())).shape[1]
+
+    @classmethod
+    def desde_historiales(cls, historiales, puntos=None):
+        """
+        - historiales: lista de HistorialClima (o None) como la de cliente.obtener_historiales.
+        - puntos: (lat, lon) de cada historial; obligatorio si alguno es None.
+        """
+        validos = [h for h in historiales if h is not None]
+        if not validos:
+            raise ValueError("No hay ningún historial con datos")
+        dias = min(h.dias for h in validos)
+        inicio = max(h.inicio + (h.dias - dias) for h in validos)
+        if puntos is None:
+            puntos = [(h.lat, h.lon) for h in historiales]
+
+        variables = {}
+        for variable in VARIABLES_DIARIAS:
+            matriz = np.full((len(historiales), dias), np.nan, dtype=np.float32)
+            for i, h in enumerate(historiales):
+                if h is not None: matriz[i] = h.serie(variable)[h.dias - dias:]
+            variables[variable] = matriz
+        lats, lons = zip(*puntos)
+        return cls(lats, lons, inicio, variables)
+
+    def __getattr__(self, variable):
+        try:
+            return self.__dict__["variables"][variable]
+        except KeyError:
+            raise AttributeError(variable) from None
+
+    @property
+    def fechas(self):
+        return self.inicio + np.arange(self.dias)
+
+
+def gdd_diario(tmin, tmax, base, tope=None):
+    """
+    Grados día por el método del promedio con umbrales: las temperaturas se
+    acotan a [base, tope] antes de promediar. 'base' y 'tope' pueden ser escalares
+    o arrays (sitios, 1) para usar un umbral distinto por fila.
+    """
+    tmin = np.asarray(tmin, dtype=np.float32)
+    tmax = np.asarray(tmax, dtype=np.float32)
+    tope = np.inf if tope is None else tope
+    alta = np.clip(tmax, base, tope)
+    baja = np.clip(tmin, base, tope)
+    return (alta + baja) / np.float32(2) - np.float32(base)
+
+
+def gdd_acumulado(tmin, tmax, base, tope=None):
+    """
+    GDD acumulados día a día (los días sin dato no suman).
+    """
+    return np.nancumsum(gdd_diario(tmin, tmax, base, tope), axis=-1, dtype=np.float32)
+
+
+def umbral_temperatura_ith(humedad, umbral=UMBRAL_ITH):
+    """
+    Temperatura a partir de la cual ITH >= umbral para una humedad relativa (%),
+    despejada de ITH = 0.8 T + (HR/100)(T - 14.4) + 46.4.
+    """
+    h = np.asarray(humedad, dtype=np.float32) / np.float32(100)
+    return (umbral - 46.4 + 14.4 * h) / (0.8 + h)
+
+
+def horas_ith(tmin, tmax, humedad, umbral=UMBRAL_ITH):
+    """
+    Horas por día con ITH >= umbral. La temperatura horaria se modela como una
+    senoide entre tmin y tmax, así la fracción del día sobre el umbral tiene forma
+    cerrada (arccos) y no hace falta expandir cada día en 24 horas.
+    """
+    tmin = np.asarray(tmin, dtype=np.float32)
+    tmax = np.asarray(tmax, dtype=np.float32)
+    media = (tmax + tmin) / 2
+    amplitud = (tmax - tmin) / 2
+    critica = umbral_temperatura_ith(humedad, umbral)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (critica - media) / amplitud
+    # Amplitud 0: todo el día por encima (o por debajo) del umbral
+    x = np.where(amplitud > 0, x, np.where(media >= critica, -1.0, 1.0))
+    horas = 24 * np.arccos(np.clip(x, -1, 1)) / np.pi
+    return np.where(np.isnan(media) | np.isnan(critica), np.nan, horas).astype(np.float32)
+
+
+def balance_diario(precipitacion, et0, kc=1.0):
+    """
+    Balance hídrico diario (mm): lluvia - kc * ET0, con los días sin dato en 0.
+    """
+    return np.nan_to_num(np.asarray(precipitacion, dtype=np.float32)) - np.float32(kc) * np.nan_to_num(
+        np.asarray(et0, dtype=np.float32))
+
+
+def balance_movil(precipitacion, et0, ventana=30, kc=1.0):
+    """
+    Balance hídrico acumulado en los últimos 'ventana' días para cada día
+    (suma móvil por diferencia de sumas acumuladas).
+    """
+    acumulado = np.cumsum(balance_diario(precipitacion, et0, kc), axis=-1, dtype=np.float64)
+    previo = np.zeros_like(acumulado)
+    previo[..., ventana:] = acumulado[..., :-ventana]
+    return (acumulado - previo).astype(np.float32)
+
+
+def _sumas_ventanas(diario, inicios, duracion):
+    """
+    Suma de 'diario' (sitios, días) en las ventanas [inicio, inicio + duracion) de
+    cada inicio. El año se trata como cíclico: las ventanas que pasan del último
+    día continúan desde el primero (vueltas completas * total + resto), así basta
+    una sola suma acumulada. Devuelve (sitios, ventanas).
+    """
+    dias = diario.shape[-1]
+    acumulado = np.zeros(diario.shape[:-1] + (dias + 1,), dtype=np.float64)
+    np.cumsum(diario, axis=-1, out=acumulado[..., 1:])
+    vueltas, resto = np.divmod(inicios + duracion, dias)
+    return (acumulado[..., -1:] * vueltas + acumulado[..., resto] - acumulado[..., inicios]).astype(np.float32)
+
+
+def bases_variedades(registro=None, categoria="cultivos"):
+    """
+    Temperatura base y tope de cada variedad, tomadas de temp_min / temp_max de las reglas.
+    """
+    df = (registro or obtener_registro()).dataframe(categoria)
+    return pd.DataFrame({
+        "variedad": df["variedad"],
+        "temp_base": df["temp_min"].astype(float),
+        "temp_tope": df["temp_max"].astype(float),
+    })
+
+
+def ventanas_siembra(series, base, tope=None, dias_ciclo=120, paso=7, kc=1.0):
+    """
+    INDICADORES POR VENTANA DE SIEMBRA:
+    Para cada sitio y cada fecha de siembra (una cada 'paso' días del año de la
+    serie) resume el ciclo de 'dias_ciclo' días: GDD acumulados, balance hídrico
+    total y días con helada. Devuelve (inicios, dict indicador -> (sitios, ventanas)).
+    """
+    inicios = np.arange(0, series.dias, paso)
+    indicadores = _indicadores_hidricos(series, inicios, dias_ciclo, kc)
+    indicadores["gdd"] = _gdd_ventanas(series, inicios, dias_ciclo, base, tope)
+    return inicios, indicadores
+
+
+def _gdd_ventanas(series, inicios, dias_ciclo, base, tope):
+    gdd = np.nan_to_num(gdd_diario(series.tmin, series.tmax, base, tope))
+    return _sumas_ventanas(gdd, inicios, dias_ciclo)
+
+
+def _indicadores_hidricos(series, inicios, dias_ciclo, kc):
+    """
+    Indicadores de ventana que no dependen de la variedad (balance y heladas).
+    """
+    heladas = (series.tmin <= TEMP_HELADA).astype(np.float32)
+    balance = balance_diario(series.precipitacion, series.et0, kc)
+    return {
+        "balance_mm": _sumas_ventanas(balance, inicios, dias_ciclo),
+        "dias_helada": _sumas_ventanas(heladas, inicios, dias_ciclo),
+    }
+
+
+def ranking_siembra(series, registro=None, variedades=None, dias_ciclo=120, paso=7, top=3,
+                    gdd_requeridos=None, kc=1.0):
+    """
+    RANKING DE VENTANAS DE SIEMBRA por sitio y variedad de cultivos.
+    Orden: menos días con helada, luego mayor balance hídrico (menos déficit) y
+    luego más GDD. Con 'gdd_requeridos' (dict variedad -> GDD) primero van las
+    ventanas que alcanzan el requerimiento. Devuelve un DataFrame con las 'top'
+    mejores ventanas de cada (sitio, variedad), variedades en el orden de las reglas.
+    El balance y las heladas se calculan una vez; solo los GDD dependen de la variedad.
+    """
+    bases = bases_variedades(registro)
+    if variedades is not None:
+        bases = bases[bases["variedad"].isin(variedades)]
+
+    inicios = np.arange(0, series.dias, paso)
+    hidricos = _indicadores_hidricos(series, inicios, dias_ciclo, kc)
+    balance, heladas = hidricos["balance_mm"], hidricos["dias_helada"]
+
+    # Por variedad: (sitios, top) con el índice de ventana y sus indicadores
+    ordenes, gdds = [], []
+    for fila in bases.itertuples(index=False):
+        gdd = _gdd_ventanas(series, inicios, dias_ciclo, fila.temp_base, fila.temp_tope)
+        claves = [-gdd, -balance, heladas]
+        requerido = (gdd_requeridos or {}).get(fila.variedad)
+        if requerido is not None:
+            claves.append(gdd < requerido)
+        orden = np.lexsort(claves, axis=-1)[:, :top]
+        ordenes.append(orden)
+        gdds.append(np.take_along_axis(gdd, orden, axis=-1))
+
+    # (sitios, variedades, top) -> una fila por combinación
+    orden = np.stack(ordenes, axis=1)
+    n, v, k = orden.shape
+    por_sitio = np.arange(n)[:, None, None]
+    return pd.DataFrame({
+        "sitio": np.repeat(np.arange(n), v * k),
+        "lat": np.repeat(series.lats, v * k),
+        "lon": np.repeat(series.lons, v * k),
+        "variedad": np.tile(np.repeat(bases["variedad"].to_numpy(), k), n),
+        "puesto": np.tile(np.arange(1, k + 1), n * v),
+        "fecha_siembra": (series.inicio + inicios[orden]).ravel(),
+        "gdd": np.stack(gdds, axis=1).ravel().astype(float).round(1),
+        "balance_mm": balance[por_sitio, orden].ravel().astype(float).round(1),
+        "dias_helada": heladas[por_sitio, orden].ravel().astype(int),
+    })
+
+
+def resumen_sitio(historial, regla=None, ventana=30):
+    """
+    Indicadores de un solo sitio para mostrar en la interfaz:
+    GDD del último año (con la base de la regla, o 10 °C), balance hídrico anual
+    y del último mes, y horas medias diarias con ITH >= UMBRAL_ITH.
+    """
+    base = float(regla["temp_min"]) if regla is not None else 10.0
+    tope = float(regla["temp_max"]) if regla is not None else None
+    ith = horas_ith(historial.tmin, historial.tmax, historial.humedad)
+    return {
+        "gdd_anual": round(float(gdd_acumulado(historial.tmin, historial.tmax, base, tope)[-1]), 1),
+        "temp_base": base,
+        "balance_anual_mm": round(float(balance_diario(historial.precipitacion, historial.et0).sum()), 1),
+        "balance_ultimo_mes_mm": round(float(balance_movil(historial.precipitacion, historial.et0, ventana)[-1]), 1),
+        "horas_ith_dia": round(float(np.nanmean(ith)), 1) if not np.isnan(ith).all() else None,
+    }
@@ -0,0 +1,111 @@
+import math
+import time
+import numpy as np
+from folium.raster_layers import ImageOverlay
+
+# Colores RGBA por clase de aptitud (mismos umbrales que el informe de app.py)
+COLOR_APTO = (46, 160, 67)
+COLOR_RIESGO = (240, 173, 78)
+COLOR_NO_APTO = (217, 83, 79)
+
+
+def centros_malla(bbox, resolucion):
+    """
+    ESTRUCTURACIÓN ESPACIAL:
+    Devuelve las latitudes (de norte a sur) y longitudes (de oeste a este) de los
+    centros de celda para un bbox (lat_min, lon_min, lat_max, lon_max) y una
+    resolución en grados.
+    """
+    lat_min, lon_min, lat_max, lon_max = bbox
+    filas = max(1, math.ceil((lat_max - lat_min) / resolucion))
+    columnas = max(1, math.ceil((lon_max - lon_min) / resolucion))
+    lats = lat_max - (np.arange(filas) + 0.5) * (lat_max - lat_min) / filas
+    lons = lon_min + (np.arange(columnas) + 0.5) * (lon_max - lon_min) / columnas
+    return lats, lons
+
+
+class MallaAptitud:
+    """
+    MÓDULO DEL MAPA INTELIGENTE (map_utils.py)
+    Genera un ráster de aptitud (0-100) sobre una zona: consulta el clima de cada
+    celda con AgroClimaClient.obtener_lote y puntúa todas las celdas con
+    AgroAnalisis.analizar_lote. La malla se recorre por tiles para que solo un
+    bloque de celdas esté en memoria como datos intermedios.
+    """
+
+    def __init__(self, cliente, analista, tam_tile=64):
+        self.cliente = cliente
+        self.analista = analista
+        self.tam_tile = tam_tile
+        self.estadisticas = {"celdas": 0, "segundos": 0.0, "celdas_por_segundo": 0.0}
+
+    def calcular(self, bbox, resolucion, categoria, variedad=None, progreso=None):
+        """
+        PROCESAMIENTO POR TILES:
+        Devuelve un ráster float32 (filas x columnas, fila 0 = norte) con el score
+        de la variedad indicada, o el mejor score de la categoría si variedad es None.
+        Las celdas sin clima real (respaldo del pronóstico o del archivo) quedan en NaN.
+        - progreso: callback opcional (celdas_hechas, total, celdas_por_segundo).
+        """
+        lats, lons = centros_malla(bbox, resolucion)
+        raster = np.full((len(lats), len(lons)), np.nan, dtype=np.float32)
+        total = raster.size
+        hechas = 0
+        inicio = time.perf_counter()
+
+        for f0 in range(0, len(lats), self.tam_tile):
+            for c0 in range(0, len(lons), self.tam_tile):
+                sub_lat, sub_lon = np.meshgrid(
+                    lats[f0:f0 + self.tam_tile], lons[c0:c0 + self.tam_tile], indexing="ij"
+                )
+                datos = self.cliente.obtener_lote(zip(sub_lat.ravel(), sub_lon.ravel()))
+                scores, _ = self.analista.analizar_lote(datos, [categoria])
+                if variedad is None:
+                    valores = scores.max(axis=1).to_numpy()
+                else:
+                    valores = scores[(categoria, variedad)].to_numpy()
+                sin_datos = datos["respaldo"].to_numpy(dtype=bool) | datos["respaldo_archivo"].to_numpy(dtype=bool)
+                valores = np.where(sin_datos, np.nan, valores)
+                raster[f0:f0 + sub_lat.shape[0], c0:c0 + sub_lat.shape[1]] = valores.reshape(sub_lat.shape)
+
+                hechas += sub_lat.size
+                segundos = time.perf_counter() - inicio
+                self.estadisticas = {
+                    "celdas": hechas,
+                    "segundos": segundos,
+                    "celdas_por_segundo": hechas / segundos if segundos else 0.0,
+                }
+                if progreso: progreso(hechas, total, self.estadisticas["celdas_por_segundo"])
+
+        return raster
+
+
+def raster_a_rgba(raster, opacidad=0.55):
+    """
+    VISUALIZACIÓN: Colorea el ráster por clases (APTO >= 80, RIESGO >= 50, NO APTO).
+    Las celdas sin dato (NaN) quedan transparentes.
+    """
+    rgba = np.zeros(raster.shape + (4,), dtype=np.uint8)
+    valido = ~np.isnan(raster)
+    for color, mascara in [
+        (COLOR_NO_APTO, valido & (raster < 50)),
+        (COLOR_RIESGO, valido & (raster >= 50) & (raster < 80)),
+        (COLOR_APTO, valido & (raster >= 80)),
+    ]:
+        rgba[mascara, :3] = color
+    rgba[valido, 3] = int(255 * opacidad)
+    return rgba
+
+
+def capa_folium(raster, bbox, nombre="Aptitud"):
+    """
+    VISUALIZACIÓN: Convierte el ráster en un ImageOverlay de folium listo para
+    añadirse al mapa de app.py.
+    """
+    lat_min, lon_min, lat_max, lon_max = bbox
+    return ImageOverlay(
+        image=raster_a_rgba(raster),
+        bounds=[[lat_min, lon_min], [lat_max, lon_max]],
+        origin="upper",
+        name=nombre,
+    )
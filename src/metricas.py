@@ -0,0 +1,241 @@
+"""
+MÓDULO DE MÉTRICAS (metricas.py)
+Instrumentación de AgroClimaClient y AgroAnalisis: histogramas de latencia por
+endpoint, contadores de errores/timeouts/respaldos/reintentos, aciertos de caché
+y tiempo de puntaje por lote. Los eventos se pueden reenviar a hooks (callbacks,
+registros estructurados de logging) y exportar en formato de texto Prometheus.
+Sin una instancia de Metricas los componentes usan SIN_METRICAS, que no hace nada.
+"""
+import bisect
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites (segundos) de los buckets de los histogramas de latencia
+LIMITES_LATENCIA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+
+class _Histograma:
+    __slots__ = ["cuentas", "suma", "total"]
+
+    def __init__(self):
+        self.cuentas = [0] * (len(LIMITES_LATENCIA) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.cuentas[bisect.bisect_left(LIMITES_LATENCIA, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def percentil(self, p):
+        """
+        Percentil aproximado (límite superior del bucket que lo contiene).
+        """
+        objetivo = p * self.total
+        acumulado = 0
+        for limite, cuenta in zip(LIMITES_LATENCIA + (float("inf"),), self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo and cuenta:
+                return limite
+        return float("nan")
+
+
+class Metricas:
+    """
+    Registro de métricas compartible entre hilos.
+    - observar(nombre, segundos, **etiquetas): añade una muestra a un histograma.
+    - contar(nombre, cantidad, **etiquetas): incrementa un contador.
+    - medir(nombre, **etiquetas): contexto que observa la duración del bloque.
+    Cada evento se reenvía a los hooks como dict {tipo, nombre, valor, etiquetas}.
+    """
+
+    def __init__(self, hooks=None):
+        self.hooks = list(hooks or [])
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self._contadores = {}
+
+    def agregar_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _emitir(self, tipo, nombre, valor, etiquetas):
+        evento = {"tipo": tipo, "nombre": nombre, "valor": valor, "etiquetas": etiquetas}
+        for hook in self.hooks:
+            try:
+                hook(evento)
+            except Exception:
+                logging.getLogger(__name__).exception("Hook de métricas falló")
+
+    def observar(self, nombre, segundos, **etiquetas):
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = _Histograma()
+            histograma.observar(segundos)
+        if self.hooks: self._emitir("latencia", nombre, segundos, etiquetas)
+
+    def contar(self, nombre, cantidad=1, **etiquetas):
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + cantidad
+        if self.hooks: self._emitir("contador", nombre, cantidad, etiquetas)
+
+    @contextlib.contextmanager
+    def medir(self, nombre, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, **etiquetas)
+
+    def resumen(self):
+        """
+        Instantánea legible: latencias (n, media, p50, p95) por serie, contadores y
+        ratio de aciertos de caché por servicio.
+        """
+        with self._lock:
+            latencias = [
+                {"nombre": nombre, **dict(etiquetas), "n": h.total,
+                 "media_s": h.suma / h.total if h.total else 0.0,
+                 "p50_s": h.percentil(0.5), "p95_s": h.percentil(0.95)}
+                for (nombre, etiquetas), h in sorted(self._histogramas.items())
+            ]
+            contadores = [
+                {"nombre": nombre, **dict(etiquetas), "valor": valor}
+                for (nombre, etiquetas), valor in sorted(self._contadores.items())
+            ]
+        cache = {}
+        for fila in contadores:
+            if fila["nombre"] in ("cache_aciertos", "cache_fallos"):
+                entrada = cache.setdefault(fila.get("servicio", ""), {"aciertos": 0, "fallos": 0})
+                entrada["aciertos" if fila["nombre"] == "cache_aciertos" else "fallos"] += fila["valor"]
+        for entrada in cache.values():
+            consultas = entrada["aciertos"] + entrada["fallos"]
+            entrada["ratio_aciertos"] = entrada["aciertos"] / consultas if consultas else 0.0
+        return {"latencias": latencias, "contadores": contadores, "cache": cache}
+
+    def texto_prometheus(self, prefijo="apiagro"):
+        """
+        Exposición en formato de texto de Prometheus (histogramas y contadores).
+        """
+        def formato(etiquetas):
+            if not etiquetas: return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in etiquetas) + "}"
+
+        lineas = []
+        with self._lock:
+            vistos = set()
+            for (nombre, etiquetas), h in sorted(self._histogramas.items()):
+                metrica = f"{prefijo}_{nombre}_segundos"
+                if metrica not in vistos:
+                    lineas.append(f"# TYPE {metrica} histogram")
+                    vistos.add(metrica)
+                acumulado = 0
+                for limite, cuenta in zip(LIMITES_LATENCIA + (float("inf"),), h.cuentas):
+                    acumulado += cuenta
+                    le = "+Inf" if limite == float("inf") else repr(limite)
+                    lineas.append(f"{metrica}_bucket{formato(etiquetas + (('le', le),))} {acumulado}")
+                lineas.append(f"{metrica}_sum{formato(etiquetas)} {h.suma}")
+                lineas.append(f"{metrica}_count{formato(etiquetas)} {h.total}")
+            for (nombre, etiquetas), valor in sorted(self._contadores.items()):
+                metrica = f"{prefijo}_{nombre}_total"
+                if metrica not in vistos:
+                    lineas.append(f"# TYPE {metrica} counter")
+                    vistos.add(metrica)
+                lineas.append(f"{metrica}{formato(etiquetas)} {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def exportar_prometheus(self, ruta):
+        """
+        Escribe texto_prometheus en 'ruta' de forma atómica (para node_exporter textfile).
+        """
+        carpeta = os.path.dirname(ruta)
+        if carpeta: os.makedirs(carpeta, exist_ok=True)
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(self.texto_prometheus())
+        os.replace(temporal, ruta)
+
+    def servir_prometheus(self, puerto, host="127.0.0.1"):
+        """
+        Expone /metrics en un hilo de fondo. Devuelve el servidor (usar .shutdown()).
+        """
+        metricas = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                cuerpo = metricas.texto_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        return servidor
+
+    def limpiar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+
+
+class _SinMetricas:
+    """
+    Implementación vacía usada cuando la instrumentación está desactivada.
+    """
+    hooks = ()
+
+    def observar(self, nombre, segundos, **etiquetas):
+        pass
+
+    def contar(self, nombre, cantidad=1, **etiquetas):
+        pass
+
+    def medir(self, nombre, **etiquetas):
+        return _CONTEXTO_NULO
+
+
+_CONTEXTO_NULO = contextlib.nullcontext()
+SIN_METRICAS = _SinMetricas()
+
+
+def medido(nombre, **etiquetas):
+    """
+    Decorador de métodos: observa la duración de la llamada en self.metricas.
+    """
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            with self.metricas.medir(nombre, **etiquetas):
+                return metodo(self, *args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def hook_logging(logger=None, nivel=logging.DEBUG):
+    """
+    Hook que publica cada evento como registro estructurado (extra={'metrica': evento}).
+    """
+    logger = logger or logging.getLogger("src.metricas")
+
+    def hook(evento):
+        if logger.isEnabledFor(nivel):
+            logger.log(nivel, "%s %s=%s %s", evento["tipo"], evento["nombre"], evento["valor"],
+                       evento["etiquetas"], extra={"metrica": evento})
+
+    return hook
@@ -0,0 +1,249 @@
+"""
+MÓDULO DE NOMENCLÁTOR LOCAL (nomenclator.py)
+Índice de lugares en memoria para buscar ubicaciones sin red:
+- Índice de prefijos ordenado (bisect) sobre el nombre normalizado y cada una
+  de sus palabras: autocompletado en O(log n).
+- Índice de trigramas para coincidencias aproximadas (errores de tipeo),
+  insensible a tildes y mayúsculas.
+Se construye desde una lista descargable (GeoNames citiesXXXX.txt o un CSV
+nombre, pais, lat, lon[, poblacion]) y acepta lugares nuevos en caliente
+(p. ej. los resultados de la API de geocodificación).
+"""
+import argparse
+import bisect
+import csv
+import heapq
+import io
+import os
+import re
+import threading
+import unicodedata
+import zipfile
+
+import numpy as np
+import requests
+
+# Listas de GeoNames (ciudades con población mayor a N habitantes)
+URL_GEONAMES = "https://download.geonames.org/export/dump/{archivo}.zip"
+
+# Similitud mínima (Jaccard de trigramas) para aceptar una coincidencia aproximada
+SIMILITUD_MINIMA = 0.3
+
+# Candidatos por trigramas que se re-puntúan en cada búsqueda aproximada
+MAX_CANDIDATOS = 200
+
+COLUMNAS_CSV = ["nombre", "pais", "region", "lat", "lon", "poblacion"]
+
+
+def normalizar(texto):
+    """
+    Minúsculas, sin tildes ni signos y con espacios simples: 'Cañete, Perú' -> 'canete peru'.
+    """
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", texto).split())
+
+
+def _trigramas(clave):
+    relleno = f"  {clave} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class Nomenclator:
+    """
+    Índice de lugares. Cada lugar es un dict con nombre, pais, region, lat, lon y poblacion.
+    - buscar(texto, limite): prefijos primero (por población) y luego aproximados.
+    - agregar(lugares): incorpora lugares nuevos, ignorando los ya presentes.
+    Es seguro compartirlo entre hilos (sesiones de Streamlit).
+    """
+
+    def __init__(self, lugares=()):
+        self.lugares = []
+        self._claves = []          # lista ordenada de (clave, indice)
+        self._trigramas = {}       # trigrama -> lista de índices
+        self._trigramas_np = {}    # trigrama -> np.int32 (se regenera al agregar)
+        self._tam_trigramas = []   # número de trigramas del nombre de cada lugar
+        self._tam_np = None
+        self._vistos = set()
+        self._lock = threading.RLock()
+        self.agregar(lugares, ordenar=False)
+        self._claves.sort()
+
+    def __len__(self):
+        return len(self.lugares)
+
+    @staticmethod
+    def _identidad(lugar):
+        return normalizar(lugar["nombre"]), lugar.get("pais", ""), round(float(lugar["lat"]), 2), round(float(lugar["lon"]), 2)
+
+    def agregar(self, lugares, ordenar=True):
+        """
+        Añade lugares al índice. Devuelve cuántos eran nuevos.
+        """
+        nuevos = 0
+        with self._lock:
+            for lugar in lugares:
+                identidad = self._identidad(lugar)
+                if identidad in self._vistos: continue
+                self._vistos.add(identidad)
+                indice = len(self.lugares)
+                self.lugares.append({
+                    "nombre": lugar["nombre"],
+                    "pais": lugar.get("pais", ""),
+                    "region": lugar.get("region", ""),
+                    "lat": float(lugar["lat"]),
+                    "lon": float(lugar["lon"]),
+                    "poblacion": int(lugar.get("poblacion") or 0),
+                })
+                clave = identidad[0]
+                palabras = clave.split(" ")
+                # Clave completa y desde cada palabra ('lima' encuentra 'Cercado de Lima')
+                for k in range(len(palabras)):
+                    entrada = (" ".join(palabras[k:]), indice)
+                    if ordenar: bisect.insort(self._claves, entrada)
+                    else: self._claves.append(entrada)
+                trigramas = _trigramas(clave)
+                self._tam_trigramas.append(len(trigramas))
+                self._tam_np = None
+                for trigrama in trigramas:
+                    self._trigramas.setdefault(trigrama, []).append(indice)
+                    self._trigramas_np.pop(trigrama, None)
+                nuevos += 1
+        return nuevos
+
+    def _prefijo(self, clave, limite):
+        """
+        Índices cuyo nombre (o alguna de sus palabras) empieza por 'clave', los más
+        poblados primero. Se consideran todas las claves del rango del prefijo.
+        """
+        inicio = bisect.bisect_left(self._claves, (clave,))
+        fin = bisect.bisect_left(self._claves, (clave + "\uffff",), inicio)
+        encontrados = {indice for _, indice in self._claves[inicio:fin]}
+        return heapq.nlargest(limite, encontrados, key=lambda i: (self.lugares[i]["poblacion"], -i))
+
+    def _postings(self, trigrama):
+        arreglo = self._trigramas_np.get(trigrama)
+        if arreglo is None:
+            arreglo = np.asarray(self._trigramas.get(trigrama, ()), dtype=np.int32)
+            self._trigramas_np[trigrama] = arreglo
+        return arreglo
+
+    def _aproximado(self, clave, limite, excluir):
+        """
+        Coincidencias por similitud de trigramas (Jaccard), tolerante a errores de tipeo.
+        """
+        trigramas = _trigramas(clave)
+        postings = [self._postings(t) for t in trigramas]
+        postings = [p for p in postings if len(p)]
+        if not postings: return []
+        comunes = np.bincount(np.concatenate(postings), minlength=len(self.lugares))
+        # Jaccard >= s exige al menos s * len(trigramas) trigramas en común
+        candidatos = np.flatnonzero(comunes >= max(1, int(np.ceil(SIMILITUD_MINIMA * len(trigramas)))))
+        if len(candidatos) > MAX_CANDIDATOS:
+            candidatos = candidatos[np.argpartition(-comunes[candidatos], MAX_CANDIDATOS)[:MAX_CANDIDATOS]]
+        if self._tam_np is None:
+            self._tam_np = np.asarray(self._tam_trigramas, dtype=np.float32)
+        tamanos = self._tam_np[candidatos]
+        similitud = comunes[candidatos] / (len(trigramas) + tamanos - comunes[candidatos])
+        orden = np.lexsort((-np.array([self.lugares[i]["poblacion"] for i in candidatos]), -similitud))
+        return [int(candidatos[k]) for k in orden
+                if similitud[k] >= SIMILITUD_MINIMA and candidatos[k] not in excluir][:limite]
+
+    def buscar(self, texto, limite=10, aproximado=True):
+        """
+        Opciones {label, lat, lon} (mismo formato que AgroClimaClient.buscar_opciones_ciudades):
+        primero los lugares que empiezan por el texto y, si faltan y aproximado=True,
+        los más parecidos.
+        """
+        clave = normalizar(texto)
+        if not clave: return []
+        with self._lock:
+            indices = self._prefijo(clave, limite)
+            if aproximado and len(indices) < limite:
+                indices += self._aproximado(clave, limite - len(indices), set(indices))
+            return [self.opcion(self.lugares[i]) for i in indices]
+
+    @staticmethod
+    def opcion(lugar):
+        partes = [lugar["nombre"]] + [p for p in (lugar.get("region"), lugar.get("pais")) if p]
+        return {"label": ", ".join(partes), "lat": lugar["lat"], "lon": lugar["lon"]}
+
+    # --- CONSTRUCCIÓN Y PERSISTENCIA ---
+
+    @classmethod
+    def desde_archivo(cls, ruta, **opciones):
+        """
+        Carga un CSV propio (COLUMNAS_CSV) o un volcado de GeoNames (.txt/.zip).
+        """
+        if ruta.endswith((".txt", ".zip")):
+            return cls(leer_geonames(ruta, **opciones))
+        with open(ruta, encoding="utf-8", newline="") as f:
+            return cls(csv.DictReader(f))
+
+    def guardar(self, ruta):
+        """
+        Escribe todos los lugares (incluidos los agregados en caliente) como CSV.
+        """
+        carpeta = os.path.dirname(ruta)
+        if carpeta: os.makedirs(carpeta, exist_ok=True)
+        temporal = ruta + ".tmp"
+        with self._lock, open(temporal, "w", encoding="utf-8", newline="") as f:
+            escritor = csv.DictWriter(f, fieldnames=COLUMNAS_CSV)
+            escritor.writeheader()
+            escritor.writerows(self.lugares)
+        os.replace(temporal, ruta)
+
+
+def leer_geonames(ruta, paises=None, poblacion_min=0):
+    """
+    Lugares de un volcado de GeoNames (formato tabulado de citiesXXXX.txt, o su .zip).
+    - paises: códigos ISO (p. ej. ['PE', 'BO']) para filtrar; None = todos.
+    """
+    if ruta.endswith(".zip"):
+        with zipfile.ZipFile(ruta) as z:
+            texto = z.read(z.namelist()[0]).decode("utf-8")
+    else:
+        with open(ruta, encoding="utf-8") as f:
+            texto = f.read()
+    paises = {p.upper() for p in paises} if paises else None
+    for linea in io.StringIO(texto):
+        campos = linea.rstrip("\n").split("\t")
+        if len(campos) < 15: continue
+        if paises and campos[8] not in paises: continue
+        poblacion = int(campos[14] or 0)
+        if poblacion < poblacion_min: continue
+        yield {"nombre": campos[1], "pais": campos[8], "region": "", "lat": campos[4], "lon": campos[5],
+               "poblacion": poblacion}
+
+
+def descargar_geonames(carpeta, archivo="cities15000", timeout=60):
+    """
+    Descarga el volcado de GeoNames indicado a 'carpeta'. Devuelve la ruta del .zip.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"{archivo}.zip")
+    resp = requests.get(URL_GEONAMES.format(archivo=archivo), timeout=timeout)
+    resp.raise_for_status()
+    with open(ruta, "wb") as f:
+        f.write(resp.content)
+    return ruta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.nomenclator",
+                                     description="Construye el nomenclátor local desde GeoNames.")
+    parser.add_argument("salida", help="CSV de salida (p. ej. data/nomenclator/lugares.csv)")
+    parser.add_argument("--archivo", default="cities15000", help="Volcado de GeoNames (cities500, cities15000, ...)")
+    parser.add_argument("--origen", help="Volcado ya descargado (.txt o .zip) en lugar de descargarlo")
+    parser.add_argument("--paises", nargs="+", help="Códigos ISO de país a incluir")
+    parser.add_argument("--poblacion-min", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    origen = args.origen or descargar_geonames(os.path.dirname(args.salida) or ".", args.archivo)
+    nomenclator = Nomenclator(leer_geonames(origen, args.paises, args.poblacion_min))
+    nomenclator.guardar(args.salida)
+    print(f"✅ {len(nomenclator)} lugares -> {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+MÓDULO DE EJECUCIÓN PARALELA (paralelo.py)
+Reparte los trabajos regionales (puntaje de todas las variedades, consejos de
+diagnóstico y ranking de ventanas de siembra) entre varios procesos. Las
+columnas de los sitios, las series diarias y las tablas de reglas se copian una
+sola vez a memoria compartida; cada worker recibe solo los nombres de los
+segmentos y el rango de filas de su fragmento, lee los arrays sin copiarlos y
+escribe los puntajes directamente en la matriz de salida compartida. Los
+resultados se unen en el orden original de los sitios.
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.agro_logic import AgroAnalisis, CATEGORIAS, VARIABLES_SITIO, puntuar_matriz
+from src.diagnostico import VARIABLES_DIAGNOSTICO, consejos_lote
+from src.historial import VARIABLES_DIARIAS
+from src.indicadores import SeriesDiarias, ranking_siembra
+from src.reglas import obtener_registro
+
+# Fragmentos por worker: más de uno para repartir mejor la carga entre procesos
+FRAGMENTOS_POR_WORKER = 4
+
+
+class _MemoriaCompartida:
+    """
+    Arrays NumPy en segmentos de memoria compartida, propiedad del proceso que los crea.
+    - descriptores: dict nombre -> (segmento, forma, dtype), lo único que viaja a los workers.
+    - vistas: dict nombre -> ndarray sobre el segmento (solo en el proceso dueño).
+    """
+
+    def __init__(self):
+        self.descriptores = {}
+        self.vistas = {}
+        self._segmentos = []
+
+    def crear(self, nombre, forma, dtype):
+        dtype = np.dtype(dtype)
+        tamano = max(1, int(np.prod(forma)) * dtype.itemsize)
+        segmento = shared_memory.SharedMemory(create=True, size=tamano)
+        self._segmentos.append(segmento)
+        self.descriptores[nombre] = (segmento.name, tuple(forma), dtype.str)
+        self.vistas[nombre] = np.ndarray(forma, dtype, buffer=segmento.buf)
+        return self.vistas[nombre]
+
+    def copiar(self, nombre, valores):
+        valores = np.asarray(valores)
+        self.crear(nombre, valores.shape, valores.dtype)[...] = valores
+
+    def liberar(self):
+        self.vistas.clear()
+        _soltar(self._segmentos)
+        for segmento in self._segmentos:
+            segmento.unlink()
+        self._segmentos.clear()
+
+
+def _adjuntar(descriptores):
+    """
+    Abre en el worker los segmentos descritos. Devuelve (segmentos, vistas).
+    """
+    segmentos, vistas = [], {}
+    for nombre, (segmento, forma, dtype) in descriptores.items():
+        memoria = shared_memory.SharedMemory(name=segmento)
+        segmentos.append(memoria)
+        vistas[nombre] = np.ndarray(forma, np.dtype(dtype), buffer=memoria.buf)
+    return segmentos, vistas
+
+
+def _soltar(segmentos):
+    for segmento in segmentos:
+        try:
+            segmento.close()
+        except BufferError:
+            # Aún hay vistas vivas (p. ej. en un traceback): se liberan al terminar el proceso
+            pass
+
+
+def _tarea_region(descriptores, inicio, fin, categorias_consejos, opciones_ranking):
+    """
+    Trabajo de un fragmento [inicio, fin) ejecutado en un worker:
+    puntajes (escritos en la salida compartida), consejos y ventanas de siembra.
+    """
+    segmentos, vistas = _adjuntar(descriptores)
+    try:
+        return _procesar_fragmento(vistas, inicio, fin, categorias_consejos, opciones_ranking)
+    finally:
+        vistas.clear()
+        _soltar(segmentos)
+
+
+def _procesar_fragmento(vistas, inicio, fin, categorias_consejos, opciones_ranking):
+    sitios = {columna: vistas[f"sitio_{columna}"][inicio:fin] for columna in VARIABLES_SITIO}
+    reglas = {nombre[len("regla_"):]: valores for nombre, valores in vistas.items() if nombre.startswith("regla_")}
+    vistas["scores"][inicio:fin], vistas["codigos"][inicio:fin] = puntuar_matriz(sitios, reglas)
+
+    diagnostico = {columna: vistas[f"sitio_{columna}"][inicio:fin] for columna in VARIABLES_DIAGNOSTICO}
+    consejos = {categoria: consejos_lote(diagnostico, categoria) for categoria in categorias_consejos}
+
+    ventanas = None
+    if opciones_ranking is not None:
+        opciones = dict(opciones_ranking)
+        registro = obtener_registro(opciones.pop("base_path"))
+        series = SeriesDiarias(
+            vistas["serie_lats"][inicio:fin], vistas["serie_lons"][inicio:fin], opciones.pop("inicio"),
+            {variable: vistas[f"serie_{variable}"][inicio:fin] for variable in VARIABLES_DIARIAS},
+        )
+        ventanas = ranking_siembra(series, registro, **opciones)
+        ventanas["sitio"] += inicio
+    return consejos, ventanas
+
+
+class EjecutorRegional:
+    """
+    EJECUTOR PARALELO sobre AgroAnalisis para trabajos de región completa.
+    - workers: procesos del pool (por defecto, todos los núcleos). Con 1 los
+      fragmentos se ejecutan en el mismo proceso, sin pool.
+    - tam_fragmento: sitios por tarea (por defecto n / (workers * FRAGMENTOS_POR_WORKER)).
+    El pool se crea en la primera llamada y se reutiliza; usar como contexto o
+    llamar a cerrar() al terminar.
+    """
+
+    def __init__(self, analista=None, workers=None, tam_fragmento=None):
+        self.analista = analista or AgroAnalisis()
+        self.workers = workers or os.cpu_count() or 1
+        self.tam_fragmento = tam_fragmento
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _fragmentos(self, n):
+        tamano = self.tam_fragmento or max(1, math.ceil(n / (self.workers * FRAGMENTOS_POR_WORKER)))
+        return [(inicio, min(n, inicio + tamano)) for inicio in range(0, n, tamano)]
+
+    def procesar_region(self, sitios, categorias=None, consejos=True, series=None, **opciones_ranking):
+        """
+        PROCESAMIENTO REGIONAL EN PARALELO:
+        - sitios: DataFrame (o dict de arrays) con las columnas de VARIABLES_SITIO.
+        - consejos: True para añadir los consejos de diagnóstico de cada categoría.
+        - series: SeriesDiarias de los mismos sitios (mismo orden) para rankear
+          ventanas de siembra; opciones_ranking se pasan a ranking_siembra.
+        Devuelve dict con 'scores' y 'codigos' (iguales a AgroAnalisis.analizar_lote),
+        'consejos' (categoria -> lista por sitio) y 'ventanas' (DataFrame o None).
+        """
+        if not isinstance(sitios, pd.DataFrame):
+            sitios = pd.DataFrame(sitios)
+        categorias = categorias or CATEGORIAS
+        tabla, reglas = self.analista.registro.tabla(categorias)
+        n, m = len(sitios), len(tabla)
+        if series is not None and len(series.lats) != n:
+            raise ValueError(f"Las series tienen {len(series.lats)} sitios y la tabla {n}")
+
+        memoria = _MemoriaCompartida()
+        try:
+            for columna, defecto in VARIABLES_SITIO.items():
+                valores = sitios[columna].to_numpy(dtype=float) if columna in sitios else np.full(n, defecto)
+                memoria.copiar(f"sitio_{columna}", valores)
+            for nombre, valores in reglas.items():
+                memoria.copiar(f"regla_{nombre}", np.ascontiguousarray(valores))
+            scores = memoria.crear("scores", (n, m), np.int64)
+            codigos = memoria.crear("codigos", (n, m), np.uint8)
+
+            opciones = None
+            if series is not None:
+                memoria.copiar("serie_lats", series.lats)
+                memoria.copiar("serie_lons", series.lons)
+                for variable in VARIABLES_DIARIAS:
+                    memoria.copiar(f"serie_{variable}", getattr(series, variable))
+                opciones = dict(opciones_ranking, inicio=series.inicio,
+                                base_path=self.analista.registro.base_path)
+
+            args = ([c for c in categorias if c in set(tabla["categoria"])] if consejos else [], opciones)
+            with self.analista.metricas.medir("latencia_puntaje", operacion="procesar_region"):
+                partes = self._ejecutar(memoria, n, args)
+            self.analista.metricas.contar("sitios_puntuados", n)
+
+            columnas = pd.MultiIndex.from_frame(tabla[["categoria", "variedad"]])
+            resultado = {
+                "scores": pd.DataFrame(scores.copy(), index=sitios.index, columns=columnas),
+                "codigos": pd.DataFrame(codigos.copy(), index=sitios.index, columns=columnas),
+                "consejos": {categoria: [c for parte, _ in partes for c in parte[categoria]]
+                             for categoria in args[0]},
+                "ventanas": pd.concat([v for _, v in partes], ignore_index=True) if series is not None and partes else None,
+            }
+            del scores, codigos
+        finally:
+            memoria.liberar()
+        return resultado
+
+    def analizar_lote(self, sitios, categorias=None):
+        """
+        Igual que AgroAnalisis.analizar_lote, repartido entre los workers.
+        """
+        resultado = self.procesar_region(sitios, categorias, consejos=False)
+        return resultado["scores"], resultado["codigos"]
+
+    def _ejecutar(self, memoria, n, args):
+        fragmentos = self._fragmentos(n)
+        if self.workers <= 1:
+            return [_procesar_fragmento(memoria.vistas, inicio, fin, *args) for inicio, fin in fragmentos]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        futuros = [self._pool.submit(_tarea_region, memoria.descriptores, inicio, fin, *args)
+                   for inicio, fin in fragmentos]
+        # Se recogen en el orden de envío: la unión conserva el orden de los sitios
+        return [futuro.result() for futuro in futuros]
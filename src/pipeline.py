@@ -0,0 +1,274 @@
+"""
+MÓDULO DE PROCESAMIENTO MASIVO (pipeline.py)
+Puntúa archivos de parcelas (CSV/Parquet/JSONL con id, lat, lon y opcionalmente
+ph/pendiente) sin la interfaz de Streamlit: consulta el clima por bloques con
+AgroClimaClient, evalúa todas las variedades con AgroAnalisis, añade los
+consejos de diagnóstico y escribe los resultados bloque a bloque.
+Uso: python -m src parcelas.csv resultados.csv --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.agro_logic import AgroAnalisis, CATEGORIAS, describir_codigos
+from src.almacen_clima import AlmacenClima
+from src.api_client import AgroClimaClient
+from src.cache import CacheRespuestas
+from src.diagnostico import consejos_lote
+from src.topografia import ModeloElevacion
+
+COLUMNAS_SALIDA = [
+    "id", "lat", "lon", "categoria", "variedad", "score", "estado", "razones", "riesgo_extra",
+    "temp_actual", "humedad", "precipitacion_anual_estimada", "altitud", "pendiente", "ph",
+    "respaldo", "respaldo_archivo", "consejos",
+]
+
+# Cliente y analista por proceso (se crean una vez en cada worker)
+_CONTEXTO = {}
+
+
+def _iniciar_contexto(ruta_cache, opciones_lote, ruta_almacen=None, ruta_dem=None):
+    cache = CacheRespuestas(ruta_sqlite=ruta_cache) if ruta_cache else CacheRespuestas()
+    almacen = AlmacenClima(ruta_almacen) if ruta_almacen else None
+    dem = ModeloElevacion(ruta_dem) if ruta_dem else None
+    _CONTEXTO["cliente"] = AgroClimaClient(cache=cache, almacen=almacen, dem=dem)
+    _CONTEXTO["analista"] = AgroAnalisis()
+    _CONTEXTO["opciones_lote"] = opciones_lote
+
+
+def estado_score(score):
+    """
+    Etiqueta del informe según los umbrales de app.py.
+    """
+    if score >= 80: return "APTO"
+    if score >= 50: return "RIESGO MEDIO"
+    return "NO APTO"
+
+
+def procesar_bloque(bloque, categorias):
+    """
+    PROCESAMIENTO DE UN BLOQUE:
+    Clima (obtener_lote) -> scores (analizar_lote) -> consejos (consejos_lote).
+    Devuelve un DataFrame largo con una fila por parcela y variedad. Las columnas
+    'respaldo' (clima por defecto) y 'respaldo_archivo' (lluvia anual sin dato)
+    marcan las filas puntuadas sin datos reales.
+    """
+    cliente = _CONTEXTO["cliente"]
+    analista = _CONTEXTO["analista"]
+
+    bloque = bloque.reset_index(drop=True)
+    sitios = cliente.obtener_lote(zip(bloque["lat"], bloque["lon"]), **_CONTEXTO["opciones_lote"])
+    # Los valores medidos en campo reemplazan a los de la API
+    for columna in ["ph", "pendiente"]:
+        if columna in bloque:
+            sitios[columna] = bloque[columna].fillna(sitios[columna])
+
+    scores, codigos = analista.analizar_lote(sitios, categorias)
+
+    consejos = {}
+    for categoria in categorias:
+        consejos[categoria] = [
+            json.dumps([{"tipo": tipo, "mensaje": msg} for msg, tipo in consejos_sitio], ensure_ascii=False)
+            for consejos_sitio in consejos_lote(sitios, categoria)
+        ]
+
+    partes = []
+    for (categoria, variedad) in scores.columns:
+        regla = analista.registro.regla(categoria, variedad)
+        score = scores[(categoria, variedad)]
+        partes.append(pd.DataFrame({
+            "id": bloque["id"],
+            "lat": sitios["lat"],
+            "lon": sitios["lon"],
+            "categoria": categoria,
+            "variedad": variedad,
+            "score": score,
+            "estado": score.map(estado_score),
+            "razones": codigos[(categoria, variedad)].map(lambda c: "; ".join(describir_codigos(c))),
+            "riesgo_extra": regla.get("riesgo_extra", "N/A"),
+            "temp_actual": sitios["temp_actual"],
+            "humedad": sitios["humedad"],
+            "precipitacion_anual_estimada": sitios["precipitacion_anual_estimada"],
+            "altitud": sitios["altitud"],
+            "pendiente": sitios["pendiente"],
+            "ph": sitios["ph"],
+            "respaldo": sitios["respaldo"],
+            "respaldo_archivo": sitios["respaldo_archivo"],
+            "consejos": consejos[categoria],
+        }))
+    return pd.concat(partes, ignore_index=True)[COLUMNAS_SALIDA]
+
+
+def formato_de(ruta):
+    extension = os.path.splitext(ruta)[1].lower()
+    return {".parquet": "parquet", ".jsonl": "jsonl", ".json": "jsonl"}.get(extension, "csv")
+
+
+def leer_parcelas(ruta, tam_bloque):
+    """
+    Lee el archivo de parcelas en bloques para no cargarlo entero en memoria.
+    """
+    formato = formato_de(ruta)
+    if formato == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Para leer Parquet instala pyarrow: pip install pyarrow")
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=tam_bloque):
+            yield lote.to_pandas()
+    elif formato == "jsonl":
+        yield from pd.read_json(ruta, lines=True, chunksize=tam_bloque)
+    else:
+        yield from pd.read_csv(ruta, chunksize=tam_bloque)
+
+
+class EscritorResultados:
+    """
+    Escribe los resultados bloque a bloque. CSV y JSONL se añaden al mismo
+    archivo; Parquet escribe una parte por bloque dentro de una carpeta.
+    """
+
+    def __init__(self, ruta, formato):
+        self.ruta = ruta
+        self.formato = formato
+        if formato == "parquet":
+            os.makedirs(ruta, exist_ok=True)
+
+    def posicion(self):
+        if self.formato == "parquet" or not os.path.exists(self.ruta): return 0
+        return os.path.getsize(self.ruta)
+
+    def truncar(self, posicion):
+        """
+        Descarta lo escrito después del último checkpoint (bloque a medias).
+        """
+        if self.formato != "parquet" and os.path.exists(self.ruta):
+            with open(self.ruta, "r+b") as f:
+                f.truncate(posicion)
+
+    def escribir(self, df, numero_bloque):
+        if self.formato == "parquet":
+            df.to_parquet(os.path.join(self.ruta, f"parte-{numero_bloque:06d}.parquet"), index=False)
+        elif self.formato == "jsonl":
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                df.to_json(f, orient="records", lines=True, force_ascii=False)
+        else:
+            df.to_csv(self.ruta, mode="a", header=self.posicion() == 0, index=False)
+
+
+def _leer_checkpoint(ruta):
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    return {"bloques": 0, "parcelas": 0, "posicion": 0}
+
+
+def _guardar_checkpoint(ruta, estado):
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+    os.replace(temporal, ruta)
+
+
+def ejecutar(entrada, salida, categorias=None, tam_bloque=1000, workers=1, reanudar=False,
+             ruta_cache=".cache/open_meteo.sqlite", opciones_lote=None, progreso=True, ruta_almacen=None,
+             ruta_dem=None):
+    """
+    ORQUESTADOR DEL PIPELINE:
+    Procesa 'entrada' por bloques y escribe en 'salida'. Tras cada bloque guarda
+    un checkpoint (<salida>.checkpoint.json) para poder reanudar con reanudar=True.
+    Con workers > 1 los bloques se reparten en un pool de procesos, manteniendo
+    el orden de escritura.
+    - ruta_almacen: carpeta de un AlmacenClima; los puntos que cubre no consultan la API.
+    - ruta_dem: carpeta de un ModeloElevacion para la pendiente real (sin DEM, y sin
+      columna 'pendiente' en la entrada, la pendiente queda en 0).
+    """
+    categorias = categorias or CATEGORIAS
+    opciones_lote = opciones_lote or {}
+    escritor = EscritorResultados(salida, formato_de(salida))
+    ruta_checkpoint = salida.rstrip("/") + ".checkpoint.json"
+
+    estado = _leer_checkpoint(ruta_checkpoint) if reanudar else {"bloques": 0, "parcelas": 0, "posicion": 0}
+    if reanudar:
+        escritor.truncar(estado["posicion"])
+    elif os.path.exists(salida) and escritor.formato != "parquet":
+        os.remove(salida)
+
+    bloques = leer_parcelas(entrada, tam_bloque)
+    for _ in range(estado["bloques"]):
+        next(bloques, None)
+
+    inicio = time.perf_counter()
+    procesadas = 0
+
+    def registrar(resultado, parcelas):
+        nonlocal procesadas
+        escritor.escribir(resultado, estado["bloques"])
+        estado["bloques"] += 1
+        estado["parcelas"] += parcelas
+        estado["posicion"] = escritor.posicion()
+        _guardar_checkpoint(ruta_checkpoint, estado)
+        procesadas += parcelas
+        if progreso:
+            velocidad = procesadas / (time.perf_counter() - inicio)
+            print(f"[bloque {estado['bloques']}] {estado['parcelas']} parcelas | {velocidad:.1f} parcelas/s",
+                  file=sys.stderr)
+
+    if workers <= 1:
+        _iniciar_contexto(ruta_cache, opciones_lote, ruta_almacen, ruta_dem)
+        for bloque in bloques:
+            registrar(procesar_bloque(bloque, categorias), len(bloque))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_contexto,
+                                 initargs=(ruta_cache, opciones_lote, ruta_almacen, ruta_dem)) as pool:
+            # Ventana acotada de bloques en vuelo para no leer todo el archivo de golpe
+            en_vuelo = []
+            for bloque in bloques:
+                en_vuelo.append((pool.submit(procesar_bloque, bloque, categorias), len(bloque)))
+                if len(en_vuelo) >= 2 * workers:
+                    futuro, n = en_vuelo.pop(0)
+                    registrar(futuro.result(), n)
+            for futuro, n in en_vuelo:
+                registrar(futuro.result(), n)
+
+    return estado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Puntúa un archivo de parcelas (id, lat, lon[, ph, pendiente]) contra las reglas técnicas.",
+    )
+    parser.add_argument("entrada", help="Archivo de parcelas (.csv, .parquet o .jsonl)")
+    parser.add_argument("salida", help="Archivo de resultados (.csv, .jsonl o carpeta .parquet)")
+    parser.add_argument("--categorias", nargs="+", choices=CATEGORIAS, default=CATEGORIAS)
+    parser.add_argument("--tam-bloque", type=int, default=1000, help="Parcelas por bloque")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos en paralelo")
+    parser.add_argument("--reanudar", action="store_true", help="Continuar desde el último checkpoint")
+    parser.add_argument("--cache", default=".cache/open_meteo.sqlite", help="Caché SQLite de Open-Meteo")
+    parser.add_argument("--almacen", help="Carpeta del almacén climático local (consultas sin red)")
+    parser.add_argument("--dem", help="Carpeta del DEM local para calcular la pendiente de cada parcela")
+    parser.add_argument("--tam-grupo", type=int, default=50, help="Coordenadas por petición a la API")
+    parser.add_argument("--peticiones-por-segundo", type=float, default=5,
+                        help="Límite total hacia la API (se reparte entre los workers)")
+    args = parser.parse_args(argv)
+
+    estado = ejecutar(
+        args.entrada, args.salida,
+        categorias=args.categorias,
+        tam_bloque=args.tam_bloque,
+        workers=args.workers,
+        reanudar=args.reanudar,
+        ruta_cache=args.cache,
+        ruta_almacen=args.almacen,
+        ruta_dem=args.dem,
+        # El limitador de tasa es por proceso: cada worker recibe su parte del total
+        opciones_lote={"tam_grupo": args.tam_grupo,
+                       "peticiones_por_segundo": args.peticiones_por_segundo / max(1, args.workers)},
+    )
+    print(f"✅ {estado['parcelas']} parcelas procesadas -> {args.salida}", file=sys.stderr)
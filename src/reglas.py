@@ -0,0 +1,176 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Esquema esperado de los CSV de data/referencias
+COLUMNAS_COMUNES = ["especie", "variedad", "temp_min", "temp_max", "pendiente_max", "riesgo_extra"]
+COLUMNAS_CULTIVO = ["precip_min_mm", "precip_max_mm", "ph_min", "ph_max"]
+COLUMNAS_ANIMAL = ["humedad_max", "altitud_max_m"]
+CAMPOS_NUMERICOS = ["temp_min", "temp_max", "pendiente_max", "ph_min", "ph_max",
+                    "precip_min_mm", "precip_max_mm", "altitud_max_m", "humedad_max"]
+
+
+class Regla:
+    """
+    Regla técnica compilada de una variedad (una fila del CSV).
+    Admite acceso tipo diccionario (regla['temp_min'], regla.get(...)) para ser
+    intercambiable con la fila de pandas que se usaba antes.
+    """
+    __slots__ = ["categoria", "especie", "variedad", "riesgo_extra", "es_cultivo"] + CAMPOS_NUMERICOS
+
+    def __init__(self, categoria, fila):
+        self.categoria = categoria
+        self.especie = fila["especie"]
+        self.variedad = fila["variedad"]
+        self.riesgo_extra = fila.get("riesgo_extra", "N/A")
+        self.es_cultivo = "Cultivo" in self.especie
+        for campo in CAMPOS_NUMERICOS:
+            setattr(self, campo, fila.get(campo, np.nan))
+
+    def __getitem__(self, campo):
+        try:
+            return getattr(self, campo)
+        except AttributeError:
+            raise KeyError(campo) from None
+
+    def get(self, campo, defecto=None):
+        return getattr(self, campo, defecto)
+
+    def __repr__(self):
+        return f"Regla({self.categoria!r}, {self.variedad!r})"
+
+
+class RegistroReglas:
+    """
+    MÓDULO DE REGLAS (reglas.py)
+    Carga una sola vez los CSV de data/referencias, valida su esquema y compila
+    cada fila en una Regla indexada por (categoria, variedad). Un archivo solo se
+    vuelve a leer cuando cambia su fecha de modificación. Es seguro compartirlo
+    entre hilos (sesiones de Streamlit).
+    """
+
+    def __init__(self, base_path="data/referencias"):
+        self.base_path = base_path
+        self._lock = threading.RLock()
+        self._categorias = {}   # categoria -> (mtime, DataFrame, {variedad: Regla})
+        self._tablas = {}       # tuple(categorias) -> (mtimes, DataFrame, arrays, etiquetas)
+
+    def _archivo(self, categoria):
+        return os.path.join(self.base_path, f"{categoria}.csv")
+
+    @staticmethod
+    def validar(categoria, df):
+        """
+        VALIDACIÓN DE ESQUEMA: columnas obligatorias, valores numéricos y variedades únicas.
+        """
+        faltantes = [c for c in COLUMNAS_COMUNES if c not in df.columns]
+        if not faltantes:
+            especificas = COLUMNAS_CULTIVO if df["especie"].str.contains("Cultivo", regex=False).any() else COLUMNAS_ANIMAL
+            faltantes = [c for c in especificas if c not in df.columns]
+        if faltantes:
+            raise ValueError(f"{categoria}.csv: faltan columnas {faltantes}")
+
+        for columna in CAMPOS_NUMERICOS:
+            if columna in df.columns and not pd.api.types.is_numeric_dtype(df[columna]):
+                raise ValueError(f"{categoria}.csv: la columna '{columna}' no es numérica")
+
+        duplicadas = df["variedad"][df["variedad"].duplicated()].tolist()
+        if duplicadas:
+            raise ValueError(f"{categoria}.csv: variedades duplicadas {duplicadas}")
+
+    def _vigente(self, categoria):
+        """
+        Devuelve la entrada compilada de la categoría, recargándola si el CSV cambió.
+        Lanza FileNotFoundError si la categoría no existe.
+        """
+        mtime = os.stat(self._archivo(categoria)).st_mtime_ns
+        entrada = self._categorias.get(categoria)
+        if entrada is not None and entrada[0] == mtime:
+            return entrada
+
+        with self._lock:
+            entrada = self._categorias.get(categoria)
+            if entrada is None or entrada[0] != mtime:
+                df = pd.read_csv(self._archivo(categoria))
+                self.validar(categoria, df)
+                reglas = {fila["variedad"]: Regla(categoria, fila) for fila in df.to_dict("records")}
+                entrada = (mtime, df, reglas)
+                self._categorias[categoria] = entrada
+            return entrada
+
+    def dataframe(self, categoria):
+        """
+        DataFrame de reglas de la categoría (compartido: no modificar).
+        """
+        return self._vigente(categoria)[1]
+
+    def regla(self, categoria, variedad):
+        """
+        Búsqueda O(1) de la regla de una variedad. Lanza KeyError si no existe.
+        """
+        return self._vigente(categoria)[2][variedad]
+
+    def tabla(self, categorias, con_etiquetas=False):
+        """
+        Une varias categorías en un DataFrame (con columna 'categoria') y en arrays
+        NumPy por columna técnica listos para puntuar_matriz. Se cachea por
+        combinación de categorías mientras ningún CSV cambie.
+        Con con_etiquetas=True devuelve además un dict de arrays alineados con las
+        filas ('categoria', 'variedad', 'especie' y 'regla' con objetos Regla), para
+        indexar filas sin pasar por pandas.
+        """
+        entradas = []
+        for categoria in categorias:
+            try:
+                entradas.append((categoria, self._vigente(categoria)))
+            except FileNotFoundError:
+                continue
+        if not entradas:
+            raise FileNotFoundError(f"Sin reglas para las categorías {list(categorias)}")
+
+        clave = tuple(categorias)
+        mtimes = tuple(entrada[0] for _, entrada in entradas)
+        cacheada = self._tablas.get(clave)
+        if cacheada is None or cacheada[0] != mtimes:
+            cacheada = self._compilar_tabla(entradas)
+            with self._lock:
+                self._tablas[clave] = cacheada
+        _, tabla, arrays, etiquetas = cacheada
+        return (tabla, arrays, etiquetas) if con_etiquetas else (tabla, arrays)
+
+    @staticmethod
+    def _compilar_tabla(entradas):
+        """
+        (mtimes, DataFrame, arrays, etiquetas) de las entradas [(categoria, entrada vigente)].
+        """
+        mtimes = tuple(entrada[0] for _, entrada in entradas)
+        tabla = pd.concat(
+            [entrada[1].assign(categoria=categoria) for categoria, entrada in entradas],
+            ignore_index=True,
+        )
+        arrays = {"es_cultivo": tabla["especie"].str.contains("Cultivo", regex=False).to_numpy()}
+        for columna in CAMPOS_NUMERICOS:
+            valores = tabla[columna] if columna in tabla else np.nan
+            arrays[columna] = np.broadcast_to(np.asarray(valores, dtype=float), (len(tabla),))
+        etiquetas = {columna: tabla[columna].to_numpy() for columna in ["categoria", "variedad", "especie"]}
+        etiquetas["regla"] = np.array(
+            [entrada[2][variedad] for _, entrada in entradas for variedad in entrada[1]["variedad"]],
+            dtype=object)
+        return mtimes, tabla, arrays, etiquetas
+
+
+# Registros compartidos por ruta (una sola carga por proceso)
+_REGISTROS = {}
+_LOCK_REGISTROS = threading.Lock()
+
+
+def obtener_registro(base_path="data/referencias"):
+    """
+    Devuelve el RegistroReglas compartido para una carpeta de referencias.
+    """
+    clave = os.path.abspath(base_path)
+    with _LOCK_REGISTROS:
+        if clave not in _REGISTROS:
+            _REGISTROS[clave] = RegistroReglas(base_path)
+        return _REGISTROS[clave]
@@ -0,0 +1,201 @@
+"""
+MÓDULO DE TOPOGRAFÍA (topografia.py)
+Calcula la pendiente (%) y la orientación (grados desde el norte, sentido horario)
+a partir de un modelo digital de elevación (DEM) local. El DEM se abre con memoria
+mapeada y se lee por ventanas (tiles con un borde de 1 celda); el kernel de
+diferencias finitas de Horn se aplica vectorizado a toda la ventana y los tiles
+calculados quedan en una caché LRU para que las consultas vecinas los reutilicen.
+"""
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Metros por grado de latitud (aproximación esférica)
+METROS_POR_GRADO = 111_320.0
+
+
+def pendiente_orientacion(z, lats, resolucion):
+    """
+    KERNEL DE DIFERENCIAS FINITAS (Horn, 3x3):
+    - z: elevaciones (filas + 2, columnas + 2) con un borde de 1 celda; la fila
+      aumenta hacia el norte.
+    - lats: latitud de cada fila interior (filas,), para el ancho de celda en metros.
+    Devuelve (pendiente %, orientación °) de la región interior (filas, columnas).
+    """
+    z = np.asarray(z, dtype=np.float64)
+    dy = resolucion * METROS_POR_GRADO
+    dx = (dy * np.cos(np.radians(np.asarray(lats, dtype=float))))[:, None]
+
+    sur, centro, norte = z[:-2], z[1:-1], z[2:]
+    oeste = slice(None, -2)
+    este = slice(2, None)
+    medio = slice(1, -1)
+
+    dz_este = (
+        (norte[:, este] + 2 * centro[:, este] + sur[:, este])
+        - (norte[:, oeste] + 2 * centro[:, oeste] + sur[:, oeste])
+    ) / (8 * dx)
+    dz_norte = (
+        (norte[:, oeste] + 2 * norte[:, medio] + norte[:, este])
+        - (sur[:, oeste] + 2 * sur[:, medio] + sur[:, este])
+    ) / (8 * dy)
+
+    pendiente = 100 * np.hypot(dz_este, dz_norte)
+    # Orientación: dirección hacia donde desciende el terreno
+    orientacion = np.degrees(np.arctan2(-dz_este, -dz_norte)) % 360
+    return pendiente, orientacion
+
+
+class ModeloElevacion:
+    """
+    DEM local de solo lectura. Estructura de la carpeta (igual que AlmacenClima):
+        meta.json     -> {lat_min, lon_min, resolucion, filas, columnas}
+        altitud.npy   -> float32 (filas x columnas), fila 0 = lat_min (sur)
+    - tam_tile: celdas por lado de cada ventana leída del disco.
+    - max_tiles: tiles de pendiente/orientación conservados en la caché LRU.
+    """
+
+    def __init__(self, carpeta, tam_tile=256, max_tiles=64):
+        with open(os.path.join(carpeta, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.lat_min = meta["lat_min"]
+        self.lon_min = meta["lon_min"]
+        self.resolucion = meta["resolucion"]
+        self.filas = meta["filas"]
+        self.columnas = meta["columnas"]
+        self.altitud = np.load(os.path.join(carpeta, "altitud.npy"), mmap_mode="r")
+        self.tam_tile = tam_tile
+        self.max_tiles = max_tiles
+        self.lecturas = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ventana(self, f0, f1, c0, c1):
+        """
+        Lee las filas [f0, f1) y columnas [c0, c1) con un borde de 1 celda
+        (replicando el valor del extremo en los límites del DEM).
+        """
+        self.lecturas += 1
+        r0, r1 = max(f0 - 1, 0), min(f1 + 1, self.filas)
+        k0, k1 = max(c0 - 1, 0), min(c1 + 1, self.columnas)
+        bloque = np.asarray(self.altitud[r0:r1, k0:k1], dtype=np.float64)
+        return np.pad(bloque, ((r0 - (f0 - 1), (f1 + 1) - r1), (k0 - (c0 - 1), (c1 + 1) - k1)), mode="edge")
+
+    def calcular_ventana(self, f0, f1, c0, c1):
+        """
+        Pendiente y orientación de las celdas [f0, f1) x [c0, c1) leyendo solo esa ventana.
+        """
+        lats = self.lat_min + np.arange(f0, f1) * self.resolucion
+        return pendiente_orientacion(self._ventana(f0, f1, c0, c1), lats, self.resolucion)
+
+    def _tile(self, ti, tj):
+        clave = (ti, tj)
+        with self._lock:
+            tile = self._tiles.get(clave)
+            if tile is not None:
+                self._tiles.move_to_end(clave)
+                return tile
+        f0, c0 = ti * self.tam_tile, tj * self.tam_tile
+        tile = self.calcular_ventana(f0, min(f0 + self.tam_tile, self.filas),
+                                     c0, min(c0 + self.tam_tile, self.columnas))
+        with self._lock:
+            self._tiles[clave] = tile
+            self._tiles.move_to_end(clave)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def consultar_lote(self, lats, lons):
+        """
+        Pendiente (%) y orientación (°) en la celda más cercana a cada punto.
+        Los puntos fuera del DEM quedan en NaN. Se agrupan por tile para leer cada
+        ventana una sola vez.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        fila = np.rint((lats - self.lat_min) / self.resolucion)
+        columna = np.rint((lons - self.lon_min) / self.resolucion)
+        dentro = (fila >= 0) & (fila < self.filas) & (columna >= 0) & (columna < self.columnas)
+
+        pendiente = np.full(len(lats), np.nan)
+        orientacion = np.full(len(lats), np.nan)
+        fila = fila[dentro].astype(np.intp)
+        columna = columna[dentro].astype(np.intp)
+        indices = np.flatnonzero(dentro)
+        tiles = (fila // self.tam_tile) * (self.columnas // self.tam_tile + 1) + columna // self.tam_tile
+        for tile in np.unique(tiles):
+            mascara = tiles == tile
+            ti, tj = fila[mascara][0] // self.tam_tile, columna[mascara][0] // self.tam_tile
+            tile_pendiente, tile_orientacion = self._tile(ti, tj)
+            fi = fila[mascara] - ti * self.tam_tile
+            cj = columna[mascara] - tj * self.tam_tile
+            pendiente[indices[mascara]] = tile_pendiente[fi, cj]
+            orientacion[indices[mascara]] = tile_orientacion[fi, cj]
+        return pendiente, orientacion
+
+    def consultar(self, lat, lon):
+        """
+        (pendiente %, orientación °) de un punto, o None si está fuera del DEM.
+        """
+        pendiente, orientacion = self.consultar_lote([lat], [lon])
+        if math.isnan(pendiente[0]):
+            return None
+        return float(pendiente[0]), float(orientacion[0])
+
+    def malla(self, bbox):
+        """
+        PROCESAMIENTO DE MALLA:
+        Pendiente y orientación de todas las celdas del DEM dentro del bbox
+        (lat_min, lon_min, lat_max, lon_max) con una sola lectura por ventana.
+        Devuelve (pendiente, orientacion, lats, lons); fila 0 = sur.
+        """
+        lat_min, lon_min, lat_max, lon_max = bbox
+        f0 = max(0, int(math.ceil((lat_min - self.lat_min) / self.resolucion)))
+        f1 = min(self.filas, int(math.floor((lat_max - self.lat_min) / self.resolucion)) + 1)
+        c0 = max(0, int(math.ceil((lon_min - self.lon_min) / self.resolucion)))
+        c1 = min(self.columnas, int(math.floor((lon_max - self.lon_min) / self.resolucion)) + 1)
+        if f0 >= f1 or c0 >= c1:
+            raise ValueError(f"El bbox {bbox} no intersecta el DEM")
+        pendiente, orientacion = self.calcular_ventana(f0, f1, c0, c1)
+        lats = self.lat_min + np.arange(f0, f1) * self.resolucion
+        lons = self.lon_min + np.arange(c0, c1) * self.resolucion
+        return pendiente, orientacion, lats, lons
+
+
+def guardar_dem(carpeta, altitud, lat_min, lon_min, resolucion):
+    """
+    Guarda una matriz de elevaciones (fila 0 = sur) en el formato de ModeloElevacion.
+    """
+    altitud = np.asarray(altitud, dtype=np.float32)
+    os.makedirs(carpeta, exist_ok=True)
+    np.save(os.path.join(carpeta, "altitud.npy"), altitud)
+    meta = {
+        "lat_min": float(lat_min), "lon_min": float(lon_min), "resolucion": float(resolucion),
+        "filas": altitud.shape[0], "columnas": altitud.shape[1],
+    }
+    with open(os.path.join(carpeta, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return ModeloElevacion(carpeta)
+
+
+def dem_sintetico(carpeta, lat_min=-12.5, lon_min=-77.5, resolucion=0.001, filas=1000, columnas=1000,
+                  pendiente_este=10.0):
+    """
+    DEM DE PRUEBA (sin red): plano inclinado que sube hacia el este con la
+    pendiente indicada (%) más una colina gaussiana en el centro. Sobre el plano
+    la pendiente esperada es 'pendiente_este' y la orientación 270° (oeste).
+    """
+    lats = lat_min + np.arange(filas) * resolucion
+    lons = lon_min + np.arange(columnas) * resolucion
+    este_m = (lons - lon_min)[None, :] * METROS_POR_GRADO * np.cos(np.radians(lats))[:, None]
+    norte_m = ((lats - lat_min) * METROS_POR_GRADO)[:, None]
+    altitud = 500 + este_m * pendiente_este / 100
+
+    centro_este, centro_norte = este_m.max() / 2, norte_m.max() / 2
+    radio = min(este_m.max(), norte_m.max()) / 10
+    altitud = altitud + 200 * np.exp(-((este_m - centro_este) ** 2 + (norte_m - centro_norte) ** 2) / (2 * radio ** 2))
+    return guardar_dem(carpeta, altitud, lat_min, lon_min, resolucion)
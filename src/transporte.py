@@ -0,0 +1,183 @@
+"""
+MÓDULO DE TRANSPORTE HTTP (transporte.py)
+Capa entre AgroClimaClient y la red: sesión con conexiones persistentes,
+reintentos con backoff exponencial y jitter, un circuit breaker por servicio
+y coalescencia de peticiones idénticas en vuelo (una sola descarga para todas
+las sesiones que piden las mismas coordenadas al mismo tiempo).
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.metricas import SIN_METRICAS
+
+
+class ErrorTransitorio(requests.HTTPError):
+    """
+    Respuesta 5xx o 429: el servidor puede recuperarse, se reintenta.
+    """
+
+
+class CircuitoAbierto(requests.RequestException):
+    """
+    El servicio acumuló demasiados fallos seguidos y no se consulta durante el enfriamiento.
+    """
+
+
+class _Circuito:
+    """
+    Circuit breaker de un servicio: cerrado -> abierto (tras 'umbral' fallos seguidos)
+    -> semiabierto (pasado el enfriamiento deja pasar una prueba) -> cerrado/abierto.
+    """
+
+    def __init__(self, umbral, enfriamiento):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.fallos = 0
+        self.abierto_hasta = None
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        if self.abierto_hasta is None: return "cerrado"
+        return "abierto" if time.monotonic() < self.abierto_hasta else "semiabierto"
+
+    def permitir(self):
+        with self._lock:
+            if self.abierto_hasta is None: return True
+            if time.monotonic() < self.abierto_hasta or self._prueba_en_curso: return False
+            self._prueba_en_curso = True
+            return True
+
+    def exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.abierto_hasta = None
+            self._prueba_en_curso = False
+
+    def soltar_prueba(self):
+        """
+        Libera la prueba del estado semiabierto sin registrar éxito ni fallo.
+        """
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def fallo(self):
+        """
+        Registra un fallo. Devuelve True si el circuito acaba de abrirse.
+        """
+        with self._lock:
+            self.fallos += 1
+            if self._prueba_en_curso or self.fallos >= self.umbral:
+                self._prueba_en_curso = False
+                self.abierto_hasta = time.monotonic() + self.enfriamiento
+                return True
+            return False
+
+
+class Transporte:
+    """
+    Cliente HTTP resiliente para las APIs JSON de Open-Meteo.
+    - reintentos: reintentos ante errores de red, timeouts, 5xx, 429 y cuerpos no JSON.
+    - backoff_base / backoff_max: espera aleatoria en [0, min(max, base * 2^intento)].
+    - timeouts: dict servicio -> segundos que reemplaza al timeout de cada llamada.
+    - verificar_tls: verificación de certificados (desactivada por compatibilidad de red).
+    - umbral_fallos / enfriamiento: fallos seguidos que abren el circuito y segundos abierto.
+    """
+
+    def __init__(self, reintentos=2, backoff_base=0.25, backoff_max=4.0, timeouts=None,
+                 verificar_tls=False, umbral_fallos=5, enfriamiento=30.0, metricas=None):
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeouts = dict(timeouts or {})
+        self.verificar_tls = verificar_tls
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.metricas = metricas or SIN_METRICAS
+
+        # Sesión HTTP con conexiones persistentes (keep-alive) reutilizadas entre consultas
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+
+        self._circuitos = {}
+        self._en_vuelo = {}
+        self._lock = threading.Lock()
+
+    def circuito(self, servicio):
+        with self._lock:
+            if servicio not in self._circuitos:
+                self._circuitos[servicio] = _Circuito(self.umbral_fallos, self.enfriamiento)
+            return self._circuitos[servicio]
+
+    def get_json(self, servicio, url, params, timeout=10):
+        """
+        GET que devuelve el JSON de la respuesta. Si otra llamada idéntica ya está
+        en curso se espera su resultado (como máximo 'timeout' segundos) en lugar de
+        repetir la descarga.
+        """
+        clave = (url, json.dumps(params, sort_keys=True))
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = self._en_vuelo[clave] = Future()
+
+        timeout = self.timeouts.get(servicio, timeout)
+        if not lider:
+            self.metricas.contar("coalescidas", servicio=servicio)
+            try:
+                return futuro.result(timeout=timeout)
+            except FuturesTimeout:
+                raise requests.Timeout(f"Tiempo agotado esperando la petición en curso a '{servicio}'") from None
+
+        try:
+            datos = self._con_reintentos(servicio, url, params, timeout)
+            futuro.set_result(datos)
+            return datos
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+
+    def _con_reintentos(self, servicio, url, params, timeout):
+        circuito = self.circuito(servicio)
+        for intento in range(self.reintentos + 1):
+            if not circuito.permitir():
+                raise CircuitoAbierto(f"Circuito abierto para '{servicio}'")
+            try:
+                resp = self.session.get(url, params=params, verify=self.verificar_tls, timeout=timeout)
+                if resp.status_code >= 500 or resp.status_code == 429:
+                    raise ErrorTransitorio(f"HTTP {resp.status_code} en '{servicio}'", response=resp)
+                datos = resp.json()
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.ContentDecodingError, ErrorTransitorio, ValueError):
+                # ValueError: cuerpo que no es JSON (respuesta truncada o de un proxy)
+                if circuito.fallo():
+                    self.metricas.contar("circuito_abierto", servicio=servicio)
+                if intento == self.reintentos:
+                    raise
+                self.metricas.contar("reintentos", servicio=servicio)
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento)))
+                continue
+            except requests.RequestException:
+                # Otros errores de la petición (URL inválida, redirecciones): fallo sin reintento
+                if circuito.fallo():
+                    self.metricas.contar("circuito_abierto", servicio=servicio)
+                raise
+            except BaseException:
+                # Errores ajenos a la red: la prueba del semiabierto no puede quedar tomada
+                circuito.soltar_prueba()
+                raise
+            circuito.exito()
+            return datos
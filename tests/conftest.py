@@ -0,0 +1,21 @@
+"""
+Fixtures compartidas: servidor Open-Meteo simulado (benchmarks/servidor_stub.py).
+"""
+import pytest
+
+from benchmarks.servidor_stub import ServidorStub
+
+# Puerto local sin servidor: las conexiones se rechazan al instante
+URL_CAIDA = "http://127.0.0.1:9"
+
+
+@pytest.fixture
+def stub():
+    with ServidorStub() as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def stub_lento():
+    with ServidorStub(latencia=0.3) as servidor:
+        yield servidor
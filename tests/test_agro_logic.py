@@ -0,0 +1,74 @@
+import pytest
+
+from benchmarks.sitios import datos_api, generar_sitios
+from src.agro_logic import (
+    RAZON_ALTITUD, RAZON_HUMEDAD, RAZON_LLUVIA, RAZON_PENDIENTE, RAZON_PH, RAZON_TEMPERATURA,
+    AgroAnalisis, EvaluacionSitio, describir_codigos,
+)
+from src.api_client import AgroClimaClient
+from src.transporte import Transporte
+from tests.conftest import URL_CAIDA
+
+
+@pytest.fixture(scope="module")
+def analista():
+    return AgroAnalisis()
+
+
+# Validación escalar -> bit de razón del motor por lotes
+BIT_VALIDACION = {
+    "temperatura": RAZON_TEMPERATURA,
+    "pendiente": RAZON_PENDIENTE,
+    "ph": RAZON_PH,
+    "lluvia": RAZON_LLUVIA,
+    "altitud": RAZON_ALTITUD,
+    "humedad": RAZON_HUMEDAD,
+}
+
+
+@pytest.mark.parametrize("semilla", [0, 1])
+def test_analizar_lote_igual_a_analizar(analista, semilla):
+    sitios = generar_sitios(200, semilla=semilla)
+    # Algunos sitios justo en los umbrales de las reglas
+    sitios.loc[:19, "temp_actual"] = 18.0
+    sitios.loc[20:39, "pendiente"] = 15.0
+    sitios.loc[40:59, "ph"] = 5.5
+    scores, codigos = analista.analizar_lote(sitios)
+    tabla = analista.tabla_reglas()
+
+    for i, datos in enumerate(datos_api(sitios)):
+        for j, fila in enumerate(tabla.itertuples()):
+            score, razones, riesgo = analista.analizar(datos, fila.categoria, fila.variedad)
+            evaluacion = EvaluacionSitio(analista.registro.regla(fila.categoria, fila.variedad), datos)
+            bits = sum(BIT_VALIDACION[nombre]
+                       for nombre, (penalizacion, _) in evaluacion.resultados.items() if penalizacion)
+            assert scores.iat[i, j] == score, (i, fila.variedad)
+            assert codigos.iat[i, j] == bits, (i, fila.variedad)
+            avisos = [razon for razon in razones if not razon.startswith("✅")]
+            assert len(avisos) == len(describir_codigos(codigos.iat[i, j]))
+            assert riesgo == fila.riesgo_extra
+
+
+@pytest.mark.parametrize("categoria, variedad", [("cultivos", "Papa"), ("bovinos", "Holstein")])
+def test_evaluacion_con_el_respaldo_de_obtener_todo(analista, categoria, variedad):
+    cliente = AgroClimaClient(transporte=Transporte(reintentos=0),
+                              weather_url=f"{URL_CAIDA}/v1/forecast", archive_url=f"{URL_CAIDA}/v1/archive")
+    datos = cliente.obtener_todo(-12.0, -77.0)
+    assert datos["respaldo"]
+    evaluacion = analista.evaluacion(datos, categoria, variedad)
+    evaluacion.actualizar(ph=6.0)
+    score, razones, _ = evaluacion.resultado()
+    assert 0 <= score <= 100 and razones
+
+
+def test_evaluacion_completa_variables_ausentes(analista):
+    datos = {
+        "clima": {"temp_actual": 14, "humedad": 60, "precipitacion_anual_estimada": 650},
+        "topografia": {"altitud": 3000},
+        "solar": {"horas_luz": 12},
+        "suelo": {"ph": 6.5},
+    }
+    completos = dict(datos, topografia={"altitud": 3000, "pendiente": 0.0})
+    assert analista.evaluacion(datos, "cultivos", "Papa").resultado() == \
+        analista.analizar(completos, "cultivos", "Papa")
+    assert "pendiente" not in datos["topografia"]
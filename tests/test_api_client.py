@@ -0,0 +1,83 @@
+import time
+
+import pandas as pd
+
+from benchmarks.servidor_stub import ServidorStub
+from src.almacen_clima import construir_desde_tabla
+from src.api_client import AgroClimaClient
+from src.cache import CacheRespuestas
+from src.transporte import Transporte
+from tests.conftest import URL_CAIDA
+
+
+def _cliente(urls, **opciones):
+    return AgroClimaClient(transporte=Transporte(reintentos=0), **dict(urls, **opciones))
+
+
+def test_obtener_todo_combina_pronostico_y_archivo(stub):
+    datos = _cliente(stub.urls()).obtener_todo(-12.0, -77.0)
+    assert datos["clima"]["temp_actual"] == 19.0
+    assert datos["clima"]["precipitacion_anual_estimada"] > 0
+    assert datos["topografia"]["altitud"] == 2570.0
+    assert datos["solar"]["horas_luz"] == 10.0
+    assert not datos["respaldo"] and not datos["respaldo_archivo"]
+    assert stub.peticiones == {"/v1/forecast": 1, "/v1/archive": 1}
+    assert datos["origen"] == "api"
+
+
+def test_obtener_todo_consulta_archivo_y_pronostico_en_paralelo(stub_lento):
+    cliente = _cliente(stub_lento.urls())
+    inicio = time.monotonic()
+    cliente.obtener_todo(-12.0, -77.0)
+    # Dos consultas de 0.3 s: en serie tardarían al menos 0.6 s
+    assert time.monotonic() - inicio < 0.55
+
+
+def test_obtener_todo_respeta_el_plazo_total():
+    with ServidorStub(latencia=1.0) as stub:
+        inicio = time.monotonic()
+        datos = _cliente(stub.urls()).obtener_todo(-12.0, -77.0, timeout_total=0.3)
+        assert time.monotonic() - inicio < 0.8
+    assert datos["respaldo"]
+    assert set(datos) >= {"clima", "topografia", "solar", "suelo"}
+    assert datos["clima"]["temp_actual"] == 20
+
+
+def test_obtener_todo_marca_la_falla_del_archivo(stub):
+    datos = _cliente(stub.urls(), archive_url=f"{URL_CAIDA}/v1/archive").obtener_todo(-12.0, -77.0)
+    assert not datos["respaldo"]
+    assert datos["respaldo_archivo"]
+    assert datos["clima"]["precipitacion_anual_estimada"] == 0.0
+    assert datos["clima"]["temp_actual"] == 19.0
+
+
+def test_obtener_todo_devuelve_respaldo_si_falla_el_pronostico(stub):
+    datos = _cliente(stub.urls(), weather_url=f"{URL_CAIDA}/v1/forecast").obtener_todo(-12.0, -77.0)
+    assert datos["respaldo"]
+    assert datos["clima"] == {"temp_actual": 20, "humedad": 60, "precipitacion_anual_estimada": 0}
+
+
+def test_obtener_lote_conserva_datos_si_falla_la_cache(stub, caplog):
+    class CacheRota(CacheRespuestas):
+        def guardar(self, servicio, params, valor):
+            raise RuntimeError("disco lleno")
+
+    cliente = _cliente(stub.urls(), cache=CacheRota())
+    tabla = cliente.obtener_lote([(-12.0, -77.0), (-13.0, -72.0), (-8.1, -79.0)])
+    assert not tabla["respaldo"].any()
+    assert not tabla["respaldo_archivo"].any()
+    assert "Error caché lote" in caplog.text
+
+
+def test_obtener_todo_desde_el_almacen_no_sale_a_la_red(tmp_path):
+    tabla = pd.DataFrame([
+        {"lat": lat, "lon": lon, "temp_actual": 18.0, "humedad": 70.0,
+         "precipitacion_anual_estimada": 900.0, "altitud": 2500.0, "horas_luz": 11.0}
+        for lat in (-12.1, -12.0) for lon in (-77.1, -77.0)
+    ])
+    almacen = construir_desde_tabla(tabla, str(tmp_path / "almacen"), 0.1)
+    urls = {"weather_url": f"{URL_CAIDA}/v1/forecast", "archive_url": f"{URL_CAIDA}/v1/archive"}
+    datos = _cliente(urls, almacen=almacen).obtener_todo(-12.05, -77.05)
+    assert datos["origen"] == "almacen"
+    assert not datos["respaldo"] and not datos["respaldo_archivo"]
+    assert datos["clima"]["precipitacion_anual_estimada"] == 900.0
@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+from src import cache as modulo_cache
+from src.cache import CacheRespuestas
+
+PARAMS = {"latitude": -12.0464, "longitude": -77.0428, "current": "temperature_2m"}
+
+
+class Reloj:
+    def __init__(self, inicio=1_000_000.0):
+        self.ahora = inicio
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    r = Reloj()
+    monkeypatch.setattr(modulo_cache.time, "time", r)
+    return r
+
+
+def test_fallo_y_acierto_en_memoria():
+    cache = CacheRespuestas()
+    assert cache.obtener("pronostico", PARAMS) is None
+    cache.guardar("pronostico", PARAMS, {"t": 19})
+    assert cache.obtener("pronostico", PARAMS) == {"t": 19}
+    # Coordenadas que redondean a la misma clave (3 decimales)
+    assert cache.obtener("pronostico", dict(PARAMS, latitude=-12.04641)) == {"t": 19}
+    stats = cache.estadisticas()
+    assert (stats["aciertos"], stats["fallos"]) == (2, 1)
+
+
+def test_ttl_por_servicio(reloj):
+    cache = CacheRespuestas(ttl={"pronostico": 60})
+    cache.guardar("pronostico", PARAMS, {"t": 19})
+    cache.guardar("geocodificacion", {"name": "Lima"}, {"results": []})
+    reloj.ahora += 59
+    assert cache.obtener("pronostico", PARAMS) == {"t": 19}
+    reloj.ahora += 2
+    assert cache.obtener("pronostico", PARAMS) is None
+    # geocodificación no expira
+    reloj.ahora += 10 ** 7
+    assert cache.obtener("geocodificacion", {"name": "Lima"}) == {"results": []}
+
+
+def test_ttl_en_disco(tmp_path, reloj):
+    ruta = str(tmp_path / "c.sqlite")
+    CacheRespuestas(ruta_sqlite=ruta, ttl={"archivo": 60}).guardar("archivo", PARAMS, [1, 2])
+    reloj.ahora += 61
+    assert CacheRespuestas(ruta_sqlite=ruta).obtener("archivo", PARAMS) is None
+
+
+def test_desalojo_lru_en_memoria():
+    cache = CacheRespuestas(max_entradas=2)
+    for i in range(3):
+        cache.guardar("pronostico", {"latitude": i}, i)
+    cache.obtener("pronostico", {"latitude": 1})
+    cache.guardar("pronostico", {"latitude": 3}, 3)
+    assert cache.obtener("pronostico", {"latitude": 0}) is None
+    assert cache.obtener("pronostico", {"latitude": 2}) is None
+    assert cache.obtener("pronostico", {"latitude": 1}) == 1
+    assert cache.estadisticas()["desalojos"] == 2
+
+
+def test_desalojo_en_disco_por_tamano(tmp_path, reloj):
+    cache = CacheRespuestas(ruta_sqlite=str(tmp_path / "c.sqlite"), max_bytes_disco=1000)
+    for i in range(100):
+        reloj.ahora += 1
+        cache.guardar("geocodificacion", {"name": i}, "x" * 98)
+    filas = cache._db.execute("SELECT COUNT(*), SUM(LENGTH(valor)) FROM respuestas").fetchone()
+    assert filas[1] <= 1000
+    # Sobreviven las de acceso más reciente
+    assert cache._db.execute(
+        "SELECT COUNT(*) FROM respuestas WHERE clave = ?", (cache.clave("geocodificacion", {"name": 99}),)
+    ).fetchone()[0] == 1
+
+
+def test_persiste_entre_instancias(tmp_path):
+    ruta = str(tmp_path / "c.sqlite")
+    CacheRespuestas(ruta_sqlite=ruta).guardar("geocodificacion", {"name": "Lima"}, {"ok": True})
+    assert CacheRespuestas(ruta_sqlite=ruta).obtener("geocodificacion", {"name": "Lima"}) == {"ok": True}
+
+
+def test_dos_instancias_comparten_archivo_sin_bloquearse(tmp_path):
+    ruta = str(tmp_path / "c.sqlite")
+    a = CacheRespuestas(ruta_sqlite=ruta)
+    b = CacheRespuestas(ruta_sqlite=ruta)
+    b._db.execute("PRAGMA busy_timeout = 200")
+    a.guardar("pronostico", PARAMS, {"t": 19})
+    # Un acierto en disco de una instancia nueva no debe dejar la transacción abierta
+    c = CacheRespuestas(ruta_sqlite=ruta)
+    assert c.obtener("pronostico", PARAMS) == {"t": 19}
+    assert not c._db.in_transaction
+    b.guardar("pronostico", dict(PARAMS, latitude=0.0), {"t": 25})
+    assert a.obtener("pronostico", dict(PARAMS, latitude=0.0)) == {"t": 25}
+
+
+def test_errores_de_disco_no_son_fatales(tmp_path, caplog):
+    ruta = str(tmp_path / "c.sqlite")
+    escritora = CacheRespuestas(ruta_sqlite=ruta)
+    lectora = CacheRespuestas(ruta_sqlite=ruta)
+    escritora.guardar("geocodificacion", {"name": "Lima"}, {"ok": True})
+    for cache in (escritora, lectora):
+        cache._db.execute("PRAGMA busy_timeout = 50")
+
+    bloqueo = sqlite3.connect(ruta)
+    bloqueo.execute("BEGIN EXCLUSIVE")
+    try:
+        # Escritura fallida: se registra y la respuesta queda en memoria
+        escritora.guardar("pronostico", PARAMS, {"t": 19})
+        assert escritora.obtener("pronostico", PARAMS) == {"t": 19}
+        # Lectura fallida: se trata como fallo de caché
+        assert lectora.obtener("geocodificacion", {"name": "Lima"}) is None
+        assert caplog.text.count("Error caché en disco") == 2
+    finally:
+        bloqueo.rollback()
+        bloqueo.close()
+    assert lectora.obtener("geocodificacion", {"name": "Lima"}) == {"ok": True}
@@ -0,0 +1,92 @@
+import pytest
+
+from src.diagnostico import consejos_lote, generar_consejos_experto
+
+IDEAL = [("✨ **CONDICIONES IDEALES**", "success")]
+
+
+def _datos(temp=15, humedad=60, altitud=1000, lluvia=800, pendiente=0):
+    return {
+        "clima": {"temp_actual": temp, "humedad": humedad, "precipitacion_anual_estimada": lluvia},
+        "topografia": {"altitud": altitud, "pendiente": pendiente},
+        "solar": {"horas_luz": 12},
+        "suelo": {"ph": 6.5},
+    }
+
+
+def _titulos(consejos):
+    return [(msg.split("\n")[0], tipo) for msg, tipo in consejos]
+
+
+# (categoría, datos, pH, consejos esperados: primera línea y tipo), en los umbrales de cada regla
+CASOS = [
+    # pH: < 5.5 ácido, > 7.8 alcalino (los extremos no disparan)
+    ("cultivos", _datos(), 5.49, [("☠️ **ACIDEZ DETECTADA (pH 5.49)**", "error")]),
+    ("cultivos", _datos(), 5.5, IDEAL),
+    ("cultivos", _datos(), 7.8, IDEAL),
+    ("cultivos", _datos(), 7.81, [("⚠️ **ALCALINIDAD ALTA (pH 7.81)**", "warning")]),
+    # Heladas: altitud > 3500 y temperatura < 10
+    ("cultivos", _datos(altitud=3501, temp=9.9), 6.5, [("❄️ **RIESGO DE HELADAS**", "error")]),
+    ("cultivos", _datos(altitud=3500, temp=9.9), 6.5, IDEAL),
+    ("cultivos", _datos(altitud=3501, temp=10), 6.5, IDEAL),
+    # Humedad: hongos (> 22 °C y > 80 %) y estrés hídrico (> 28 °C y < 40 %)
+    ("cultivos", _datos(temp=22.1, humedad=81), 6.5, [("🍄 **ALERTA HONGOS**", "error")]),
+    ("cultivos", _datos(temp=22.1, humedad=80), 6.5, IDEAL),
+    ("cultivos", _datos(temp=22, humedad=81), 6.5, IDEAL),
+    ("cultivos", _datos(temp=28.1, humedad=39), 6.5, [("🍂 **ESTRÉS HÍDRICO (Aire Seco)**", "warning")]),
+    ("cultivos", _datos(temp=28.1, humedad=40), 6.5, IDEAL),
+    # Lluvia: < 500 mm (el mensaje trunca a entero)
+    ("cultivos", _datos(lluvia=499.9), 6.5, [("💧 **DÉFICIT LLUVIA (499 mm)**", "warning")]),
+    ("cultivos", _datos(lluvia=500), 6.5, IDEAL),
+    # Varias reglas a la vez, en el orden declarado
+    ("cultivos", _datos(temp=30, humedad=30, lluvia=100), 4.0, [
+        ("☠️ **ACIDEZ DETECTADA (pH 4.0)**", "error"),
+        ("🍂 **ESTRÉS HÍDRICO (Aire Seco)**", "warning"),
+        ("💧 **DÉFICIT LLUVIA (100 mm)**", "warning"),
+    ]),
+    # Bovinos: altitud > 2800; humedad > 85 en todos los animales
+    ("bovinos", _datos(altitud=2801), 6.5, [("⛰️ **RIESGO: MAL DE ALTURA**", "error")]),
+    ("bovinos", _datos(altitud=2800), 6.5, IDEAL),
+    ("bovinos", _datos(humedad=86), 6.5, [("🦠 **BACTERIOSIS**", "warning")]),
+    ("bovinos", _datos(humedad=85), 6.5, IDEAL),
+    # Porcinos: temperatura > 27
+    ("porcinos", _datos(temp=27.1, humedad=86), 6.5, [
+        ("🐷 **ESTRÉS TÉRMICO**", "error"),
+        ("🦠 **BACTERIOSIS**", "warning"),
+    ]),
+    ("porcinos", _datos(temp=27), 6.5, IDEAL),
+    # Aves: solo bacteriosis; la altitud y el pH no aplican
+    ("aves", _datos(humedad=86, altitud=4000, temp=30), 3.0, [("🦠 **BACTERIOSIS**", "warning")]),
+    ("aves", _datos(humedad=85, altitud=4000, temp=30), 3.0, IDEAL),
+]
+
+
+@pytest.mark.parametrize("categoria, datos, ph, esperado", CASOS)
+def test_consejos_en_los_umbrales(categoria, datos, ph, esperado):
+    assert _titulos(generar_consejos_experto(datos, categoria, ph)) == esperado
+
+
+@pytest.mark.parametrize("categoria", ["cultivos", "bovinos", "porcinos", "aves"])
+def test_la_pendiente_no_cambia_los_consejos(categoria):
+    # Ninguna regla de diagnóstico usa la pendiente (se evalúa en el puntaje de aptitud)
+    for pendiente in (0, 15, 45):
+        assert generar_consejos_experto(_datos(pendiente=pendiente), categoria, 6.5) == \
+            generar_consejos_experto(_datos(), categoria, 6.5)
+
+
+def test_consejos_lote_igual_a_un_sitio():
+    casos = [(datos, ph) for categoria, datos, ph, _ in CASOS if categoria == "cultivos"]
+    sitios = {
+        "temp_actual": [d["clima"]["temp_actual"] for d, _ in casos],
+        "humedad": [d["clima"]["humedad"] for d, _ in casos],
+        "altitud": [d["topografia"]["altitud"] for d, _ in casos],
+        "precipitacion_anual_estimada": [d["clima"]["precipitacion_anual_estimada"] for d, _ in casos],
+        "ph": [ph for _, ph in casos],
+    }
+    assert consejos_lote(sitios, "cultivos") == [generar_consejos_experto(d, "cultivos", ph) for d, ph in casos]
+
+
+def test_datos_sin_variables_usan_los_valores_por_defecto():
+    datos = {"clima": {}, "topografia": {}, "solar": {}, "suelo": {}}
+    # Lluvia por defecto 0 mm -> déficit
+    assert _titulos(generar_consejos_experto(datos, "cultivos", 6.5)) == [("💧 **DÉFICIT LLUVIA (0 mm)**", "warning")]
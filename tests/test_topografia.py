@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from src.topografia import dem_sintetico, guardar_dem, pendiente_orientacion
+
+
+@pytest.fixture(scope="module")
+def dem(tmp_path_factory):
+    # 0.2° x 0.2° con un plano del 10 % hacia el este; la colina queda en el centro
+    return dem_sintetico(str(tmp_path_factory.mktemp("dem")), filas=200, columnas=200, pendiente_este=10.0)
+
+
+def test_horn_sobre_plano_inclinado(dem):
+    # Esquina suroeste, lejos de la colina central
+    pendiente, orientacion = dem.consultar(dem.lat_min + 0.02, dem.lon_min + 0.02)
+    assert pendiente == pytest.approx(10.0, abs=0.1)
+    assert orientacion == pytest.approx(270.0, abs=1.0)
+
+
+def test_colina_aumenta_la_pendiente(dem):
+    centro_lat = dem.lat_min + dem.resolucion * (dem.filas - 1) / 2
+    centro_lon = dem.lon_min + dem.resolucion * (dem.columnas - 1) / 2
+    # Ladera oeste: sube hacia el este igual que el plano, las pendientes se suman
+    ladera, _ = dem.consultar(centro_lat, centro_lon - 0.02)
+    assert ladera > 12.0
+
+
+def test_lote_por_tiles_igual_a_la_malla(dem):
+    pendiente, orientacion, lats, lons = dem.malla((dem.lat_min, dem.lon_min, dem.lat_min + 0.1, dem.lon_min + 0.1))
+    lat, lon = np.meshgrid(lats, lons, indexing="ij")
+    lote_pendiente, lote_orientacion = dem.consultar_lote(lat.ravel(), lon.ravel())
+    np.testing.assert_allclose(lote_pendiente, pendiente.ravel())
+    np.testing.assert_allclose(lote_orientacion, orientacion.ravel())
+
+
+def test_fuera_del_dem(dem):
+    assert dem.consultar(dem.lat_min - 1, dem.lon_min) is None
+
+
+def test_terreno_plano_sin_pendiente(tmp_path):
+    plano = guardar_dem(str(tmp_path), np.full((20, 20), 300.0), -12.0, -77.0, 0.001)
+    assert plano.consultar(-11.99, -76.99)[0] == pytest.approx(0.0)
+
+
+def test_kernel_de_horn_en_pendiente_norte():
+    resolucion = 0.001
+    dy = resolucion * 111_320.0
+    # Sube 5 m por fila hacia el norte: pendiente 5 / dy, orientada al sur (180°)
+    z = np.add.outer(np.arange(5) * 5.0, np.zeros(5))
+    pendiente, orientacion = pendiente_orientacion(z, np.zeros(3), resolucion)
+    np.testing.assert_allclose(pendiente, 100 * 5.0 / dy)
+    np.testing.assert_allclose(orientacion, 180.0)
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from src.transporte import CircuitoAbierto, ErrorTransitorio, Transporte
+
+PARAMS = {"latitude": -12.0, "longitude": -77.0}
+
+
+def _transporte(**opciones):
+    opciones.setdefault("backoff_base", 0.0)
+    return Transporte(**opciones)
+
+
+def test_reintenta_respuestas_5xx_hasta_obtener_datos(stub):
+    transporte = _transporte(reintentos=2)
+    stub.fallar_siguientes(2, estado=503)
+    datos = transporte.get_json("pronostico", stub.urls()["weather_url"], PARAMS)
+    assert datos["latitude"] == -12.0
+    assert stub.peticiones["/v1/forecast"] == 3
+    assert transporte.circuito("pronostico").estado == "cerrado"
+
+
+def test_reintenta_429(stub):
+    stub.fallar_siguientes(1, estado=429)
+    assert _transporte(reintentos=1).get_json("pronostico", stub.urls()["weather_url"], PARAMS)
+    assert stub.peticiones["/v1/forecast"] == 2
+
+
+def test_agota_reintentos_y_propaga_el_error(stub):
+    stub.fallar_siguientes(10)
+    with pytest.raises(ErrorTransitorio):
+        _transporte(reintentos=1, umbral_fallos=10).get_json("pronostico", stub.urls()["weather_url"], PARAMS)
+    assert stub.peticiones["/v1/forecast"] == 2
+
+
+def test_circuito_abre_y_no_consulta_durante_el_enfriamiento(stub):
+    transporte = _transporte(reintentos=0, umbral_fallos=2, enfriamiento=60)
+    url = stub.urls()["weather_url"]
+    stub.fallar_siguientes(2)
+    for _ in range(2):
+        with pytest.raises(ErrorTransitorio):
+            transporte.get_json("pronostico", url, PARAMS)
+    assert transporte.circuito("pronostico").estado == "abierto"
+
+    with pytest.raises(CircuitoAbierto):
+        transporte.get_json("pronostico", url, PARAMS)
+    assert stub.peticiones["/v1/forecast"] == 2
+
+
+def test_semiabierto_cierra_con_una_prueba_exitosa(stub):
+    transporte = _transporte(reintentos=0, umbral_fallos=1, enfriamiento=0.05)
+    url = stub.urls()["weather_url"]
+    stub.fallar_siguientes(1)
+    with pytest.raises(ErrorTransitorio):
+        transporte.get_json("pronostico", url, PARAMS)
+    time.sleep(0.06)
+    assert transporte.circuito("pronostico").estado == "semiabierto"
+
+    assert transporte.get_json("pronostico", url, PARAMS)
+    assert transporte.circuito("pronostico").estado == "cerrado"
+
+
+def test_semiabierto_vuelve_a_abrir_si_la_prueba_falla(stub):
+    transporte = _transporte(reintentos=0, umbral_fallos=1, enfriamiento=0.05)
+    url = stub.urls()["weather_url"]
+    stub.fallar_siguientes(2)
+    with pytest.raises(ErrorTransitorio):
+        transporte.get_json("pronostico", url, PARAMS)
+    time.sleep(0.06)
+    with pytest.raises(ErrorTransitorio):
+        transporte.get_json("pronostico", url, PARAMS)
+    assert transporte.circuito("pronostico").estado == "abierto"
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ChunkedEncodingError("respuesta truncada"),
+    requests.exceptions.TooManyRedirects("demasiadas redirecciones"),
+    RuntimeError("error inesperado"),
+])
+def test_prueba_semiabierta_no_queda_tomada_tras_cualquier_error(stub, monkeypatch, error):
+    transporte = _transporte(reintentos=0, umbral_fallos=1, enfriamiento=0.05)
+    url = stub.urls()["weather_url"]
+    stub.fallar_siguientes(1)
+    with pytest.raises(ErrorTransitorio):
+        transporte.get_json("pronostico", url, PARAMS)
+    time.sleep(0.06)
+
+    get_original = transporte.session.get
+    monkeypatch.setattr(transporte.session, "get", lambda *a, **k: (_ for _ in ()).throw(error))
+    with pytest.raises(type(error)):
+        transporte.get_json("pronostico", url, PARAMS)
+    monkeypatch.setattr(transporte.session, "get", get_original)
+
+    time.sleep(0.06)
+    assert transporte.get_json("pronostico", url, PARAMS)
+    assert transporte.circuito("pronostico").estado == "cerrado"
+
+
+def test_coalesce_peticiones_identicas_en_vuelo(stub_lento):
+    transporte = _transporte()
+    url = stub_lento.urls()["weather_url"]
+    resultados = []
+
+    def consultar():
+        resultados.append(transporte.get_json("pronostico", url, PARAMS))
+
+    hilos = [threading.Thread(target=consultar) for _ in range(8)]
+    for hilo in hilos: hilo.start()
+    for hilo in hilos: hilo.join()
+
+    assert stub_lento.peticiones["/v1/forecast"] == 1
+    assert len(resultados) == 8 and all(r == resultados[0] for r in resultados)
+
+
+def test_llamada_coalescida_respeta_su_propio_timeout(stub_lento):
+    transporte = _transporte()
+    url = stub_lento.urls()["weather_url"]
+    lider = threading.Thread(target=transporte.get_json, args=("pronostico", url, PARAMS))
+    lider.start()
+    time.sleep(0.05)
+
+    inicio = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        transporte.get_json("pronostico", url, PARAMS, timeout=0.05)
+    assert time.monotonic() - inicio < 0.2
+    lider.join()